@@ -0,0 +1,90 @@
+"""
+Throughput of the sync routes (/api/v1/trades) against the asyncio routes
+(/api/v1/async/trades) under concurrent load, driven in-process through ASGI.
+
+Run with:
+    PYTHONPATH=$(pwd) poetry run python benchmarks/bench_async_concurrency.py
+
+Both stacks share one SQLite file unless DATABASE_URL points elsewhere, e.g. a
+PostgreSQL instance to include network round-trips.
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+
+_DB_DIR = tempfile.mkdtemp()
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_DB_DIR}/bench.db")
+
+import httpx  # noqa: E402
+
+from trading_execution_system.db.async_settings import async_engine  # noqa: E402
+from trading_execution_system.main import app  # noqa: E402
+from trading_execution_system.db.settings import TradeORMRepository  # noqa: E402
+from trading_execution_system.models.trade import TradeDetails  # noqa: E402
+from trading_execution_system.services.trade import TradeService  # noqa: E402
+
+HEADERS = {"x-user-id": "admin"}
+
+
+def _seed(trades: int) -> list:
+    trade_service = TradeService(TradeORMRepository())
+    today = date.today()
+    trade_ids = []
+    for i in range(trades):
+        details = TradeDetails(
+            trading_entity="EntityA",
+            counterparty="EntityB",
+            direction="Buy",
+            style="Forward",
+            currency="GBP",
+            notional_amount=1000 + i,
+            underlying=["GBP", "USD"],
+            trade_date=today,
+            value_date=today + timedelta(days=1),
+            delivery_date=today + timedelta(days=2),
+        )
+        trade_ids.append(str(trade_service.submit_trade("User1", details).id))
+    return trade_ids
+
+
+async def _drive(prefix: str, trade_ids: list, requests: int, concurrency: int):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as c:
+        queue = asyncio.Queue()
+        for i in range(requests):
+            endpoint = "history" if i % 2 else "status"
+            queue.put_nowait(f"{prefix}/{trade_ids[i % len(trade_ids)]}/{endpoint}")
+
+        async def worker():
+            while not queue.empty():
+                response = await c.get(queue.get_nowait(), headers=HEADERS)
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return requests / (time.perf_counter() - start)
+
+
+async def run(trades: int, requests: int, concurrency_levels: list):
+    trade_ids = _seed(trades)
+    print(f"{'concurrency':>11} {'sync req/s':>11} {'async req/s':>12}")
+    for concurrency in concurrency_levels:
+        sync_rps = await _drive("/api/v1/trades", trade_ids, requests, concurrency)
+        async_rps = await _drive(
+            "/api/v1/async/trades", trade_ids, requests, concurrency
+        )
+        print(f"{concurrency:>11} {sync_rps:>11.0f} {async_rps:>12.0f}")
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--trades", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50, 200])
+    args = parser.parse_args()
+    asyncio.run(run(args.trades, args.requests, args.concurrency))
@@ -0,0 +1,81 @@
+"""
+Approving N pending trades one HTTP call at a time against a single call to
+POST /api/v1/trades/batch/approve.
+
+Run with:
+    PYTHONPATH=$(pwd) poetry run python benchmarks/bench_batch_actions.py
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+
+_DB_DIR = tempfile.mkdtemp()
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_DB_DIR}/bench.db")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from trading_execution_system.db.settings import TradeORMRepository  # noqa: E402
+from trading_execution_system.main import app  # noqa: E402
+from trading_execution_system.models.trade import TradeDetails  # noqa: E402
+from trading_execution_system.services.trade import TradeService  # noqa: E402
+
+HEADERS = {"x-user-id": "admin"}
+
+
+def _seed(trades: int) -> list:
+    trade_service = TradeService(TradeORMRepository())
+    today = date.today()
+    trade_ids = []
+    for i in range(trades):
+        details = TradeDetails(
+            trading_entity="EntityA",
+            counterparty="EntityB",
+            direction="Buy",
+            style="Forward",
+            currency="GBP",
+            notional_amount=1000 + i,
+            underlying=["GBP", "USD"],
+            trade_date=today,
+            value_date=today + timedelta(days=1),
+            delivery_date=today + timedelta(days=2),
+        )
+        trade_ids.append(str(trade_service.submit_trade("User1", details).id))
+    return trade_ids
+
+
+def run(batch_sizes: list) -> None:
+    print(
+        f"{'trades':>7} {'single trades/s':>16} {'batch trades/s':>15} {'speedup':>8}"
+    )
+    with TestClient(app) as client:
+        for size in batch_sizes:
+            trade_ids = _seed(size)
+            start = time.perf_counter()
+            for trade_id in trade_ids:
+                response = client.post(
+                    f"/api/v1/trades/{trade_id}/approve", headers=HEADERS
+                )
+                response.raise_for_status()
+            single = size / (time.perf_counter() - start)
+
+            trade_ids = _seed(size)
+            start = time.perf_counter()
+            response = client.post(
+                "/api/v1/trades/batch/approve",
+                json={"trade_ids": trade_ids},
+                headers=HEADERS,
+            )
+            response.raise_for_status()
+            batch = size / (time.perf_counter() - start)
+            assert all(r["error"] is None for r in response.json()["results"])
+            print(f"{size:>7} {single:>16.0f} {batch:>15.0f} {batch / single:>7.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[10, 100, 1000])
+    args = parser.parse_args()
+    run(args.batch_sizes)
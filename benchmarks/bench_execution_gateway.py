@@ -0,0 +1,132 @@
+"""
+Executions per second through the execution gateway and a stand-in
+counterparty answering after ``--latency`` seconds.
+
+Times N executions one round-trip at a time, the same N pipelined over the
+connection pool, and the whole path from the outbox: the dispatcher claiming
+SENT_TO_COUNTERPARTY messages, the gateway executing them and booking the
+fills, with fills booked one at a time and in batches.
+
+Run with:
+    PYTHONPATH=$(pwd) poetry run python benchmarks/bench_execution_gateway.py
+"""
+
+import argparse
+import asyncio
+import datetime
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+
+_DB_DIR = tempfile.mkdtemp()
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_DB_DIR}/bench.db")
+
+from trading_execution_system.core.dependencies import (  # noqa: E402
+    get_trade_service,
+)
+from trading_execution_system.db.async_settings import async_engine  # noqa: E402
+from trading_execution_system.models.enums import TradeAction  # noqa: E402
+from trading_execution_system.models.outbox import OutboxMessage  # noqa: E402
+from trading_execution_system.models.trade import TradeDetails  # noqa: E402
+from trading_execution_system.models.user import USERS  # noqa: E402
+from trading_execution_system.services.counterparty_server import (  # noqa: E402
+    StandInCounterparty,
+)
+from trading_execution_system.services.dispatcher import (  # noqa: E402
+    OutboxDispatcher,
+)
+from trading_execution_system.services.gateway import ExecutionGateway  # noqa: E402
+
+RATES = {"GBP": 1.265, "USD": 1.0}
+
+
+def _seed(trades: int, chunk: int = 1000) -> None:
+    """``trades`` trades in SENT_TO_COUNTERPARTY, each with its outbox message"""
+    today = date.today()
+    for offset in range(0, trades, chunk):
+        details = [
+            TradeDetails(
+                trading_entity="EntityA",
+                counterparty="EntityB",
+                direction="Buy",
+                style="Forward",
+                currency="GBP",
+                notional_amount=1000 + i,
+                underlying=["GBP", "USD"],
+                trade_date=today,
+                value_date=today + timedelta(days=1),
+                delivery_date=today + timedelta(days=2),
+            )
+            for i in range(min(chunk, trades - offset))
+        ]
+        service = get_trade_service()
+        trade_ids = [trade.id for trade in service.submit_trades("User1", details)]
+        for action in (TradeAction.APPROVE, TradeAction.SEND_TO_EXECUTE):
+            get_trade_service().batch_transition(trade_ids, action, USERS["admin"])
+
+
+def _message(message_id: int) -> OutboxMessage:
+    return OutboxMessage(
+        id=message_id,
+        trade_id=f"trade-{message_id}",
+        action="SEND_TO_EXECUTE",
+        payload={"details": {"currency": "GBP", "direction": "Buy"}},
+        attempts=1,
+        created_at=datetime.datetime.utcnow(),
+    )
+
+
+async def _executions(port: int, count: int, **options) -> float:
+    gateway = ExecutionGateway("127.0.0.1", port, **options)
+    start = time.perf_counter()
+    await asyncio.gather(*(gateway.execute(_message(i)) for i in range(count)))
+    elapsed = time.perf_counter() - start
+    await gateway.close()
+    return count / elapsed
+
+
+async def _dispatched(port: int, trades: int, in_flight: int, batch_size: int):
+    gateway = ExecutionGateway("127.0.0.1", port, batch_size=batch_size)
+    dispatcher = OutboxDispatcher(gateway, batch_size=in_flight)
+    start = time.perf_counter()
+    await dispatcher.drain()
+    elapsed = time.perf_counter() - start
+    await dispatcher.stop()
+    assert gateway.booked == trades, gateway.booked
+    return trades / elapsed, gateway.batches
+
+
+async def run(executions: int, trades: int, latency: float, in_flight: int) -> None:
+    counterparty = StandInCounterparty(RATES, latency=latency)
+    port = await counterparty.start()
+    print(f"counterparty latency {latency * 1000:.1f}ms")
+    print(f"{'case':<36} {'executions/s':>13}")
+
+    serial = await _executions(
+        port, min(executions, 1000), connections=1, max_in_flight=1
+    )
+    print(f"{'one at a time':<36} {serial:>13.0f}")
+    pipelined = await _executions(port, executions)
+    print(f"{'pipelined, 4 connections':<36} {pipelined:>13.0f}")
+
+    for batch_size in (1, 500):
+        _seed(trades)
+        rate, batches = await _dispatched(port, trades, in_flight, batch_size)
+        name = f"outbox to EXECUTED, batches of {batch_size}"
+        print(f"{name:<36} {rate:>13.0f}  ({batches} batches)")
+
+    await counterparty.close()
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--executions", type=int, default=50_000)
+    parser.add_argument("--trades", type=int, default=5_000)
+    parser.add_argument("--latency", type=float, default=0.002)
+    parser.add_argument(
+        "--in-flight", type=int, default=1000, help="dispatcher batch size"
+    )
+    args = parser.parse_args()
+    asyncio.run(run(args.executions, args.trades, args.latency, args.in_flight))
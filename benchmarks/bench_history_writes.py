@@ -0,0 +1,67 @@
+"""
+Write cost of a single transition as the trade history grows.
+
+Run with:
+    PYTHONPATH=$(pwd) poetry run python benchmarks/bench_history_writes.py
+"""
+
+import argparse
+import os
+import time
+from datetime import date, timedelta
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from trading_execution_system.db.settings import TradeORMRepository  # noqa: E402
+from trading_execution_system.models.enums import TradeAction, TradeState  # noqa: E402
+from trading_execution_system.models.trade import TradeDetails  # noqa: E402
+from trading_execution_system.services.trade import TradeService  # noqa: E402
+
+
+def _details(notional: float) -> TradeDetails:
+    today = date.today()
+    return TradeDetails(
+        trading_entity="EntityA",
+        counterparty="EntityB",
+        direction="Buy",
+        style="Forward",
+        currency="GBP",
+        notional_amount=notional,
+        underlying=["GBP", "USD"],
+        trade_date=today,
+        value_date=today + timedelta(days=1),
+        delivery_date=today + timedelta(days=2),
+    )
+
+
+def run(max_depth: int, sample: int) -> None:
+    repository = TradeORMRepository()
+    service = TradeService(repository)
+    trade = service.submit_trade("User1", _details(1))
+
+    print(f"{'history depth':>14} {'ms / write':>12}")
+    next_report = 16
+    timings = []
+    while len(trade.history) < max_depth:
+        # the trade stays in memory so only the repository write is timed.
+        trade.details = _details(len(trade.history))
+        previous_state = trade.state
+        trade.state = TradeState.NEEDS_REAPPROVAL
+        trade.add_history("User1", TradeAction.UPDATE.name, previous_state)
+        start = time.perf_counter()
+        repository.update(trade)
+        timings.append(time.perf_counter() - start)
+
+        service._transition(trade, TradeAction.APPROVE, "admin")
+        if len(trade.history) >= next_report:
+            window = timings[-sample:]
+            print(f"{len(trade.history):>14} {1000 * sum(window) / len(window):>12.3f}")
+            next_report *= 2
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--max-depth", type=int, default=4096)
+    parser.add_argument("--sample", type=int, default=20)
+    args = parser.parse_args()
+    run(args.max_depth, args.sample)
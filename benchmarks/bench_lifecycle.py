@@ -0,0 +1,338 @@
+"""
+Load test of the trade lifecycle, driven in-process through ASGI.
+
+Seeds a synthetic book of ``--book`` trades spread over every TradeState, each
+with the history it would have collected on the way there, including rounds of
+update and reapproval. Then ``--concurrency`` clients each take trades through
+submit -> approve -> update -> reapprove -> send_to_execute -> book until
+``--trades`` lifecycles are done, timing every request.
+
+Prints p50/p95/p99 latency and requests per second for each endpoint, the
+best of ``--repeat`` runs, and compares them with the baseline stored for the
+same api, book and concurrency in ``--baselines``. A p50 more than
+``--tolerance`` above its baseline, a throughput that much below it, or any
+failed request is a regression and the exit status is 1. The tails swing with
+SQLite lock waits from run to run, so p95 and p99 are shown but not gated.
+Baselines depend on the machine, record new ones with ``--save-baseline``
+when the reference machine or an expected cost changes.
+
+Run with:
+    PYTHONPATH=$(pwd) poetry run python benchmarks/bench_lifecycle.py
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from dataclasses import replace
+from datetime import date, datetime, timedelta
+from typing import Dict, List
+
+_DB_DIR = tempfile.mkdtemp()
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_DB_DIR}/bench.db")
+
+import httpx  # noqa: E402
+
+from trading_execution_system.db.async_settings import async_engine  # noqa: E402
+from trading_execution_system.db.settings import TradeORMRepository  # noqa: E402
+from trading_execution_system.main import app  # noqa: E402
+from trading_execution_system.models.enums import (  # noqa: E402
+    TradeAction,
+    TradeState,
+)
+from trading_execution_system.models.trade import Trade, TradeDetails  # noqa: E402
+from trading_execution_system.services.trade import (  # noqa: E402
+    apply_transition,
+    apply_update,
+)
+from trading_execution_system.utils.serialization import to_json_value  # noqa: E402
+
+BASELINES = os.path.join(os.path.dirname(__file__), "baselines", "lifecycle.json")
+PREFIXES = {"sync": "/api/v1/trades", "async": "/api/v1/async/trades"}
+REQUESTER = {"x-user-id": "User1"}
+ADMIN = {"x-user-id": "admin"}
+ENDPOINTS = ("submit", "approve", "update", "reapprove", "send_to_execute", "book")
+# metrics a regression is reported for.
+GATED = ("p50", "rps")
+
+# share of the synthetic book in each state, executed trades dominate a
+# book that has been running for a while.
+STATE_MIX = {
+    TradeState.DRAFT: 0.03,
+    TradeState.PENDING_APPROVAL: 0.10,
+    TradeState.NEEDS_REAPPROVAL: 0.07,
+    TradeState.APPROVED: 0.08,
+    TradeState.SENT_TO_COUNTERPARTY: 0.07,
+    TradeState.EXECUTED: 0.55,
+    TradeState.CANCELLED: 0.10,
+}
+# actions after SUBMIT that lead to each state, before any update rounds.
+PATHS = {
+    TradeState.PENDING_APPROVAL: [],
+    TradeState.NEEDS_REAPPROVAL: [TradeAction.APPROVE, TradeAction.UPDATE],
+    TradeState.APPROVED: [TradeAction.APPROVE],
+    TradeState.SENT_TO_COUNTERPARTY: [
+        TradeAction.APPROVE,
+        TradeAction.SEND_TO_EXECUTE,
+    ],
+    TradeState.EXECUTED: [
+        TradeAction.APPROVE,
+        TradeAction.SEND_TO_EXECUTE,
+        TradeAction.BOOK,
+    ],
+    TradeState.CANCELLED: [TradeAction.CANCEL],
+}
+
+
+def _details(rng: random.Random) -> TradeDetails:
+    trade_date = date.today() - timedelta(days=rng.randrange(365))
+    return TradeDetails(
+        trading_entity="EntityA",
+        counterparty=f"Counterparty{rng.randrange(50)}",
+        direction=rng.choice(("Buy", "Sell")),
+        style="Forward",
+        currency=rng.choice(("GBP", "USD", "EUR", "JPY")),
+        notional_amount=rng.randrange(1_000, 10_000_000),
+        underlying=["GBP", "USD"],
+        trade_date=trade_date,
+        value_date=trade_date + timedelta(days=90),
+        delivery_date=trade_date + timedelta(days=92),
+    )
+
+
+def _synthetic_trade(rng: random.Random, state: TradeState) -> Trade:
+    trade = Trade(requester_id=rng.choice(("User1", "User2")), details=_details(rng))
+    if state == TradeState.DRAFT:
+        return trade
+    apply_transition(trade, TradeAction.SUBMIT, trade.requester_id)
+    path = PATHS[state]
+    # most approved trades went through a round or two of amendments.
+    if path[:1] == [TradeAction.APPROVE]:
+        for _ in range(rng.choice((0, 0, 1, 1, 2, 3))):
+            apply_transition(trade, TradeAction.APPROVE, "admin")
+            amended = replace(
+                trade.details, notional_amount=rng.randrange(1_000, 10_000_000)
+            )
+            apply_update(trade, trade.requester_id, amended)
+    for action in path:
+        if action == TradeAction.UPDATE:
+            amended = replace(
+                trade.details, notional_amount=rng.randrange(1_000, 10_000_000)
+            )
+            apply_update(trade, trade.requester_id, amended)
+        else:
+            if action == TradeAction.BOOK:
+                trade.details = replace(trade.details, strike=rng.uniform(0.5, 1.5))
+            apply_transition(trade, action, "admin")
+    return trade
+
+
+def seed_book(size: int, chunk: int = 5_000) -> Dict[str, int]:
+    """Store ``size`` synthetic trades, the number in each state"""
+    rng = random.Random(0)
+    states, weights = zip(*STATE_MIX.items())
+    counts = dict.fromkeys((state.name for state in states), 0)
+    for offset in range(0, size, chunk):
+        trades = [
+            _synthetic_trade(rng, state)
+            for state in rng.choices(states, weights, k=min(chunk, size - offset))
+        ]
+        TradeORMRepository.create_many(trades)
+        for trade in trades:
+            counts[trade.state.name] += 1
+    return counts
+
+
+def _percentile(ordered: List[float], fraction: float) -> float:
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def _lifecycle(client, prefix: str, timings: Dict[str, List[float]], errors):
+    details = to_json_value(_details(random.Random()))
+    amended = {**details, "notional_amount": details["notional_amount"] + 1}
+
+    async def call(endpoint: str, url: str, headers, body=None):
+        start = time.perf_counter()
+        response = await client.post(url, json=body, headers=headers)
+        timings[endpoint].append(time.perf_counter() - start)
+        if response.status_code != 200:
+            errors[endpoint] += 1
+            raise RuntimeError(f"{endpoint} failed: {response.text}")
+        return response.json()
+
+    trade = await call(
+        "submit",
+        f"{prefix}/",
+        REQUESTER,
+        {"requester_id": "User1", "details": details},
+    )
+    url = f"{prefix}/{trade['id']}"
+    await call("approve", f"{url}/approve", ADMIN)
+    await call(
+        "update",
+        f"{url}/update",
+        REQUESTER,
+        {"user_id": "User1", "details": amended},
+    )
+    await call("reapprove", f"{url}/approve", ADMIN)
+    await call("send_to_execute", f"{url}/send_to_execute", ADMIN)
+    await call("book", f"{url}/book", REQUESTER, {"strike": 1.25})
+
+
+async def drive(api: str, trades: int, concurrency: int) -> Dict[str, dict]:
+    """Run ``trades`` lifecycles over ``concurrency`` clients, stats per endpoint"""
+    timings: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    remaining = iter(range(trades))
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as c:
+
+        async def worker():
+            for _ in remaining:
+                try:
+                    await _lifecycle(c, PREFIXES[api], timings, errors)
+                except RuntimeError:
+                    pass
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    stats = {}
+    for endpoint in ENDPOINTS:
+        ordered = sorted(timings[endpoint])
+        stats[endpoint] = {
+            "requests": len(ordered),
+            "errors": errors[endpoint],
+            "p50": _percentile(ordered, 0.5) * 1000,
+            "p95": _percentile(ordered, 0.95) * 1000,
+            "p99": _percentile(ordered, 0.99) * 1000,
+            "rps": len(ordered) / elapsed,
+        }
+    return stats
+
+
+def best_of(runs: List[Dict[str, dict]]) -> Dict[str, dict]:
+    """Lowest latencies and highest throughput of each endpoint over ``runs``"""
+    best = {}
+    for endpoint in ENDPOINTS:
+        stats = [run[endpoint] for run in runs]
+        best[endpoint] = {
+            "requests": sum(run["requests"] for run in stats),
+            "errors": sum(run["errors"] for run in stats),
+            **{
+                metric: min(run[metric] for run in stats)
+                for metric in ("p50", "p95", "p99")
+            },
+            "rps": max(run["rps"] for run in stats),
+        }
+    return best
+
+
+def compare(stats: Dict[str, dict], baseline: Dict[str, dict], tolerance: float):
+    """Print the run next to its baseline, the regressed ``endpoint metric``s"""
+    regressions = []
+    header = f"{'endpoint':<16}" + "".join(
+        f"{metric:>9} {'vs base':>8}" for metric in ("p50 ms", "p95 ms", "p99 ms")
+    )
+    print(header + f"{'req/s':>9} {'vs base':>8} {'errors':>7}")
+    for endpoint, current in stats.items():
+        base = baseline.get(endpoint, {})
+        line = f"{endpoint:<16}"
+        for metric in ("p50", "p95", "p99", "rps"):
+            change = ""
+            if base.get(metric):
+                ratio = current[metric] / base[metric] - 1
+                change = f"{ratio:+.0%}"
+                worse = -ratio if metric == "rps" else ratio
+                if metric in GATED and worse > tolerance:
+                    regressions.append(f"{endpoint} {metric}")
+                    change += "!"
+            line += f"{current[metric]:>9.1f} {change:>8}"
+        print(line + f" {current['errors']:>7}")
+        if current["errors"]:
+            regressions.append(f"{endpoint} errors")
+    return regressions
+
+
+def _load_baselines(path: str) -> dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _save_baseline(path: str, key: str, stats: Dict[str, dict]) -> None:
+    baselines = _load_baselines(path)
+    baselines[key] = {
+        "recorded": datetime.utcnow().isoformat(timespec="seconds"),
+        "machine": f"{platform.system()} {platform.machine()}, "
+        f"Python {platform.python_version()}",
+        "endpoints": {
+            endpoint: {
+                metric: round(value, 3)
+                for metric, value in values.items()
+                if metric not in ("requests", "errors")
+            }
+            for endpoint, values in stats.items()
+        },
+    }
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(baselines, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+async def run(args) -> int:
+    start = time.perf_counter()
+    counts = seed_book(args.book)
+    print(f"seeded {args.book} trades in {time.perf_counter() - start:.1f}s: {counts}")
+    # one lifecycle per client first, so connections and caches are warm.
+    await drive(args.api, args.concurrency, args.concurrency)
+    stats = best_of(
+        [
+            await drive(args.api, args.trades, args.concurrency)
+            for _ in range(args.repeat)
+        ]
+    )
+    await async_engine.dispose()
+
+    key = f"{args.api}/book={args.book}/concurrency={args.concurrency}"
+    baseline = _load_baselines(args.baselines).get(key)
+    print(f"\n{key}, best of {args.repeat} runs of {args.trades} lifecycles")
+    if baseline is not None:
+        print(f"baseline recorded {baseline['recorded']} on {baseline['machine']}")
+    regressions = compare(
+        stats, baseline["endpoints"] if baseline else {}, args.tolerance
+    )
+    if args.save_baseline:
+        _save_baseline(args.baselines, key, stats)
+        print(f"baseline saved to {args.baselines}")
+        return 0
+    if baseline is None:
+        print("no baseline for this configuration, record one with --save-baseline")
+    if regressions:
+        print(f"regressions: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--api", choices=sorted(PREFIXES), default="sync")
+    parser.add_argument("--book", type=int, default=20_000)
+    parser.add_argument("--trades", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--baselines", default=BASELINES)
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--save-baseline", action="store_true")
+    sys.exit(asyncio.run(run(parser.parse_args())))
@@ -0,0 +1,102 @@
+"""
+Cost of the /metrics instrumentation: the same requests served with
+METRICS_ENABLED=0 and =1, each in a fresh process on its own database, and the
+cost of one histogram observation.
+
+status: GET /trades/{id}/status of a cached trade, no SQL, so the middleware
+        is most of the difference.
+submit: POST /trades/, a handful of statements through the engine events.
+
+Run with:
+    PYTHONPATH=$(pwd) poetry run python benchmarks/bench_metrics_overhead.py
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+
+
+def _child(requests: int, repeat: int) -> None:
+    from fastapi.testclient import TestClient
+
+    from tests.test_trades import create_sample_trade_payload
+    from trading_execution_system.main import app
+
+    headers = {"x-user-id": "User1"}
+    with TestClient(app) as client:
+        trade_id = client.post(
+            "/api/v1/trades/", json=create_sample_trade_payload(), headers=headers
+        ).json()["id"]
+        cases = {
+            "status": lambda: client.get(
+                f"/api/v1/trades/{trade_id}/status", headers=headers
+            ),
+            "submit": lambda: client.post(
+                "/api/v1/trades/", json=create_sample_trade_payload(), headers=headers
+            ),
+        }
+        timings = {}
+        for name, request in cases.items():
+            best = float("inf")
+            for _ in range(repeat):
+                start = time.perf_counter()
+                for _ in range(requests):
+                    request()
+                best = min(best, time.perf_counter() - start)
+            timings[name] = best / requests
+    print(json.dumps(timings))
+
+
+def _run(enabled: bool, requests: int, repeat: int) -> dict:
+    env = {
+        **os.environ,
+        "METRICS_ENABLED": "1" if enabled else "0",
+        "DATABASE_URL": f"sqlite:///{tempfile.mkdtemp()}/bench.db",
+    }
+    output = subprocess.run(
+        [sys.executable, __file__, "--child", f"--requests={requests}"]
+        + [f"--repeat={repeat}"],
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def main(requests: int, repeat: int) -> None:
+    from trading_execution_system.core.metrics import Histogram
+
+    off = _run(False, requests, repeat)
+    on = _run(True, requests, repeat)
+    print(f"{'case':<8} {'off (us)':>9} {'on (us)':>9} {'overhead':>9}")
+    for name in off:
+        overhead = on[name] / off[name] - 1
+        print(
+            f"{name:<8} {off[name] * 1e6:>9.0f} {on[name] * 1e6:>9.0f}"
+            f" {overhead:>9.1%}"
+        )
+
+    histogram = Histogram("bench_seconds", "", ("route", "status"))
+    number = 200_000
+    seconds = timeit.timeit(
+        lambda: histogram.observe(0.004, "/api/v1/trades/", "200"), number=number
+    )
+    print(f"\nHistogram.observe: {seconds / number * 1e9:.0f}ns")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        _child(args.requests, args.repeat)
+    else:
+        main(args.requests, args.repeat)
@@ -0,0 +1,153 @@
+"""
+Memory held by N loaded trades, each with SUBMIT, APPROVE and SEND_TO_EXECUTE
+history records, in the previous and the current domain models.
+
+previous: plain dataclasses with a ``__dict__`` per instance, every history
+          record holds its own ``asdict`` copy of the details.
+current:  slotted models, immutable details shared by the records, repeated
+          strings interned.
+
+Every trade is decoded from its own JSON row, as the database driver returns
+fresh strings per row.
+
+Run with:
+    PYTHONPATH=$(pwd) poetry run python benchmarks/bench_model_memory.py
+"""
+
+import argparse
+import datetime
+import gc
+import json
+import tracemalloc
+import uuid
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from trading_execution_system.models.enums import TradeState
+from trading_execution_system.models.trade import Trade, TradeDetails
+
+STEPS = [
+    ("SUBMIT", TradeState.DRAFT, TradeState.PENDING_APPROVAL),
+    ("APPROVE", TradeState.PENDING_APPROVAL, TradeState.APPROVED),
+    ("SEND_TO_EXECUTE", TradeState.APPROVED, TradeState.SENT_TO_COUNTERPARTY),
+]
+
+
+@dataclass
+class PreviousTradeDetails:
+    trading_entity: str
+    counterparty: str
+    direction: str
+    style: str
+    currency: str
+    notional_amount: float
+    underlying: List[str]
+    trade_date: datetime.date
+    value_date: datetime.date
+    delivery_date: datetime.date
+    strike: Optional[float] = None
+
+
+@dataclass
+class PreviousHistoryRecord:
+    timestamp: datetime.datetime
+    user_id: str
+    action: str
+    previous_state: TradeState
+    new_state: TradeState
+    details_snapshot: Dict[str, Any]
+
+
+@dataclass
+class PreviousTrade:
+    id: uuid.UUID = field(default_factory=uuid.uuid4)
+    requester_id: str = ""
+    details: PreviousTradeDetails = None
+    state: TradeState = TradeState.DRAFT
+    history: List[PreviousHistoryRecord] = field(default_factory=list)
+    version: int = 0
+
+
+def _row(i: int) -> str:
+    today = datetime.date.today()
+    return json.dumps(
+        {
+            "requester_id": f"User{i % 50}",
+            "approver_id": "admin",
+            "details": {
+                "trading_entity": "EntityA",
+                "counterparty": f"Counterparty{i % 20}",
+                "direction": "Buy" if i % 2 else "Sell",
+                "style": "Forward",
+                "currency": ("GBP", "USD", "EUR")[i % 3],
+                "notional_amount": 1000.0 + i,
+                "underlying": ["GBP", "USD"],
+                "trade_date": today.isoformat(),
+                "value_date": (today + datetime.timedelta(days=1)).isoformat(),
+                "delivery_date": (today + datetime.timedelta(days=2)).isoformat(),
+            },
+        }
+    )
+
+
+def _previous(row: Dict[str, Any]) -> PreviousTrade:
+    trade = PreviousTrade(
+        requester_id=row["requester_id"],
+        details=PreviousTradeDetails(**row["details"]),
+        state=TradeState.SENT_TO_COUNTERPARTY,
+    )
+    for action, previous_state, new_state in STEPS:
+        user_id = row["requester_id"] if action == "SUBMIT" else row["approver_id"]
+        trade.history.append(
+            PreviousHistoryRecord(
+                datetime.datetime.utcnow(),
+                user_id,
+                action,
+                previous_state,
+                new_state,
+                asdict(trade.details),
+            )
+        )
+    return trade
+
+
+def _current(row: Dict[str, Any]) -> Trade:
+    trade = Trade(
+        requester_id=row["requester_id"], details=TradeDetails(**row["details"])
+    )
+    for action, previous_state, new_state in STEPS:
+        user_id = row["requester_id"] if action == "SUBMIT" else row["approver_id"]
+        trade.state = new_state
+        trade.add_history(user_id, action, previous_state)
+    return trade
+
+
+def _measure(build: Callable[[Dict[str, Any]], Any], trades: int) -> int:
+    rows = [_row(i) for i in range(trades)]
+    gc.collect()
+    tracemalloc.start()
+    try:
+        book = [build(json.loads(row)) for row in rows]
+        gc.collect()
+        held = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del book
+    return held
+
+
+def run(trades: int) -> None:
+    previous = _measure(_previous, trades)
+    current = _measure(_current, trades)
+    print(f"{trades} trades, {len(STEPS)} history records each")
+    print(f"{'model':>9} {'MiB':>8} {'bytes/trade':>12}")
+    for name, held in (("previous", previous), ("current", current)):
+        print(f"{name:>9} {held / 2**20:>8.1f} {held / trades:>12.0f}")
+    print(f"current holds {current / previous:.0%} of the previous footprint")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--trades", type=int, default=100_000)
+    args = parser.parse_args()
+    run(args.trades)
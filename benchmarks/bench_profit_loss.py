@@ -0,0 +1,153 @@
+"""
+Mark-to-market P&L of an executed book of N trades spread over 100 requesters.
+
+Times loading the book into column arrays, revaluing it against a new rate
+snapshot with NumPy and with a per-trade Python loop, grouping it, and a
+GET /api/v1/reports/profit-loss served from the cache.
+
+Run with:
+    PYTHONPATH=$(pwd) poetry run python benchmarks/bench_profit_loss.py
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+import uuid
+from datetime import date, datetime, timedelta
+
+_DB_DIR = tempfile.mkdtemp()
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_DB_DIR}/bench.db")
+
+import numpy as np  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+
+from trading_execution_system.core.dependencies import pnl_engine  # noqa: E402
+from trading_execution_system.db.counters import StateCountRepository  # noqa: E402
+from trading_execution_system.db.rates import parse_rates  # noqa: E402
+from trading_execution_system.db.settings import (  # noqa: E402
+    SessionLocal,
+    TradeModel,
+)
+from trading_execution_system.main import app  # noqa: E402
+from trading_execution_system.models.report import ProfitLossQuery  # noqa: E402
+from trading_execution_system.services.pnl import (  # noqa: E402
+    ExecutedBook,
+    profit_loss_report,
+    revalue,
+)
+
+HEADERS = {"x-user-id": "admin"}
+START = date(2024, 1, 1)
+CURRENCIES = ("GBP", "USD", "EUR", "JPY")
+
+
+def _seed(trades: int, chunk: int = 50_000) -> None:
+    rng = random.Random(0)
+    now = datetime.utcnow()
+    with SessionLocal() as db:
+        for offset in range(0, trades, chunk):
+            rows = []
+            for _ in range(min(chunk, trades - offset)):
+                trade_date = START + timedelta(days=rng.randrange(730))
+                rows.append(
+                    {
+                        "id": str(uuid.uuid4()),
+                        "requester_id": f"User{rng.randrange(1, 101)}",
+                        "state": "EXECUTED",
+                        "trading_entity": "EntityA",
+                        "counterparty": f"Counterparty{rng.randrange(50)}",
+                        "direction": rng.choice(("Buy", "Sell")),
+                        "style": "Forward",
+                        "currency": rng.choice(CURRENCIES),
+                        "notional_amount": rng.randrange(1_000, 10_000_000),
+                        "strike": rng.uniform(0.5, 1.5),
+                        "trade_date": trade_date,
+                        "value_date": trade_date + timedelta(days=90),
+                        "delivery_date": trade_date + timedelta(days=92),
+                        "version": 1,
+                        "created_at": now,
+                        "updated_at": now,
+                    }
+                )
+            db.execute(insert(TradeModel), rows)
+        db.commit()
+
+
+def _rates(seed: int):
+    rng = random.Random(seed)
+    lines = ["currency,rate"] + [f"{c},{rng.uniform(0.5, 1.5)}" for c in CURRENCIES]
+    return parse_rates("\n".join(lines).encode())
+
+
+def _loop_revalue(book: ExecutedBook, snapshot) -> list:
+    # the per-trade loop the vectorized revaluation replaces.
+    currencies = list(book.currencies)
+    return [
+        sign * notional * (snapshot.rates[currencies[currency]] - strike)
+        for sign, notional, currency, strike in zip(
+            book.sign.tolist(),
+            book.notional.tolist(),
+            book.currency.tolist(),
+            book.strike.tolist(),
+        )
+    ]
+
+
+def _best(run, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000
+
+
+def run(trades: int, repeat: int) -> None:
+    start = time.perf_counter()
+    _seed(trades)
+    # the rows bypass the repository, count them as the rebuild command does.
+    StateCountRepository.rebuild()
+    print(f"seeded {trades} trades in {time.perf_counter() - start:.1f}s")
+
+    book = pnl_engine.executed_book()
+    snapshot = _rates(1)
+    pnl = revalue(book, snapshot)
+    assert np.allclose(pnl, _loop_revalue(book, snapshot))
+    by_user = ProfitLossQuery(group_by="user")
+    by_month = ProfitLossQuery(group_by="period", period="month")
+
+    rates_file = os.path.join(_DB_DIR, "rates.csv")
+    with open(rates_file, "w") as f:
+        f.write("currency,rate\nGBP,1.3\nUSD,1.0\nEUR,1.1\nJPY,0.007\n")
+    pnl_engine.rates_file = rates_file
+
+    cases = [
+        (
+            "load book (reload)",
+            lambda: ExecutedBook.from_columns(None, pnl_engine.db.executed_book()),
+        ),
+        ("book version check", pnl_engine.db.executed_book_version),
+        ("revalue, numpy", lambda: revalue(book, snapshot)),
+        ("revalue, python loop", lambda: _loop_revalue(book, snapshot)),
+        ("group by user", lambda: profit_loss_report(book, pnl, snapshot, by_user)),
+        ("group by month", lambda: profit_loss_report(book, pnl, snapshot, by_month)),
+    ]
+    print(f"{'step':<22} {'ms':>9}")
+    for name, case in cases:
+        print(f"{name:<22} {_best(case, repeat):>9.1f}")
+    with TestClient(app) as client:
+        url = "/api/v1/reports/profit-loss?group_by=period"
+        client.get(url, headers=HEADERS).raise_for_status()
+        cached = _best(lambda: client.get(url, headers=HEADERS), repeat)
+        print(f"{'GET, cached':<22} {cached:>9.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--trades", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    run(args.trades, args.repeat)
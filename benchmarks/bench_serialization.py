@@ -0,0 +1,92 @@
+"""
+Encoding a trade response with 1, 10 and 100 history entries, the previous
+path against the one the routes use now.
+
+previous: TradeResponse is built from copies of the fields, validated, then run
+          through jsonable_encoder and json.dumps as FastAPI did.
+current:  trade_payload encoded by TradeJSONResponse, without re-validation.
+
+Run with:
+    PYTHONPATH=$(pwd) poetry run python benchmarks/bench_serialization.py
+"""
+
+import argparse
+import json
+import timeit
+from dataclasses import fields
+from datetime import date, timedelta
+
+from fastapi.encoders import jsonable_encoder
+
+from trading_execution_system.models.enums import TradeState
+from trading_execution_system.models.trade import Trade, TradeDetails
+from trading_execution_system.schemas.trade import TradeResponse, trade_payload
+from trading_execution_system.utils.serialization import TradeJSONResponse, orjson
+
+
+def _trade(history: int) -> Trade:
+    today = date.today()
+    trade = Trade(
+        requester_id="User1",
+        details=TradeDetails(
+            trading_entity="EntityA",
+            counterparty="EntityB",
+            direction="Buy",
+            style="Forward",
+            currency="GBP",
+            notional_amount=1000.0,
+            underlying=["GBP", "USD"],
+            trade_date=today,
+            value_date=today + timedelta(days=1),
+            delivery_date=today + timedelta(days=2),
+        ),
+        state=TradeState.PENDING_APPROVAL,
+    )
+    for _ in range(history):
+        trade.add_history("User1", "UPDATE", TradeState.PENDING_APPROVAL)
+    return trade
+
+
+def _fields(obj) -> dict:
+    # what ``__dict__`` returned before the models were slotted.
+    return {f.name: getattr(obj, f.name) for f in fields(obj)}
+
+
+def _previous(trade: Trade) -> bytes:
+    response = TradeResponse(
+        id=trade.id,
+        state=trade.state.name,
+        details=_fields(trade.details),
+        history=[_fields(record) for record in trade.history],
+    )
+    # FastAPI validated the returned model against response_model once more.
+    response = TradeResponse.model_validate(response.model_dump())
+    content = jsonable_encoder(response, exclude_unset=True)
+    return json.dumps(content).encode()
+
+
+def _current(trade: Trade) -> bytes:
+    return TradeJSONResponse(trade_payload(trade)).body
+
+
+def run(depths: list, number: int) -> None:
+    encoder = "orjson" if orjson is not None else "json"
+    print(f"encoder: {encoder}, {number} encodings per measurement")
+    print(f"{'history':>8} {'previous us':>12} {'current us':>11} {'speedup':>8}")
+    for depth in depths:
+        trade = _trade(depth)
+        assert json.loads(_previous(trade)) == json.loads(_current(trade))
+        previous = min(timeit.repeat(lambda: _previous(trade), number=number, repeat=3))
+        current = min(timeit.repeat(lambda: _current(trade), number=number, repeat=3))
+        print(
+            f"{depth:>8} {previous / number * 1e6:>12.1f} "
+            f"{current / number * 1e6:>11.1f} {previous / current:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--depths", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--number", type=int, default=1000)
+    args = parser.parse_args()
+    run(args.depths, args.number)
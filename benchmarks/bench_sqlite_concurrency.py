@@ -0,0 +1,200 @@
+"""
+Reads served while trades are being written, on a SQLite file database.
+
+``--writers`` threads take their own trades through update and reapproval
+while ``--readers`` threads load random trades and their status, for
+``--seconds``. The trade cache is off so every read reaches the database, and
+each operation runs in one request session the way a request does. Each
+journal mode runs in a fresh process on its own database:
+
+rollback journal: SQLite's defaults, journal_mode=DELETE and synchronous=FULL.
+WAL:              the default SQLITE_* settings, journal_mode=WAL and
+                  synchronous=NORMAL.
+
+Prints reads and writes per second, read latency percentiles and the
+operations that failed on a locked database.
+
+Run with:
+    PYTHONPATH=$(pwd) poetry run python benchmarks/bench_sqlite_concurrency.py
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import replace
+from datetime import date, timedelta
+
+MODES = {
+    "rollback journal": {"SQLITE_JOURNAL_MODE": "DELETE", "SQLITE_SYNCHRONOUS": "FULL"},
+    "WAL": {"SQLITE_JOURNAL_MODE": "WAL", "SQLITE_SYNCHRONOUS": "NORMAL"},
+}
+
+
+def _details(notional: float):
+    from trading_execution_system.models.trade import TradeDetails
+
+    today = date.today()
+    return TradeDetails(
+        trading_entity="EntityA",
+        counterparty="EntityB",
+        direction="Buy",
+        style="Forward",
+        currency="GBP",
+        notional_amount=notional,
+        underlying=["GBP", "USD"],
+        trade_date=today,
+        value_date=today + timedelta(days=1),
+        delivery_date=today + timedelta(days=2),
+    )
+
+
+def _percentile(samples, share: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * share))]
+
+
+def _child(book: int, readers: int, writers: int, seconds: float) -> None:
+    import trading_execution_system.db.settings as db_settings
+    from trading_execution_system.core.dependencies import get_trade_service
+    from trading_execution_system.models.enums import TradeAction
+    from trading_execution_system.models.user import USERS
+
+    def in_request(operation):
+        with db_settings.SessionLocal() as db:
+            token = db_settings.request_session.set(db)
+            try:
+                return operation(get_trade_service())
+            finally:
+                db_settings.request_session.reset(token)
+
+    trade_ids = [
+        str(trade.id)
+        for trade in get_trade_service().submit_trades(
+            "User1", [_details(1000 + i) for i in range(book)]
+        )
+    ]
+    # the writers' trades are approved, so each round is update + reapprove.
+    owned = [trade_ids[i::writers][:50] for i in range(writers)]
+    for own in owned:
+        get_trade_service().batch_transition(own, TradeAction.APPROVE, USERS["admin"])
+
+    stop = threading.Event()
+    read_latency, writes, errors = [], [0], [0]
+    lock = threading.Lock()
+
+    def read():
+        rng = random.Random()
+        latencies = []
+        while not stop.is_set():
+            trade_id = rng.choice(trade_ids)
+            start = time.perf_counter()
+            try:
+                in_request(lambda service: service.get_full_trade(trade_id))
+                in_request(lambda service: service.get_trade_status(trade_id))
+            except Exception:
+                with lock:
+                    errors[0] += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+        with lock:
+            read_latency.extend(latencies)
+
+    def write(own):
+        user = USERS["User1"]
+        round_number = 0
+        while not stop.is_set():
+            round_number += 1
+            for trade_id in own:
+                if stop.is_set():
+                    break
+                try:
+                    in_request(
+                        lambda service: service.update_trade(
+                            trade_id,
+                            user,
+                            replace(_details(1000), notional_amount=round_number),
+                        )
+                    )
+                    in_request(lambda service: service.approve_trade(trade_id, "admin"))
+                except Exception:
+                    with lock:
+                        errors[0] += 1
+                    continue
+                with lock:
+                    writes[0] += 2
+
+    threads = [threading.Thread(target=read) for _ in range(readers)]
+    threads += [threading.Thread(target=write, args=(own,)) for own in owned]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    print(
+        json.dumps(
+            {
+                "reads": len(read_latency) / seconds,
+                "writes": writes[0] / seconds,
+                "p50": _percentile(read_latency, 0.50),
+                "p99": _percentile(read_latency, 0.99),
+                "errors": errors[0],
+            }
+        )
+    )
+
+
+def _run(mode: dict, args) -> dict:
+    env = {
+        **os.environ,
+        **mode,
+        "DATABASE_URL": f"sqlite:///{tempfile.mkdtemp()}/bench.db",
+        "TRADE_CACHE_SIZE": "0",
+        "METRICS_ENABLED": "0",
+    }
+    command = [sys.executable, __file__, "--child"]
+    for option in ("book", "readers", "writers", "seconds"):
+        command.append(f"--{option}={getattr(args, option)}")
+    output = subprocess.run(
+        command, env=env, check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def main(args) -> None:
+    print(
+        f"{args.readers} readers, {args.writers} writers, {args.book} trades,"
+        f" {args.seconds:g}s"
+    )
+    print(
+        f"{'journal':<17} {'reads/s':>8} {'writes/s':>9} {'read p50':>9}"
+        f" {'read p99':>9} {'errors':>7}"
+    )
+    for name, mode in MODES.items():
+        result = _run(mode, args)
+        print(
+            f"{name:<17} {result['reads']:>8.0f} {result['writes']:>9.0f}"
+            f" {result['p50'] * 1000:>7.2f}ms {result['p99'] * 1000:>7.2f}ms"
+            f" {result['errors']:>7}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--book", type=int, default=2000)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        _child(args.book, args.readers, args.writers, args.seconds)
+    else:
+        main(args)
@@ -0,0 +1,101 @@
+"""
+Latency of GET /api/v1/reports/trades over a book of N trades spread over 100
+requesters and two years of trade dates, for the whole book, one requester
+and one quarter.
+
+The book is written straight into the tables in large batches, which is much
+faster than submitting every trade through the service.
+
+Run with:
+    PYTHONPATH=$(pwd) poetry run python benchmarks/bench_trade_report.py
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+import uuid
+from datetime import date, datetime, timedelta
+
+_DB_DIR = tempfile.mkdtemp()
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_DB_DIR}/bench.db")
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+
+from trading_execution_system.db.settings import (  # noqa: E402
+    SessionLocal,
+    TradeModel,
+)
+from trading_execution_system.main import app  # noqa: E402
+from trading_execution_system.models.enums import TradeState  # noqa: E402
+
+HEADERS = {"x-user-id": "admin"}
+START = date(2024, 1, 1)
+
+
+def _seed(trades: int, chunk: int = 50_000) -> None:
+    rng = random.Random(0)
+    states = [state.name for state in TradeState]
+    now = datetime.utcnow()
+    with SessionLocal() as db:
+        for offset in range(0, trades, chunk):
+            rows = []
+            for _ in range(min(chunk, trades - offset)):
+                trade_date = START + timedelta(days=rng.randrange(730))
+                rows.append(
+                    {
+                        "id": str(uuid.uuid4()),
+                        "requester_id": f"User{rng.randrange(1, 101)}",
+                        "state": rng.choice(states),
+                        "trading_entity": "EntityA",
+                        "counterparty": f"Counterparty{rng.randrange(50)}",
+                        "direction": rng.choice(("Buy", "Sell")),
+                        "style": "Forward",
+                        "currency": rng.choice(("GBP", "USD", "EUR", "JPY")),
+                        "notional_amount": rng.randrange(1_000, 10_000_000),
+                        "trade_date": trade_date,
+                        "value_date": trade_date + timedelta(days=2),
+                        "delivery_date": trade_date + timedelta(days=30),
+                        "version": 1,
+                        "created_at": now,
+                        "updated_at": now,
+                    }
+                )
+            db.execute(insert(TradeModel), rows)
+        db.commit()
+
+
+def _time(client: TestClient, url: str, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        client.get(url, headers=HEADERS).raise_for_status()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def run(trades: int, repeat: int) -> None:
+    start = time.perf_counter()
+    _seed(trades)
+    print(f"seeded {trades} trades in {time.perf_counter() - start:.1f}s")
+    quarter = f"trade_date_from={START}&trade_date_to={START + timedelta(days=90)}"
+    cases = [
+        ("whole book, by month", "/api/v1/reports/trades"),
+        ("whole book, by day", "/api/v1/reports/trades?bucket=day"),
+        ("one requester", "/api/v1/reports/trades?requester_id=User1"),
+        ("one quarter", f"/api/v1/reports/trades?{quarter}"),
+    ]
+    print(f"{'report':<22} {'ms':>8}")
+    with TestClient(app) as client:
+        for name, url in cases:
+            print(f"{name:<22} {_time(client, url, repeat) * 1000:>8.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--trades", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    run(args.trades, args.repeat)
@@ -9,14 +9,25 @@ fi
 # setting default port unless otherwise specified
 PORT=${PORT:-8000}
 
+# the app reads its worker count from WEB_CONCURRENCY to size the trade cache.
+case " $UVICORN_EXTRA_ARGS $GUNICORN_EXTRA_ARGS " in
+  *" --workers"* | *" -w "*)
+    echo "Set WEB_CONCURRENCY or WORKERS instead of passing --workers"
+    exit 1
+    ;;
+esac
+
 if [ "$SERVER" = "uvicorn" ]; then
   echo "Starting server with Uvicorn..."
   exec uvicorn trading_execution_system.main:app --host 0.0.0.0 --port $PORT $UVICORN_EXTRA_ARGS
+elif [ "$SERVER" = "start" ]; then
+  echo "Starting server with the ${SERVER_PROFILE:-development} profile..."
+  SERVER_PORT=$PORT exec python -m trading_execution_system
 elif [ "$SERVER" = "gunicorn" ]; then
   echo "Starting server with Gunicorn using UvicornWorker..."
 
   WORKERS=${WORKERS:-4}
-  exec gunicorn trading_execution_system.main:app --workers $WORKERS --worker-class uvicorn.workers.UvicornWorker --bind 0.0.0.0:$PORT $GUNICORN_EXTRA_ARGS
+  WEB_CONCURRENCY=$WORKERS exec gunicorn trading_execution_system.main:app --workers $WORKERS --worker-class uvicorn.workers.UvicornWorker --bind 0.0.0.0:$PORT $GUNICORN_EXTRA_ARGS
 else
   echo "Unknown server: $SERVER"
   exit 1
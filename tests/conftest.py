@@ -1,13 +1,19 @@
+import asyncio
 import os
 import pytest
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 from fastapi.testclient import TestClient
 
 
 from trading_execution_system.db.settings import Base
 from trading_execution_system.main import app
+from trading_execution_system.core.dependencies import trade_cache
 import trading_execution_system.db.settings as db_settings
+import trading_execution_system.db.async_settings as async_db_settings
+import trading_execution_system.core.query_budget as query_budget
 
 
 # use in-memory db for tests
@@ -20,15 +26,44 @@ connection = engine.connect()
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=connection)
 
 Base.metadata.create_all(bind=connection)
+# commit the DDL, sessions then run their own transactions on the connection
+# and a rollback only undoes that session's work.
+connection.commit()
 
 db_settings.SessionLocal = TestingSessionLocal
 
+# a route running more SQL statements than its budget fails the test.
+query_budget.mode = "raise"
+
+# the async routes get their own in-memory db through aiosqlite.
+async_engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+
+async_db_settings.AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, autoflush=False, expire_on_commit=False
+)
+
+
+async def _recreate_async_tables():
+    async with async_engine.begin() as async_connection:
+        await async_connection.run_sync(Base.metadata.drop_all)
+        await async_connection.run_sync(Base.metadata.create_all)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def dispose_async_engine():
+    """close the aiosqlite connection, its worker thread keeps the process alive"""
+    yield
+    asyncio.run(async_engine.dispose())
+
 
 @pytest.fixture(scope="function", autouse=True)
 def recreate_db():
     """drop and recreate the tables before each test run"""
     Base.metadata.drop_all(bind=connection)
     Base.metadata.create_all(bind=connection)
+    connection.commit()
+    asyncio.run(_recreate_async_tables())
+    trade_cache.clear()
     yield
 
 
@@ -37,3 +72,29 @@ def client():
     """create a FastApi test client"""
     with TestClient(app) as c:
         yield c
+
+
+class QueryCounter:
+    """SQL statements sent to the test database"""
+
+    def __init__(self):
+        self.statements = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def reset(self):
+        self.statements.clear()
+
+
+@pytest.fixture
+def query_counter():
+    """count the round-trips made by the code under test"""
+    counter = QueryCounter()
+    event.listen(engine, "before_cursor_execute", counter)
+    yield counter
+    event.remove(engine, "before_cursor_execute", counter)
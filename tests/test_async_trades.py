@@ -0,0 +1,80 @@
+from tests.test_trades import create_sample_trade_payload
+
+BASE_URL = "/api/v1/async/trades"
+REQUESTER_HEADERS = {"x-user-id": "User1"}
+ADMIN_HEADERS = {"x-user-id": "admin"}
+
+
+def test_async_trade_lifecycle(client):
+    response = client.post(
+        f"{BASE_URL}/", json=create_sample_trade_payload(), headers=REQUESTER_HEADERS
+    )
+    assert response.status_code == 200, response.json()
+    trade_id = response.json()["id"]
+    assert response.json()["state"] == "PENDING_APPROVAL"
+
+    details = create_sample_trade_payload()["details"]
+    details["notional_amount"] = 5
+    response = client.post(
+        f"{BASE_URL}/{trade_id}/update",
+        json={"user_id": "User1", "details": details},
+        headers=REQUESTER_HEADERS,
+    )
+    assert response.json()["state"] == "NEEDS_REAPPROVAL"
+
+    for action, state in (
+        ("approve", "APPROVED"),
+        ("send_to_execute", "SENT_TO_COUNTERPARTY"),
+    ):
+        response = client.post(f"{BASE_URL}/{trade_id}/{action}", headers=ADMIN_HEADERS)
+        assert response.status_code == 200, response.json()
+        assert response.json()["state"] == state
+
+    response = client.post(
+        f"{BASE_URL}/{trade_id}/book", json={"strike": 1.25}, headers=REQUESTER_HEADERS
+    )
+    assert response.json()["state"] == "EXECUTED"
+    assert response.json()["details"]["strike"] == 1.25
+
+    response = client.get(f"{BASE_URL}/{trade_id}/history", headers=REQUESTER_HEADERS)
+    assert [record["action"] for record in response.json()["history"]] == [
+        "SUBMIT",
+        "UPDATE",
+        "APPROVE",
+        "SEND_TO_EXECUTE",
+        "BOOK",
+    ]
+
+    response = client.get(
+        f"{BASE_URL}/{trade_id}/diff?from_index=0&to_index=1",
+        headers=REQUESTER_HEADERS,
+    )
+    assert response.json()["differences"] == {
+        "notional_amount": {"old": 1000000, "new": 5}
+    }
+
+    response = client.get(f"{BASE_URL}/{trade_id}/status", headers=REQUESTER_HEADERS)
+    assert response.json() == {"id": trade_id, "state": "EXECUTED"}
+
+    response = client.get(f"{BASE_URL}/", headers=REQUESTER_HEADERS)
+    assert [trade["id"] for trade in response.json()] == [trade_id]
+
+
+def test_async_routes_enforce_rbac(client):
+    response = client.post(
+        f"{BASE_URL}/", json=create_sample_trade_payload(), headers=REQUESTER_HEADERS
+    )
+    trade_id = response.json()["id"]
+
+    response = client.post(f"{BASE_URL}/{trade_id}/approve", headers=REQUESTER_HEADERS)
+    assert response.status_code == 403
+    assert response.json()["detail"] == "Only approvers can perform this action."
+
+    response = client.get(
+        f"{BASE_URL}/{trade_id}/status", headers={"x-user-id": "User2"}
+    )
+    assert response.status_code == 403
+    assert (
+        response.json()["detail"]
+        == "Only requesters or approvers can perform this action."
+    )
@@ -0,0 +1,84 @@
+import uuid
+
+from tests.test_trades import create_sample_trade_payload
+
+ADMIN = {"x-user-id": "admin"}
+
+
+def _submit(client, user_id="User1"):
+    response = client.post(
+        "/api/v1/trades/",
+        json=create_sample_trade_payload(),
+        headers={"x-user-id": user_id},
+    )
+    return response.json()["id"]
+
+
+def test_batch_approve_reports_each_trade(client, query_counter):
+    pending = [_submit(client) for _ in range(5)]
+    cancelled = _submit(client)
+    client.post(f"/api/v1/trades/{cancelled}/cancel", headers=ADMIN)
+    missing = str(uuid.uuid4())
+
+    query_counter.reset()
+    response = client.post(
+        "/api/v1/trades/batch/approve",
+        json={"trade_ids": pending + [cancelled, missing]},
+        headers=ADMIN,
+    )
+    assert response.status_code == 200
+    # select the trades and their underlying, one executemany UPDATE, one
+    # executemany INSERT and the two counter upserts.
+    assert query_counter.count == 6
+
+    results = response.json()["results"]
+    assert [result["id"] for result in results] == pending + [cancelled, missing]
+    assert all(result["state"] == "APPROVED" for result in results[:5])
+    assert results[5] == {
+        "id": cancelled,
+        "state": "CANCELLED",
+        "error": "Action APPROVE not allowed from state CANCELLED",
+    }
+    assert results[6]["error"] == "Trade not found"
+
+    # the batch appends to the history like the single trade endpoint.
+    history = client.get(f"/api/v1/trades/{pending[0]}/history", headers=ADMIN)
+    assert [record["action"] for record in history.json()["history"]] == [
+        "SUBMIT",
+        "APPROVE",
+    ]
+    response = client.post(
+        f"/api/v1/trades/{pending[0]}/send_to_execute", headers=ADMIN
+    )
+    assert response.json()["state"] == "SENT_TO_COUNTERPARTY"
+
+
+def test_batch_cancel_only_touches_the_requesters_own_trades(client):
+    own = _submit(client, "User1")
+    other = _submit(client, "User2")
+
+    response = client.post(
+        "/api/v1/trades/batch/cancel",
+        json={"trade_ids": [own, other]},
+        headers={"x-user-id": "User1"},
+    )
+    assert response.status_code == 200
+    own_result, other_result = response.json()["results"]
+    assert own_result["state"] == "CANCELLED"
+    assert other_result["state"] == "PENDING_APPROVAL"
+    assert other_result["error"] is not None
+
+
+def test_batch_approve_requires_an_approver(client):
+    trade_id = _submit(client)
+    response = client.post(
+        "/api/v1/trades/batch/approve",
+        json={"trade_ids": [trade_id]},
+        headers={"x-user-id": "User1"},
+    )
+    assert response.status_code == 403
+
+    response = client.post(
+        "/api/v1/trades/batch/book", json={"trade_ids": [trade_id]}, headers=ADMIN
+    )
+    assert response.status_code == 400
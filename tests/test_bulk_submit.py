@@ -0,0 +1,59 @@
+from tests.test_trades import create_sample_trade_payload
+
+HEADERS = {"x-user-id": "User1"}
+
+
+def test_bulk_submit_creates_pending_trades_in_one_transaction(client, query_counter):
+    rows = [create_sample_trade_payload()["details"] for _ in range(50)]
+
+    query_counter.reset()
+    response = client.post(
+        "/api/v1/trades/bulk", json={"trades": rows}, headers=HEADERS
+    )
+    assert response.status_code == 200
+    # one batched INSERT for the trades, their underlying and their history,
+    # and one upsert each for the per requester and the total state counts.
+    assert query_counter.count == 5
+
+    results = response.json()["results"]
+    assert [result["index"] for result in results] == list(range(50))
+    assert all(result["state"] == "PENDING_APPROVAL" for result in results)
+
+    trade_id = results[0]["id"]
+    history = client.get(f"/api/v1/trades/{trade_id}/history", headers=HEADERS)
+    (record,) = history.json()["history"]
+    assert record["action"] == "SUBMIT"
+    status = client.get(f"/api/v1/trades/{trade_id}/status", headers=HEADERS)
+    assert status.json()["state"] == "PENDING_APPROVAL"
+    response = client.post(
+        f"/api/v1/trades/{trade_id}/approve", headers={"x-user-id": "admin"}
+    )
+    assert response.json()["state"] == "APPROVED"
+
+
+def test_bulk_submit_reports_invalid_rows_and_keeps_the_rest(client):
+    valid = create_sample_trade_payload()["details"]
+    bad_dates = {**valid, "delivery_date": "2000-01-01"}
+    missing_field = {k: v for k, v in valid.items() if k != "currency"}
+
+    response = client.post(
+        "/api/v1/trades/bulk",
+        json={"trades": [bad_dates, valid, missing_field]},
+        headers=HEADERS,
+    )
+    assert response.status_code == 200
+    bad, ok, missing = response.json()["results"]
+    assert bad["id"] is None and "delivery_date" in bad["error"]
+    assert ok["state"] == "PENDING_APPROVAL" and ok["error"] is None
+    assert missing["error"].startswith("currency")
+
+    listing = client.get("/api/v1/trades/", headers=HEADERS)
+    assert [trade["id"] for trade in listing.json()] == [ok["id"]]
+
+
+def test_bulk_submit_is_for_requesters(client):
+    rows = [create_sample_trade_payload()["details"]]
+    response = client.post(
+        "/api/v1/trades/bulk", json={"trades": rows}, headers={"x-user-id": "admin"}
+    )
+    assert response.status_code == 403
@@ -0,0 +1,138 @@
+import threading
+from dataclasses import replace
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import trading_execution_system.db.settings as db_settings
+from trading_execution_system.core.exceptions import TradeConflictError
+from trading_execution_system.db.settings import Base, TradeORMRepository
+from trading_execution_system.models.trade import TradeDetails
+from trading_execution_system.schemas.trade import TradeDetailsSchema
+from trading_execution_system.services.trade import TradeService, apply_update
+from tests.test_trades import create_sample_trade_payload
+
+ADMIN = {"x-user-id": "admin"}
+
+
+def _details(payload):
+    schema = TradeDetailsSchema.model_validate(payload["details"])
+    return TradeDetails(**schema.model_dump())
+
+
+def _submit(client):
+    return client.post(
+        "/api/v1/trades/",
+        json=create_sample_trade_payload(),
+        headers={"x-user-id": "User1"},
+    )
+
+
+def test_actions_expose_etag_and_honour_if_match(client):
+    response = _submit(client)
+    assert response.headers["ETag"] == '"1"'
+    trade_id = response.json()["id"]
+
+    response = client.post(
+        f"/api/v1/trades/{trade_id}/approve", headers={**ADMIN, "If-Match": '"0"'}
+    )
+    assert response.status_code == 412
+
+    response = client.post(
+        f"/api/v1/trades/{trade_id}/approve", headers={**ADMIN, "If-Match": '"1"'}
+    )
+    assert response.status_code == 200
+    assert response.headers["ETag"] == '"2"'
+
+    response = client.get(f"/api/v1/trades/{trade_id}/status", headers=ADMIN)
+    assert response.headers["ETag"] == '"2"'
+    assert "version" not in response.json()
+
+
+def test_if_match_accepts_a_list_of_etags_and_any(client):
+    trade_id = _submit(client).json()["id"]
+    url = f"/api/v1/trades/{trade_id}"
+
+    response = client.post(f"{url}/approve", headers={**ADMIN, "If-Match": '"3", "4"'})
+    assert response.status_code == 412
+    response = client.post(f"{url}/approve", headers={**ADMIN, "If-Match": '"0", "1"'})
+    assert response.status_code == 200
+
+    response = client.post(f"{url}/send_to_execute", headers={**ADMIN, "If-Match": "*"})
+    assert response.status_code == 200
+
+    response = client.post(f"{url}/cancel", headers={**ADMIN, "If-Match": '"3", x'})
+    assert response.status_code == 412
+
+
+def test_stale_write_is_rejected_with_409(client):
+    trade_id = _submit(client).json()["id"]
+    # another process approves the trade behind this process's trade cache.
+    TradeService(TradeORMRepository()).approve_trade(trade_id, "admin")
+
+    response = client.post(f"/api/v1/trades/{trade_id}/cancel", headers=ADMIN)
+    assert response.status_code == 409
+
+    # the conflict dropped the stale cached copy, a retry sees the new state.
+    response = client.post(f"/api/v1/trades/{trade_id}/send_to_execute", headers=ADMIN)
+    assert response.status_code == 200
+    assert response.json()["state"] == "SENT_TO_COUNTERPARTY"
+
+
+def test_repository_update_checks_the_version():
+    repository = TradeORMRepository()
+    trade = TradeService(repository).submit_trade(
+        "User1", _details(create_sample_trade_payload())
+    )
+    first, second = repository.get(str(trade.id)), repository.get(str(trade.id))
+    apply_update(first, "User1", replace(first.details, notional_amount=1))
+    repository.update(first)
+
+    apply_update(second, "User1", replace(second.details, notional_amount=2))
+    with pytest.raises(TradeConflictError):
+        repository.update(second)
+    assert repository.get(str(trade.id)).details.notional_amount == 1
+
+
+def test_concurrent_writers_lose_no_update(tmp_path, monkeypatch):
+    engine = create_engine(
+        f"sqlite:///{tmp_path}/trades.db",
+        connect_args={"check_same_thread": False, "timeout": 30},
+    )
+    Base.metadata.create_all(bind=engine)
+    monkeypatch.setattr(
+        db_settings, "SessionLocal", sessionmaker(autoflush=False, bind=engine)
+    )
+    repository = TradeORMRepository()
+    trade = TradeService(repository).submit_trade(
+        "User1", _details(create_sample_trade_payload())
+    )
+    trade_id, start = str(trade.id), trade.details.notional_amount
+    writers, increments = 8, 10
+
+    def increment():
+        for _ in range(increments):
+            while True:
+                current = repository.get(trade_id)
+                details = replace(
+                    current.details, notional_amount=current.details.notional_amount + 1
+                )
+                apply_update(current, "User1", details)
+                try:
+                    repository.update(current)
+                    break
+                except TradeConflictError:
+                    continue  # someone else wrote first, reload and retry.
+
+    threads = [threading.Thread(target=increment) for _ in range(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stored = repository.get(trade_id)
+    assert stored.details.notional_amount == start + writers * increments
+    assert stored.version == 1 + writers * increments
+    assert len(stored.history) == 1 + writers * increments
+    engine.dispose()
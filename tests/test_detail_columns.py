@@ -0,0 +1,108 @@
+import datetime
+
+from sqlalchemy import select, text
+
+import trading_execution_system.db.settings as db_settings
+from trading_execution_system.db.settings import TradeModel, UnderlyingModel
+from tests.test_trades import create_sample_trade_payload, TODAY
+
+HEADERS = {"x-user-id": "User1"}
+
+
+def _stored(trade_id):
+    with db_settings.SessionLocal() as db:
+        trade = db.get(TradeModel, trade_id)
+        underlying = db.scalars(
+            select(UnderlyingModel.currency)
+            .where(UnderlyingModel.trade_id == trade_id)
+            .order_by(UnderlyingModel.position)
+        ).all()
+        return trade, underlying
+
+
+def test_details_are_stored_in_typed_columns(client):
+    payload = create_sample_trade_payload()
+    trade_id = client.post("/api/v1/trades/", json=payload, headers=HEADERS).json()[
+        "id"
+    ]
+
+    trade, underlying = _stored(trade_id)
+    assert trade.trade_date == TODAY
+    assert isinstance(trade.delivery_date, datetime.date)
+    assert trade.notional_amount == 1000000
+    assert trade.counterparty == "EntityB"
+    assert underlying == ["GBP", "USD"]
+
+    response = client.get("/api/v1/trades/?counterparty=EntityB", headers=HEADERS)
+    (listed,) = response.json()
+    assert listed["details"]["underlying"] == ["GBP", "USD"]
+    assert listed["details"]["trade_date"] == TODAY.isoformat()
+
+
+def test_amounts_read_back_as_floats(client):
+    payload = create_sample_trade_payload()
+    response = client.post("/api/v1/trades/", json=payload, headers=HEADERS)
+    trade_id = response.json()["id"]
+    assert '"notional_amount":1000000.0' in response.text
+    client.post(f"/api/v1/trades/{trade_id}/approve", headers={"x-user-id": "admin"})
+    client.post(
+        f"/api/v1/trades/{trade_id}/send_to_execute", headers={"x-user-id": "admin"}
+    )
+    client.post(f"/api/v1/trades/{trade_id}/book", json={"strike": 2}, headers=HEADERS)
+
+    # listings and exports read the Numeric columns, which SQLite returns as ints.
+    for url in ("/api/v1/trades/", "/api/v1/trades/export"):
+        response = client.get(url, headers=HEADERS)
+        assert '"notional_amount":1000000.0' in response.text
+        assert '"strike":2.0' in response.text
+
+
+def test_update_rewrites_underlying_only_when_it_changes(client, query_counter):
+    payload = create_sample_trade_payload()
+    trade_id = client.post("/api/v1/trades/", json=payload, headers=HEADERS).json()[
+        "id"
+    ]
+
+    payload["details"]["notional_amount"] = 5
+    query_counter.reset()
+    client.post(
+        f"/api/v1/trades/{trade_id}/update",
+        json={"user_id": "User1", "details": payload["details"]},
+        headers=HEADERS,
+    )
+    assert not any(
+        statement.startswith(
+            ("DELETE FROM trade_underlyings", "INSERT INTO trade_underlyings")
+        )
+        for statement in query_counter.statements
+    )
+
+    payload["details"]["underlying"] = ["EUR", "GBP", "JPY"]
+    response = client.post(
+        f"/api/v1/trades/{trade_id}/update",
+        json={"user_id": "User1", "details": payload["details"]},
+        headers=HEADERS,
+    )
+    assert response.json()["details"]["underlying"] == ["EUR", "GBP", "JPY"]
+    trade, underlying = _stored(trade_id)
+    assert (trade.notional_amount, underlying) == (5, ["EUR", "GBP", "JPY"])
+
+
+def test_filters_use_the_column_indexes():
+    statement = select(TradeModel.id).where(
+        TradeModel.counterparty == "EntityB", TradeModel.currency == "GBP"
+    )
+    compiled = statement.compile(
+        db_settings.engine, compile_kwargs={"literal_binds": True}
+    )
+    with db_settings.SessionLocal() as db:
+        plan = db.execute(text(f"EXPLAIN QUERY PLAN {compiled}")).all()
+        assert "USING INDEX" in str(plan)
+
+        plan = db.execute(
+            text(
+                "EXPLAIN QUERY PLAN SELECT trade_id FROM trade_underlyings "
+                "WHERE currency = 'USD'"
+            )
+        ).all()
+        assert "ix_trade_underlyings_currency_trade_id" in str(plan)
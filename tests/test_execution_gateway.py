@@ -0,0 +1,190 @@
+import asyncio
+import datetime
+import time
+
+import pytest
+from sqlalchemy import select
+
+import trading_execution_system.db.settings as db_settings
+from trading_execution_system.core.dependencies import get_trade_service
+from trading_execution_system.db.settings import OutboxModel
+from trading_execution_system.models.outbox import Fill, OutboxMessage
+from trading_execution_system.services.counterparty import CounterpartyError
+from trading_execution_system.services.counterparty_server import (
+    StandInCounterparty,
+)
+from trading_execution_system.services.gateway import ExecutionGateway
+from tests.test_trades import create_sample_trade_payload
+
+ADMIN = {"x-user-id": "admin"}
+RATES = {"GBP": 1.265, "USD": 1.0}
+
+
+def _sent_to_execute(client, count=1, currency="GBP"):
+    trade_ids = []
+    for _ in range(count):
+        payload = create_sample_trade_payload()
+        payload["details"]["currency"] = currency
+        response = client.post(
+            "/api/v1/trades/", json=payload, headers={"x-user-id": "User1"}
+        )
+        trade_ids.append(response.json()["id"])
+    for action in ("approve", "send_to_execute"):
+        client.post(
+            f"/api/v1/trades/batch/{action}",
+            json={"trade_ids": trade_ids},
+            headers=ADMIN,
+        )
+    with db_settings.SessionLocal() as db:
+        rows = db.scalars(select(OutboxModel).order_by(OutboxModel.id)).all()
+        return [
+            OutboxMessage(
+                id=row.id,
+                trade_id=row.trade_id,
+                action=row.action,
+                payload=row.payload,
+                attempts=1,
+                created_at=row.created_at,
+            )
+            for row in rows
+            if row.trade_id in trade_ids
+        ]
+
+
+def _message(message_id, currency="GBP", direction="Sell"):
+    details = {"currency": currency, "direction": direction}
+    return OutboxMessage(
+        id=message_id,
+        trade_id=f"trade-{message_id}",
+        action="SEND_TO_EXECUTE",
+        payload={"details": details},
+        attempts=1,
+        created_at=datetime.datetime.utcnow(),
+    )
+
+
+def _run(scenario, latency=0.0, **gateway_options):
+    """Run ``scenario(counterparty, gateway)`` against a stand-in counterparty"""
+
+    async def run():
+        counterparty = StandInCounterparty(RATES, latency=latency)
+        port = await counterparty.start()
+        gateway = ExecutionGateway("127.0.0.1", port, **gateway_options)
+        try:
+            return await scenario(counterparty, gateway)
+        finally:
+            await gateway.close()
+            await counterparty.close()
+
+    return asyncio.run(run())
+
+
+def test_gateway_executes_and_books_fills(client):
+    messages = _sent_to_execute(client, 5)
+
+    async def scenario(counterparty, gateway):
+        await asyncio.gather(*(gateway.send(message) for message in messages))
+        return counterparty.requests, gateway.booked
+
+    assert _run(scenario, latency=0.01, connections=2) == (5, 5)
+    for message in messages:
+        trade = get_trade_service().get_full_trade(message.trade_id)
+        assert trade.state.name == "EXECUTED"
+        # a buy is filled at the offer.
+        assert trade.details.strike == pytest.approx(1.265 * 1.0005)
+        assert trade.history[-1].user_id == "counterparty"
+
+
+def test_fills_are_booked_in_batches(client):
+    messages = _sent_to_execute(client, 10)
+    fills = [Fill(message.id, message.trade_id, 1.25) for message in messages]
+
+    def book(fills):
+        async def scenario(counterparty, gateway):
+            await asyncio.gather(*(gateway.book(fill) for fill in fills))
+            return gateway.booked, gateway.batches
+
+        return scenario
+
+    assert _run(book(fills[:5]), batch_size=2) == (5, 3)
+    assert _run(book(fills[5:])) == (5, 1)
+
+
+def test_requests_are_pipelined():
+    async def scenario(counterparty, gateway):
+        start = time.perf_counter()
+        fills = await asyncio.gather(*(gateway.execute(_message(i)) for i in range(20)))
+        return time.perf_counter() - start, fills
+
+    # one at a time the 20 round-trips would take 2 seconds.
+    elapsed, fills = _run(scenario, latency=0.1, connections=1)
+    assert elapsed < 1
+    assert [fill.trade_id for fill in fills] == [f"trade-{i}" for i in range(20)]
+    assert {fill.strike for fill in fills} == {round(1.265 * 0.9995, 6)}
+
+
+def test_redelivered_message_is_booked_once(client):
+    (message,) = _sent_to_execute(client)
+
+    async def scenario(counterparty, gateway):
+        await gateway.send(message)
+        # the dispatcher crashed before settling it.
+        await gateway.send(message)
+        return counterparty.requests, len(counterparty.fills)
+
+    assert _run(scenario) == (2, 1)
+    history = get_trade_service().get_full_trade(message.trade_id).history
+    assert [record.action for record in history].count("BOOK") == 1
+
+
+def test_rejected_execution_leaves_the_trade_unbooked(client):
+    (message,) = _sent_to_execute(client, currency="EUR")
+
+    async def scenario(counterparty, gateway):
+        with pytest.raises(CounterpartyError, match="No market in EUR"):
+            await gateway.send(message)
+
+    _run(scenario)
+    response = client.get(f"/api/v1/trades/{message.trade_id}/status", headers=ADMIN)
+    assert response.json()["state"] == "SENT_TO_COUNTERPARTY"
+
+
+def test_unknown_directions_are_not_filled():
+    async def scenario(counterparty, gateway):
+        fill = await gateway.execute(_message(1, direction="sell"))
+        assert fill.strike == pytest.approx(1.265 * (1 - counterparty.spread))
+        with pytest.raises(CounterpartyError, match="Unknown direction Hold"):
+            await gateway.execute(_message(2, direction="Hold"))
+
+    _run(scenario)
+
+
+def test_lost_connections_are_replaced():
+    async def scenario(counterparty, gateway):
+        await gateway.execute(_message(1))
+        counterparty.disconnect()
+        await asyncio.sleep(0.05)
+        fill = await gateway.execute(_message(2))
+        return fill.trade_id
+
+    assert _run(scenario, connections=1) == "trade-2"
+
+
+def test_unanswered_requests_time_out():
+    async def scenario(counterparty, gateway):
+        with pytest.raises(CounterpartyError, match="timed out"):
+            await gateway.execute(_message(1))
+
+    _run(scenario, latency=1, timeout=0.05)
+
+
+def test_unreachable_counterparty():
+    async def scenario():
+        counterparty = StandInCounterparty(RATES)
+        port = await counterparty.start()
+        await counterparty.close()
+        gateway = ExecutionGateway("127.0.0.1", port)
+        with pytest.raises(CounterpartyError, match="Cannot connect"):
+            await gateway.execute(_message(1))
+
+    asyncio.run(scenario())
@@ -0,0 +1,84 @@
+import json
+import tracemalloc
+from datetime import date, timedelta
+from typing import Tuple
+
+import trading_execution_system.db.settings as db_settings
+from trading_execution_system.db.settings import TradeORMRepository
+from trading_execution_system.models.trade import TradeDetails, TradeQuery
+from trading_execution_system.services.trade import TradeService
+from tests.test_trades import create_sample_trade_payload
+
+
+def _seed(trades: int) -> None:
+    today = date.today()
+    details = [
+        TradeDetails(
+            trading_entity="EntityA",
+            counterparty="EntityB",
+            direction="Buy",
+            style="Forward",
+            currency="GBP",
+            notional_amount=1000 + i,
+            underlying=["GBP", "USD"],
+            trade_date=today,
+            value_date=today + timedelta(days=1),
+            delivery_date=today + timedelta(days=2),
+        )
+        for i in range(trades)
+    ]
+    TradeService(TradeORMRepository()).submit_trades("User1", details)
+
+
+def _export_peak() -> Tuple[int, int]:
+    tracemalloc.start()
+    try:
+        exported = sum(
+            1 for _ in TradeORMRepository.export(TradeQuery(limit=None), True)
+        )
+        return exported, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def test_export_streams_ndjson_with_listing_filters(client):
+    headers = {"x-user-id": "User1"}
+    payload = create_sample_trade_payload()
+    first = client.post("/api/v1/trades/", json=payload, headers=headers).json()
+    payload["details"]["currency"] = "USD"
+    client.post("/api/v1/trades/", json=payload, headers=headers)
+    client.post(
+        "/api/v1/trades/",
+        json=create_sample_trade_payload(),
+        headers={"x-user-id": "User2"},
+    )
+
+    response = client.get("/api/v1/trades/export?currency=GBP", headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    (line,) = response.text.splitlines()
+    record = json.loads(line)
+    assert record["id"] == first["id"]
+    assert record["state"] == "PENDING_APPROVAL"
+    assert "history" not in record
+
+    response = client.get(
+        "/api/v1/trades/export?include_history=true", headers={"x-user-id": "admin"}
+    )
+    records = [json.loads(line) for line in response.text.splitlines()]
+    assert len(records) == 3
+    assert records[0]["history"][0]["action"] == "SUBMIT"
+    assert records[0]["history"][0]["new_state"] == "PENDING_APPROVAL"
+
+
+def test_export_memory_does_not_grow_with_the_book(monkeypatch):
+    monkeypatch.setattr(db_settings, "EXPORT_BATCH_SIZE", 100)
+    _seed(300)
+    exported, small_peak = _export_peak()
+    assert exported == 300
+
+    _seed(2700)
+    exported, large_peak = _export_peak()
+    assert exported == 3000
+    # ten times the trades, the peak stays that of a single batch.
+    assert large_peak < 1.5 * small_peak
@@ -0,0 +1,123 @@
+import os
+import subprocess
+import sys
+
+import trading_execution_system.db.settings as db_settings
+from trading_execution_system.db.settings import HistoryModel
+
+from tests.test_trades import create_sample_trade_payload
+
+
+def _stored_history(trade_id):
+    with db_settings.SessionLocal() as db:
+        rows = (
+            db.query(HistoryModel)
+            .filter(HistoryModel.trade_id == trade_id)
+            .order_by(HistoryModel.seq)
+            .all()
+        )
+        return [(row.id, row.seq, row.action) for row in rows]
+
+
+def test_history_rows_are_append_only(client):
+    headers = {"x-user-id": "User1"}
+    response = client.post(
+        "/api/v1/trades/", json=create_sample_trade_payload(), headers=headers
+    )
+    assert response.status_code == 200
+    trade_id = response.json()["id"]
+
+    response = client.post(
+        f"/api/v1/trades/{trade_id}/approve", headers={"x-user-id": "admin"}
+    )
+    assert response.status_code == 200
+    before = _stored_history(trade_id)
+
+    details = create_sample_trade_payload()["details"]
+    details["notional_amount"] = 42
+    response = client.post(
+        f"/api/v1/trades/{trade_id}/update",
+        json={"user_id": "User1", "details": details},
+        headers=headers,
+    )
+    assert response.status_code == 200
+    after = _stored_history(trade_id)
+
+    # existing rows keep their identity, only the new record is appended.
+    assert after[: len(before)] == before
+    assert [seq for _, seq, _ in after] == [0, 1, 2]
+    assert [action for _, _, action in after] == ["SUBMIT", "APPROVE", "UPDATE"]
+    assert [record["action"] for record in response.json()["history"]] == [
+        "SUBMIT",
+        "APPROVE",
+        "UPDATE",
+    ]
+
+
+def test_delta_history_is_rebuilt_from_checkpoints(client, monkeypatch):
+    monkeypatch.setattr(db_settings, "HISTORY_STORAGE_MODE", "delta")
+    monkeypatch.setattr(db_settings, "HISTORY_CHECKPOINT_INTERVAL", 3)
+    headers = {"x-user-id": "User1"}
+    admin_headers = {"x-user-id": "admin"}
+
+    response = client.post(
+        "/api/v1/trades/", json=create_sample_trade_payload(), headers=headers
+    )
+    trade_id = response.json()["id"]
+    notionals = [1000000]
+    for notional in (10, 20, 30):
+        response = client.post(
+            f"/api/v1/trades/{trade_id}/approve", headers=admin_headers
+        )
+        assert response.status_code == 200
+        details = create_sample_trade_payload()["details"]
+        details["notional_amount"] = notional
+        response = client.post(
+            f"/api/v1/trades/{trade_id}/update",
+            json={"user_id": "User1", "details": details},
+            headers=headers,
+        )
+        assert response.status_code == 200
+        notionals += [notionals[-1], notional]
+
+    with db_settings.SessionLocal() as db:
+        rows = (
+            db.query(HistoryModel)
+            .filter(HistoryModel.trade_id == trade_id)
+            .order_by(HistoryModel.seq)
+            .all()
+        )
+        assert [row.is_checkpoint for row in rows] == [seq % 3 == 0 for seq in range(7)]
+        # approvals don't change the details so their delta is empty.
+        assert rows[1].details_snapshot == {}
+        assert rows[2].details_snapshot == {"notional_amount": 10}
+
+    response = client.get(f"/api/v1/trades/{trade_id}/history", headers=headers)
+    history = response.json()["history"]
+    assert [record["details_snapshot"]["notional_amount"] for record in history] == (
+        notionals
+    )
+    assert all(len(record["details_snapshot"]) == 11 for record in history)
+
+    response = client.get(
+        f"/api/v1/trades/{trade_id}/diff?from_index=5&to_index=1", headers=headers
+    )
+    assert response.json()["differences"] == {
+        "notional_amount": {"old": 20, "new": 1000000}
+    }
+    response = client.get(
+        f"/api/v1/trades/{trade_id}/diff?from_index=4&to_index=5", headers=headers
+    )
+    assert response.json()["differences"] == {}
+
+
+def test_checkpoint_interval_must_be_positive():
+    env = {**os.environ, "HISTORY_CHECKPOINT_INTERVAL": "0"}
+    result = subprocess.run(
+        [sys.executable, "-c", "import trading_execution_system.core.config"],
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode != 0
+    assert "HISTORY_CHECKPOINT_INTERVAL=0, it must be at least 1" in result.stderr
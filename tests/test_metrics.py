@@ -0,0 +1,197 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError, TimeoutError as PoolTimeoutError
+
+from tests.test_trades import create_sample_trade_payload
+from trading_execution_system.core.metrics import (
+    HTTP_REQUEST_DURATION,
+    REGISTRY,
+    TRADE_TRANSITIONS,
+    Counter,
+    Histogram,
+    Registry,
+)
+from trading_execution_system.core.dependencies import trade_cache
+from trading_execution_system.db import instrumentation
+
+BASE_URL = "/api/v1/trades"
+REQUESTER_HEADERS = {"x-user-id": "User1"}
+ADMIN_HEADERS = {"x-user-id": "admin"}
+
+
+def _sample(text_format, line_start):
+    for line in text_format.splitlines():
+        if line.startswith(line_start):
+            return float(line.rsplit(" ", 1)[1])
+    return None
+
+
+def test_text_format():
+    registry = Registry()
+    counter = registry.register(Counter("jobs_total", "Jobs run.", ("queue",)))
+    histogram = registry.register(
+        Histogram("job_seconds", "Job time.", ("queue",), buckets=(0.1, 1))
+    )
+    counter.inc('a "quoted"\nqueue')
+    counter.inc("b", amount=2)
+    for value in (0.05, 0.1, 0.5, 3):
+        histogram.observe(value, "b")
+
+    assert registry.render().splitlines() == [
+        "# HELP jobs_total Jobs run.",
+        "# TYPE jobs_total counter",
+        'jobs_total{queue="a \\"quoted\\"\\nqueue"} 1',
+        'jobs_total{queue="b"} 2',
+        "# HELP job_seconds Job time.",
+        "# TYPE job_seconds histogram",
+        'job_seconds_bucket{queue="b",le="0.1"} 2',
+        'job_seconds_bucket{queue="b",le="1"} 3',
+        'job_seconds_bucket{queue="b",le="+Inf"} 4',
+        'job_seconds_sum{queue="b"} 3.65',
+        'job_seconds_count{queue="b"} 4',
+    ]
+
+
+def test_requests_are_timed_by_route_template(client):
+    route = "/api/v1/trades/{trade_id}/status"
+    before = HTTP_REQUEST_DURATION.count("GET", route, "200")
+    trade_ids = []
+    for _ in range(2):
+        response = client.post(
+            f"{BASE_URL}/",
+            json=create_sample_trade_payload(),
+            headers=REQUESTER_HEADERS,
+        )
+        trade_ids.append(response.json()["id"])
+
+    for trade_id in trade_ids:
+        response = client.get(f"{BASE_URL}/{trade_id}/status", headers=ADMIN_HEADERS)
+        assert response.status_code == 200
+
+    assert HTTP_REQUEST_DURATION.count("GET", route, "200") == before + 2
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert (
+        _sample(
+            response.text,
+            'http_request_duration_seconds_count{method="GET",'
+            f'route="{route}",status="200"}}',
+        )
+        == before + 2
+    )
+    assert trade_ids[0] not in response.text
+
+
+def test_sql_statements_are_added_to_the_request(client, query_counter):
+    route = "/api/v1/trades/{trade_id}/history"
+    queries = f'db_queries_per_request_sum{{route="{route}"}}'
+    response = client.post(
+        f"{BASE_URL}/", json=create_sample_trade_payload(), headers=REQUESTER_HEADERS
+    )
+    trade_id = response.json()["id"]
+    trade_cache.clear()
+
+    total = _sample(client.get("/metrics").text, queries) or 0
+    query_counter.reset()
+    client.get(f"{BASE_URL}/{trade_id}/history", headers=REQUESTER_HEADERS)
+    assert query_counter.count > 0
+    assert _sample(client.get("/metrics").text, queries) == total + query_counter.count
+
+    # served from the cache the second time.
+    client.get(f"{BASE_URL}/{trade_id}/history", headers=REQUESTER_HEADERS)
+    assert _sample(client.get("/metrics").text, queries) == total + query_counter.count
+
+
+def test_transitions_are_counted(client):
+    before = {
+        action: TRADE_TRANSITIONS.value(action)
+        for action in ("SUBMIT", "APPROVE", "SEND_TO_EXECUTE", "BOOK")
+    }
+    trade_ids = []
+    for _ in range(2):
+        response = client.post(
+            f"{BASE_URL}/",
+            json=create_sample_trade_payload(),
+            headers=REQUESTER_HEADERS,
+        )
+        trade_ids.append(response.json()["id"])
+    client.post(
+        f"{BASE_URL}/batch/approve",
+        json={"trade_ids": trade_ids},
+        headers=ADMIN_HEADERS,
+    )
+    client.post(f"{BASE_URL}/{trade_ids[0]}/send_to_execute", headers=ADMIN_HEADERS)
+
+    assert {
+        action: TRADE_TRANSITIONS.value(action) - count
+        for action, count in before.items()
+    } == {"SUBMIT": 2, "APPROVE": 2, "SEND_TO_EXECUTE": 1, "BOOK": 0}
+
+    response = client.get("/metrics")
+    assert _sample(
+        response.text, 'trade_transitions_total{action="SUBMIT"}'
+    ) == TRADE_TRANSITIONS.value("SUBMIT")
+
+
+def test_failed_statements_do_not_leave_their_start_time(tmp_path):
+    instrumentation.install()
+    engine = create_engine(f"sqlite:///{tmp_path}/failed.db")
+    with engine.connect() as connection:
+        for _ in range(3):
+            with pytest.raises(OperationalError):
+                connection.execute(text("SELECT * FROM missing"))
+        assert connection.info["query_start"] == []
+        connection.execute(text("SELECT 1"))
+        assert connection.info["query_start"] == []
+
+
+def test_pool_checkouts_and_saturation(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path}/pool.db",
+        poolclass=instrumentation.TimedQueuePool,
+        pool_size=2,
+        max_overflow=0,
+        pool_timeout=0.1,
+    )
+    instrumentation.instrument_pool(engine, "test")
+    held = [engine.connect(), engine.connect()]
+    try:
+        timeouts = instrumentation.POOL_TIMEOUTS.value("test")
+        with pytest.raises(PoolTimeoutError):
+            engine.connect()
+        assert instrumentation.POOL_TIMEOUTS.value("test") == timeouts + 1
+
+        metrics = REGISTRY.render()
+        assert _sample(metrics, 'db_pool_checked_out{pool="test"}') == 2
+        assert _sample(metrics, 'db_pool_capacity{pool="test"}') == 2
+        assert _sample(metrics, 'db_pool_saturation{pool="test"}') == 1
+    finally:
+        for connection in held:
+            connection.close()
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+    assert instrumentation.POOL_WAIT.count("test") == 4
+
+    # checkouts of the pool that replaces a disposed one are timed too.
+    engine.dispose()
+    with engine.connect():
+        pass
+    assert instrumentation.POOL_WAIT.count("test") == 5
+
+
+def test_unbounded_pools_report_no_capacity(tmp_path):
+    # a pool_size of 0 lets QueuePool open any number of connections.
+    engine = create_engine(
+        f"sqlite:///{tmp_path}/unbounded.db",
+        poolclass=instrumentation.TimedQueuePool,
+        pool_size=0,
+        max_overflow=0,
+    )
+    instrumentation.instrument_pool(engine, "unbounded")
+    with engine.connect(), engine.connect():
+        metrics = REGISTRY.render()
+    assert instrumentation.POOL_WAIT.count("unbounded") == 2
+    assert _sample(metrics, 'db_pool_capacity{pool="unbounded"}') is None
+    assert _sample(metrics, 'db_pool_saturation{pool="unbounded"}') is None
@@ -0,0 +1,65 @@
+import copy
+import pickle
+from dataclasses import FrozenInstanceError, replace
+
+import pytest
+
+from trading_execution_system.db.settings import TradeORMRepository
+from trading_execution_system.models.enums import TradeState
+from trading_execution_system.models.trade import Trade, TradeDetails
+from trading_execution_system.schemas.trade import TradeDetailsSchema
+from trading_execution_system.services.trade import TradeService
+from tests.test_trades import create_sample_trade_payload
+
+
+def _details() -> TradeDetails:
+    payload = create_sample_trade_payload()["details"]
+    return TradeDetails(**TradeDetailsSchema.model_validate(payload).model_dump())
+
+
+def test_models_are_slotted_and_details_immutable():
+    trade = Trade(requester_id="User1", details=_details())
+    trade.add_history("User1", "SUBMIT", TradeState.DRAFT)
+    for obj in (trade, trade.details, trade.history[0]):
+        assert not hasattr(obj, "__dict__")
+
+    with pytest.raises(FrozenInstanceError):
+        trade.details.strike = 1.0
+    assert trade.details.underlying == ("GBP", "USD")
+    # a transition snapshots the details without copying them.
+    assert trade.history[0].details_snapshot is trade.details
+
+    clone = copy.deepcopy(trade)
+    assert clone == trade and clone.history is not trade.history
+    assert clone.details is trade.details
+
+
+def test_models_survive_a_pickle_round_trip():
+    trade = Trade(requester_id="User1", details=_details())
+    trade.add_history("User1", "SUBMIT", TradeState.DRAFT)
+    for obj in (trade.details, trade.history[0], trade):
+        assert pickle.loads(pickle.dumps(obj)) == obj
+
+    loaded = pickle.loads(pickle.dumps(trade))
+    with pytest.raises(FrozenInstanceError):
+        loaded.details.strike = 1.0
+    assert loaded.history[0].details_snapshot is loaded.details
+
+
+def test_repeated_strings_are_interned():
+    first = replace(_details(), currency="".join(["G", "BP"]))
+    second = replace(_details(), currency="".join(["GB", "P"]))
+    assert first.currency is second.currency
+
+
+def test_loaded_history_shares_unchanged_details():
+    service = TradeService(TradeORMRepository())
+    trade = service.submit_trade("User1", _details())
+    service.approve_trade(trade.id, "admin")
+    service.send_to_execute(trade.id, "admin")
+
+    loaded = TradeORMRepository.get(str(trade.id))
+    submitted, approved, sent = loaded.history
+    assert submitted.details_snapshot is approved.details_snapshot
+    assert sent.details_snapshot is loaded.details
+    assert loaded.details.trade_date == trade.details.trade_date
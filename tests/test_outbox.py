@@ -0,0 +1,139 @@
+import asyncio
+
+from sqlalchemy import select
+
+import trading_execution_system.db.async_settings as async_db_settings
+from trading_execution_system.db.settings import OutboxModel
+from trading_execution_system.services.counterparty import FakeCounterpartyClient
+from trading_execution_system.services.dispatcher import OutboxDispatcher
+from tests.test_trades import create_sample_trade_payload
+
+BASE_URL = "/api/v1/async/trades"
+ADMIN = {"x-user-id": "admin"}
+
+
+def _sent_to_execute(client, count=1):
+    trade_ids = []
+    for _ in range(count):
+        response = client.post(
+            f"{BASE_URL}/",
+            json=create_sample_trade_payload(),
+            headers={"x-user-id": "User1"},
+        )
+        trade_id = response.json()["id"]
+        client.post(f"{BASE_URL}/{trade_id}/approve", headers=ADMIN)
+        response = client.post(f"{BASE_URL}/{trade_id}/send_to_execute", headers=ADMIN)
+        assert response.json()["state"] == "SENT_TO_COUNTERPARTY"
+        trade_ids.append(trade_id)
+    return trade_ids
+
+
+def _outbox():
+    async def rows():
+        async with async_db_settings.AsyncSessionLocal() as db:
+            return (await db.scalars(select(OutboxModel))).all()
+
+    return asyncio.run(rows())
+
+
+def test_send_to_execute_queues_one_message(client):
+    (trade_id,) = _sent_to_execute(client)
+    (message,) = _outbox()
+    assert (message.trade_id, message.action, message.status) == (
+        trade_id,
+        "SEND_TO_EXECUTE",
+        "PENDING",
+    )
+    assert message.payload["trade_id"] == trade_id
+    assert message.payload["details"]["currency"] == "GBP"
+
+
+def test_dispatcher_delivers_and_reports_latency(client):
+    trade_ids = _sent_to_execute(client, 3)
+    counterparty = FakeCounterpartyClient()
+    dispatcher = OutboxDispatcher(counterparty, batch_size=2)
+
+    asyncio.run(dispatcher.drain())
+    assert sorted(counterparty.trade_ids) == sorted(trade_ids)
+    assert {message.status for message in _outbox()} == {"DISPATCHED"}
+    stats = dispatcher.stats()
+    assert (stats.sent, stats.retried) == (3, 0)
+    assert stats.latency["p50"] >= 0
+
+    # dispatched messages are not sent again.
+    asyncio.run(dispatcher.drain())
+    assert sum(counterparty.attempts.values()) == 3
+
+
+def test_failed_sends_are_retried_then_given_up(client):
+    _sent_to_execute(client)
+    counterparty = FakeCounterpartyClient(failures=2)
+    dispatcher = OutboxDispatcher(counterparty, retry_delay=0)
+    asyncio.run(dispatcher.drain())
+    (message,) = _outbox()
+    assert (message.status, message.attempts) == ("DISPATCHED", 3)
+    assert dispatcher.retried == 2
+
+    _sent_to_execute(client)
+    dispatcher = OutboxDispatcher(
+        FakeCounterpartyClient(failures=5), retry_delay=0, max_attempts=2
+    )
+    asyncio.run(dispatcher.drain())
+    failed = [message for message in _outbox() if message.status == "FAILED"]
+    assert len(failed) == 1
+    assert failed[0].attempts == 2
+    assert "Counterparty unavailable" in failed[0].last_error
+
+
+def test_backoff_grows_to_the_cap():
+    dispatcher = OutboxDispatcher(
+        FakeCounterpartyClient(), retry_delay=1, max_retry_delay=8
+    )
+    assert 0.5 <= dispatcher.backoff(1) <= 1
+    assert 2 <= dispatcher.backoff(3) <= 4
+    assert 4 <= dispatcher.backoff(10) <= 8
+
+
+def test_background_dispatcher_runs_until_stopped(client):
+    # the tests share one aiosqlite connection, so the messages are queued
+    # before the dispatcher starts polling it.
+    trade_ids = _sent_to_execute(client, 2)
+    counterparty = FakeCounterpartyClient()
+    dispatcher = OutboxDispatcher(counterparty, poll_interval=0.01)
+
+    async def run():
+        dispatcher.start()
+        for _ in range(200):
+            if len(counterparty.received) == 2:
+                break
+            await asyncio.sleep(0.01)
+        await dispatcher.stop()
+
+    asyncio.run(run())
+    assert sorted(counterparty.trade_ids) == sorted(trade_ids)
+
+
+def test_batch_send_to_execute_queues_messages_and_stats(client):
+    trade_ids = []
+    for _ in range(2):
+        response = client.post(
+            "/api/v1/trades/",
+            json=create_sample_trade_payload(),
+            headers={"x-user-id": "User1"},
+        )
+        trade_ids.append(response.json()["id"])
+    client.post(
+        "/api/v1/trades/batch/approve", json={"trade_ids": trade_ids}, headers=ADMIN
+    )
+    client.post(
+        "/api/v1/trades/batch/send_to_execute",
+        json={"trade_ids": trade_ids},
+        headers=ADMIN,
+    )
+
+    response = client.get("/api/v1/trades/outbox/stats", headers=ADMIN)
+    assert response.status_code == 200
+    assert (response.json()["pending"], response.json()["failed"]) == (2, 0)
+
+    response = client.get("/api/v1/trades/outbox/stats", headers={"x-user-id": "User1"})
+    assert response.status_code == 403
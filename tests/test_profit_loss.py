@@ -0,0 +1,113 @@
+from datetime import date, timedelta
+
+import pytest
+
+from trading_execution_system.core.dependencies import pnl_engine
+from tests.test_reports import _submit
+
+ADMIN = {"x-user-id": "admin"}
+
+
+@pytest.fixture
+def rates_file(tmp_path, monkeypatch):
+    path = tmp_path / "rates.csv"
+    path.write_text("currency,rate\nGBP,1.30\nUSD,1.00\n")
+    monkeypatch.setattr(pnl_engine, "rates_file", str(path))
+    return path
+
+
+def _execute(client, requester_id="User1", strike=1.25, **details):
+    trade_id = _submit(client, requester_id, **details)
+    client.post(f"/api/v1/trades/{trade_id}/approve", headers=ADMIN)
+    client.post(f"/api/v1/trades/{trade_id}/send_to_execute", headers=ADMIN)
+    response = client.post(
+        f"/api/v1/trades/{trade_id}/book", json={"strike": strike}, headers=ADMIN
+    )
+    assert response.json()["state"] == "EXECUTED"
+    return trade_id
+
+
+def _pnl(client, url="/api/v1/reports/profit-loss", headers=ADMIN):
+    response = client.get(url, headers=headers)
+    assert response.status_code == 200, response.json()
+    return response.json()
+
+
+def test_profit_loss_by_user(client, rates_file):
+    _execute(client, notional_amount=1000)
+    _execute(client, notional_amount=2000, direction="Sell", strike=1.20)
+    _execute(client, "User2", currency="USD", notional_amount=500, strike=0.90)
+    # not executed, so not in the book.
+    _submit(client, notional_amount=10_000)
+
+    report = _pnl(client)
+    groups = {group["key"]: group for group in report["groups"]}
+    assert groups["User1"]["count"] == 2
+    assert groups["User1"]["notional"] == 3000
+    # bought 1000 at 1.25 and sold 2000 at 1.20, GBP is now at 1.30.
+    assert groups["User1"]["pnl"] == pytest.approx(1000 * 0.05 - 2000 * 0.10)
+    assert groups["User2"]["pnl"] == pytest.approx(500 * 0.10)
+    assert report["pnl"] == pytest.approx(-150 + 50)
+    assert report["unpriced"] == 0
+
+    # users only ever see their own P&L.
+    report = _pnl(client, headers={"x-user-id": "User2"})
+    assert [group["key"] for group in report["groups"]] == ["User2"]
+
+
+def test_profit_loss_by_period(client, rates_file):
+    later = date.today() + timedelta(days=400)
+    _execute(client, notional_amount=1000)
+    _execute(
+        client,
+        notional_amount=1000,
+        value_date=later.isoformat(),
+        delivery_date=(later + timedelta(days=1)).isoformat(),
+    )
+    report = _pnl(client, "/api/v1/reports/profit-loss?group_by=period&period=year")
+    tomorrow = date.today() + timedelta(days=1)
+    assert [group["key"] for group in report["groups"]] == sorted(
+        {tomorrow.replace(month=1, day=1).isoformat(), f"{later.year}-01-01"}
+    )
+    assert sum(group["count"] for group in report["groups"]) == 2
+
+    response = client.get(
+        "/api/v1/reports/profit-loss?group_by=counterparty", headers=ADMIN
+    )
+    assert response.status_code == 422
+
+
+def test_revaluation_follows_the_rate_file_and_book(client, rates_file):
+    _execute(client, notional_amount=1000)
+    _execute(client, currency="EUR", notional_amount=1000)
+
+    report = _pnl(client)
+    assert report["pnl"] == pytest.approx(50)
+    # no EUR rate, the trade is reported but left out of the sums.
+    assert (report["count"], report["unpriced"]) == (1, 1)
+    assert _pnl(client) == report
+
+    rates_file.write_text("currency,rate\nGBP,1.20\nEUR,1.35\n")
+    revalued = _pnl(client)
+    assert revalued["rate_snapshot"] != report["rate_snapshot"]
+    assert revalued["pnl"] == pytest.approx(-50 + 100)
+
+    _execute(client, notional_amount=1000, strike=1.10)
+    assert _pnl(client)["pnl"] == pytest.approx(-50 + 100 + 100)
+
+
+def test_directions_are_matched_whatever_the_case(client, rates_file):
+    _execute(client, notional_amount=1000, direction="SELL")
+    _execute(client, notional_amount=1000, direction=" buy ")
+    # an unknown direction is not valued as a buy.
+    _execute(client, notional_amount=1000, direction="Hold")
+
+    report = _pnl(client)
+    assert report["pnl"] == pytest.approx(-50 + 50)
+    assert (report["count"], report["unpriced"]) == (2, 1)
+
+
+def test_missing_rate_file(client, rates_file):
+    rates_file.unlink()
+    response = client.get("/api/v1/reports/profit-loss", headers=ADMIN)
+    assert response.status_code == 400
@@ -0,0 +1,170 @@
+import logging
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from tests.test_trades import create_sample_trade_payload
+import trading_execution_system.core.query_budget as query_budget
+import trading_execution_system.db.settings as db_settings
+from trading_execution_system.api.v1.routes import async_trades, trades
+from trading_execution_system.core.dependencies import trade_cache
+from trading_execution_system.core.exceptions import QueryBudgetExceededError
+from trading_execution_system.core.metrics import (
+    QUERY_BUDGET_EXCEEDED,
+    MetricsMiddleware,
+)
+
+BASE_URL = "/api/v1/trades"
+ASYNC_BASE_URL = "/api/v1/async/trades"
+REQUESTER_HEADERS = {"x-user-id": "User1"}
+ADMIN_HEADERS = {"x-user-id": "admin"}
+
+
+def _over_budget_app():
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/two-queries")
+    @query_budget.query_budget(1)
+    def two_queries():
+        with db_settings.SessionLocal() as db:
+            db.execute(text("SELECT 1"))
+            db.execute(text("SELECT 2"))
+        return {}
+
+    return app
+
+
+def test_every_trade_route_has_a_budget():
+    assert [
+        route.path
+        for router in (trades.router, async_trades.router)
+        for route in router.routes
+        if query_budget.budget_of(route) is None
+    ] == []
+
+
+def test_routes_stay_within_their_budget_from_a_cold_cache(client):
+    """every request below fails the test if it goes over its route's budget"""
+
+    def call(method, url, headers, **kwargs):
+        trade_cache.clear()
+        response = getattr(client, method)(url, headers=headers, **kwargs)
+        assert response.status_code == 200, response.text
+        return response
+
+    payload = create_sample_trade_payload()
+    trade_id = call("post", f"{BASE_URL}/", REQUESTER_HEADERS, json=payload).json()[
+        "id"
+    ]
+    details = dict(payload["details"], underlying=["EUR", "USD"])
+    call("post", f"{BASE_URL}/bulk", REQUESTER_HEADERS, json={"trades": [details] * 3})
+    call(
+        "post",
+        f"{BASE_URL}/{trade_id}/update",
+        REQUESTER_HEADERS,
+        json={"user_id": "User1", "details": details},
+    )
+    for action in ("approve", "send_to_execute"):
+        call("post", f"{BASE_URL}/{trade_id}/{action}", ADMIN_HEADERS)
+    call("post", f"{BASE_URL}/{trade_id}/book", REQUESTER_HEADERS, json={"strike": 1})
+    call("get", f"{BASE_URL}/{trade_id}/history", REQUESTER_HEADERS)
+    call("get", f"{BASE_URL}/{trade_id}/diff?from_index=0&to_index=3", ADMIN_HEADERS)
+    call("get", f"{BASE_URL}/{trade_id}/status", REQUESTER_HEADERS)
+
+    trade_ids = [
+        call("post", f"{BASE_URL}/", REQUESTER_HEADERS, json=payload).json()["id"]
+        for _ in range(3)
+    ]
+    call("post", f"{BASE_URL}/{trade_ids[0]}/cancel", REQUESTER_HEADERS)
+    for action in ("approve", "send_to_execute"):
+        call(
+            "post",
+            f"{BASE_URL}/batch/{action}",
+            ADMIN_HEADERS,
+            json={"trade_ids": trade_ids},
+        )
+    call("get", f"{BASE_URL}/cache/stats", ADMIN_HEADERS)
+    call("get", f"{BASE_URL}/outbox/stats", ADMIN_HEADERS)
+    call("get", f"{BASE_URL}/?view=full", ADMIN_HEADERS)
+    call("get", f"{BASE_URL}/export?include_history=true", ADMIN_HEADERS)
+
+
+def test_async_routes_stay_within_their_budget(client):
+    def call(method, url, headers, **kwargs):
+        response = getattr(client, method)(url, headers=headers, **kwargs)
+        assert response.status_code == 200, response.text
+        return response
+
+    payload = create_sample_trade_payload()
+    trade_ids = [
+        call("post", f"{ASYNC_BASE_URL}/", REQUESTER_HEADERS, json=payload).json()["id"]
+        for _ in range(2)
+    ]
+    trade_id = trade_ids[0]
+    details = dict(payload["details"], underlying=["EUR", "USD"])
+    call(
+        "post",
+        f"{ASYNC_BASE_URL}/{trade_id}/update",
+        REQUESTER_HEADERS,
+        json={"user_id": "User1", "details": details},
+    )
+    for action in ("approve", "send_to_execute"):
+        call("post", f"{ASYNC_BASE_URL}/{trade_id}/{action}", ADMIN_HEADERS)
+    call(
+        "post",
+        f"{ASYNC_BASE_URL}/{trade_id}/book",
+        REQUESTER_HEADERS,
+        json={"strike": 1},
+    )
+    call("post", f"{ASYNC_BASE_URL}/{trade_ids[1]}/cancel", REQUESTER_HEADERS)
+    call("get", f"{ASYNC_BASE_URL}/{trade_id}/history", REQUESTER_HEADERS)
+    call(
+        "get",
+        f"{ASYNC_BASE_URL}/{trade_id}/diff?from_index=0&to_index=3",
+        ADMIN_HEADERS,
+    )
+    call("get", f"{ASYNC_BASE_URL}/{trade_id}/status", REQUESTER_HEADERS)
+    call("get", f"{ASYNC_BASE_URL}/?view=full", ADMIN_HEADERS)
+
+
+def test_export_budget_grows_with_its_batches(client, query_counter, monkeypatch):
+    monkeypatch.setattr(db_settings, "EXPORT_BATCH_SIZE", 2)
+    details = create_sample_trade_payload()["details"]
+    client.post(
+        f"{BASE_URL}/bulk", json={"trades": [details] * 5}, headers=REQUESTER_HEADERS
+    )
+
+    query_counter.reset()
+    response = client.get(
+        f"{BASE_URL}/export?include_history=true", headers=ADMIN_HEADERS
+    )
+    assert len(response.text.splitlines()) == 5
+    # three batches, each loading its underlyings and history.
+    assert query_counter.count == 7
+
+
+def test_over_budget_raises_in_tests():
+    before = QUERY_BUDGET_EXCEEDED.value("/two-queries")
+    with pytest.raises(QueryBudgetExceededError, match="ran 2 SQL statements"):
+        TestClient(_over_budget_app()).get("/two-queries")
+    assert QUERY_BUDGET_EXCEEDED.value("/two-queries") == before + 1
+
+
+def test_over_budget_fails_the_request():
+    client = TestClient(_over_budget_app(), raise_server_exceptions=False)
+    response = client.get("/two-queries")
+    # the budget is checked before the route's 200 is sent.
+    assert response.status_code == 500
+
+
+def test_over_budget_logs_in_production(monkeypatch, caplog):
+    monkeypatch.setattr(query_budget, "mode", "log")
+    with caplog.at_level(logging.ERROR, logger=query_budget.__name__):
+        response = TestClient(_over_budget_app()).get("/two-queries")
+    assert response.status_code == 200
+    assert caplog.messages == [
+        "/two-queries ran 2 SQL statements, its query budget is 1"
+    ]
@@ -0,0 +1,104 @@
+from datetime import date
+
+from sqlalchemy.dialects import postgresql
+
+from tests.test_trades import create_sample_trade_payload
+from trading_execution_system.db.reports import (
+    _grouping_set_rows,
+    _select_grouping_sets,
+)
+from trading_execution_system.models.report import ReportQuery
+
+ADMIN = {"x-user-id": "admin"}
+
+
+def _submit(client, requester_id="User1", **details):
+    payload = create_sample_trade_payload(requester_id)
+    payload["details"].update(details)
+    response = client.post(
+        "/api/v1/trades/", json=payload, headers={"x-user-id": requester_id}
+    )
+    return response.json()["id"]
+
+
+def _groups(report, dimension):
+    return {
+        group["key"]: (group["count"], group["notional"]) for group in report[dimension]
+    }
+
+
+def test_report_aggregates_every_dimension(client):
+    _submit(client, notional_amount=100)
+    _submit(client, notional_amount=200, currency="USD", direction="Sell")
+    approved = _submit(client, "User2", notional_amount=50, counterparty="EntityC")
+    client.post(f"/api/v1/trades/{approved}/approve", headers=ADMIN)
+
+    response = client.get("/api/v1/reports/trades", headers=ADMIN)
+    assert response.status_code == 200
+    report = response.json()
+    assert (report["count"], report["notional"]) == (3, 350)
+    assert _groups(report, "by_state") == {
+        "APPROVED": (1, 50),
+        "PENDING_APPROVAL": (2, 300),
+    }
+    assert _groups(report, "by_counterparty") == {
+        "EntityB": (2, 300),
+        "EntityC": (1, 50),
+    }
+    assert _groups(report, "by_currency") == {"GBP": (2, 150), "USD": (1, 200)}
+    assert _groups(report, "by_direction") == {"Buy": (2, 150), "Sell": (1, 200)}
+    month = date.today().replace(day=1).isoformat()
+    assert _groups(report, "by_trade_date") == {month: (3, 350)}
+
+    response = client.get("/api/v1/reports/trades?bucket=day", headers=ADMIN)
+    (day,) = response.json()["by_trade_date"]
+    assert day["key"] == date.today().isoformat()
+
+
+def test_report_filters_and_visibility(client):
+    _submit(client, notional_amount=100)
+    _submit(client, "User2", notional_amount=50)
+
+    response = client.get("/api/v1/reports/trades?requester_id=User2", headers=ADMIN)
+    assert response.json()["notional"] == 50
+
+    # users only ever see their own trades, whatever they ask for.
+    response = client.get(
+        "/api/v1/reports/trades?requester_id=User2", headers={"x-user-id": "User1"}
+    )
+    assert response.json()["notional"] == 100
+
+    tomorrow = date.fromordinal(date.today().toordinal() + 1).isoformat()
+    response = client.get(
+        f"/api/v1/reports/trades?trade_date_from={tomorrow}", headers=ADMIN
+    )
+    assert response.json()["count"] == 0
+    assert response.json()["by_state"] == []
+
+    response = client.get("/api/v1/reports/trades?bucket=week", headers=ADMIN)
+    assert response.status_code == 422
+
+
+def test_grouping_sets_statement_for_postgresql():
+    # the suite runs on SQLite, check the PostgreSQL statement and its decoding.
+    statement = _select_grouping_sets(ReportQuery(requester_id="User1"))
+    sql = " ".join(str(statement.compile(dialect=postgresql.dialect())).split())
+    assert sql.endswith(
+        "WHERE trades.requester_id = %(requester_id_1)s GROUP BY GROUPING SETS("
+        "(trades.state), (trades.counterparty), (trades.currency), "
+        "(trades.direction), (trades.trade_date))"
+    )
+    assert "grouping(trades.state)" in sql and "count(*)" in sql
+
+    day = date(2025, 1, 2)
+    rows = _grouping_set_rows(
+        [
+            ("APPROVED", None, None, None, None, 0, 1, 1, 1, 1, 2, 300),
+            (None, None, "GBP", None, None, 1, 1, 0, 1, 1, 2, 300),
+            (None, None, None, None, day, 1, 1, 1, 1, 0, 2, 300),
+        ]
+    )
+    assert rows["by_state"] == [("APPROVED", 2, 300)]
+    assert rows["by_currency"] == [("GBP", 2, 300)]
+    assert rows["by_trade_date"] == [(day, 2, 300)]
+    assert rows["by_counterparty"] == rows["by_direction"] == []
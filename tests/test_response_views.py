@@ -0,0 +1,70 @@
+from tests.test_trades import create_sample_trade_payload
+
+HEADERS = {"x-user-id": "User1"}
+ADMIN = {"x-user-id": "admin"}
+
+
+def _trade_with_history(client, updates=3):
+    payload = create_sample_trade_payload()
+    trade_id = client.post("/api/v1/trades/", json=payload, headers=HEADERS).json()[
+        "id"
+    ]
+    for i in range(updates):
+        payload["details"]["notional_amount"] = 1000 + i
+        client.post(
+            f"/api/v1/trades/{trade_id}/update",
+            json={"user_id": "User1", "details": payload["details"]},
+            headers=HEADERS,
+        )
+    return trade_id
+
+
+def test_list_leaves_history_out_unless_asked(client, query_counter):
+    _trade_with_history(client)
+
+    query_counter.reset()
+    response = client.get("/api/v1/trades/", headers=HEADERS)
+    (trade,) = response.json()
+    assert set(trade) == {"id", "state", "details"}
+    # the history is not loaded either.
+    assert not any(
+        "trade_history" in statement for statement in query_counter.statements
+    )
+
+    response = client.get(
+        "/api/v1/trades/?include_history=true&history_offset=1&history_limit=2",
+        headers=HEADERS,
+    )
+    (trade,) = response.json()
+    assert [record["action"] for record in trade["history"]] == ["UPDATE", "UPDATE"]
+
+
+def test_sparse_fieldsets_on_actions_and_lists(client):
+    trade_id = _trade_with_history(client, updates=1)
+
+    response = client.post(
+        f"/api/v1/trades/{trade_id}/approve?fields=id,state", headers=ADMIN
+    )
+    assert response.status_code == 200
+    assert response.json() == {"id": trade_id, "state": "APPROVED"}
+
+    response = client.post(
+        f"/api/v1/trades/{trade_id}/send_to_execute?include_history=false",
+        headers=ADMIN,
+    )
+    assert "history" not in response.json()
+    assert response.json()["details"]["currency"] == "GBP"
+
+    response = client.get("/api/v1/trades/?fields=state", headers=HEADERS)
+    assert response.json() == [{"state": "SENT_TO_COUNTERPARTY"}]
+
+    response = client.get("/api/v1/trades/?fields=id,owner", headers=HEADERS)
+    assert response.status_code == 400
+
+
+def test_history_endpoint_pages(client):
+    trade_id = _trade_with_history(client, updates=4)
+    response = client.get(
+        f"/api/v1/trades/{trade_id}/history?offset=3&limit=10", headers=HEADERS
+    )
+    assert len(response.json()["history"]) == 2
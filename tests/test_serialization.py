@@ -0,0 +1,70 @@
+import json
+from dataclasses import asdict
+
+from fastapi.encoders import jsonable_encoder
+
+from trading_execution_system.models.enums import TradeState
+from trading_execution_system.models.trade import Trade, TradeDetails
+from trading_execution_system.schemas.trade import (
+    TradeDetailsSchema,
+    TradeResponse,
+    TradeView,
+    trade_payload,
+)
+from trading_execution_system.utils.serialization import (
+    TradeJSONResponse,
+    _default,
+    dumps,
+)
+from tests.test_trades import create_sample_trade_payload
+
+
+def _trade() -> Trade:
+    schema = TradeDetailsSchema.model_validate(create_sample_trade_payload()["details"])
+    details = TradeDetails(**schema.model_dump())
+    trade = Trade(requester_id="User1", details=details)
+    trade.state = TradeState.PENDING_APPROVAL
+    trade.add_history("User1", "SUBMIT", TradeState.DRAFT)
+    return trade
+
+
+def test_fast_path_matches_the_pydantic_encoding():
+    trade = _trade()
+    validated = TradeResponse(
+        id=trade.id,
+        state=trade.state.name,
+        details=asdict(trade.details),
+        history=[asdict(record) for record in trade.history],
+    )
+    expected = jsonable_encoder(validated)
+
+    assert json.loads(TradeJSONResponse(trade_payload(trade)).body) == expected
+    view = TradeView(fields=frozenset({"id", "state"}))
+    assert json.loads(dumps(trade_payload(trade, view))) == {
+        "id": str(trade.id),
+        "state": "PENDING_APPROVAL",
+    }
+
+
+def test_standard_library_fallback_encodes_the_same():
+    payload = trade_payload(_trade())
+    fallback = json.dumps(payload, default=_default)
+    assert json.loads(fallback) == json.loads(dumps(payload))
+
+
+def test_responses_are_encoded_by_the_fast_path(client):
+    response = client.post(
+        "/api/v1/trades/",
+        json=create_sample_trade_payload(),
+        headers={"x-user-id": "User1"},
+    )
+    assert response.status_code == 200
+    assert response.headers["ETag"] == '"1"'
+    trade = response.json()
+    assert (
+        trade["details"]["trade_date"]
+        == create_sample_trade_payload()["details"]["trade_date"]
+    )
+    (record,) = trade["history"]
+    assert record["action"] == "SUBMIT"
+    assert record["new_state"] == TradeState.PENDING_APPROVAL.value
@@ -0,0 +1,100 @@
+import asyncio
+import socket
+import threading
+import time
+
+import anyio.to_thread
+import httpx
+import pytest
+import uvicorn
+from fastapi import FastAPI
+
+import trading_execution_system.__main__ as server
+from trading_execution_system.core.config import SERVER_THREAD_LIMIT, trade_cache_size
+
+
+def test_development_profile_reloads_one_process():
+    options = server.server_options("development")
+    assert options["reload"] is True
+    assert "workers" not in options
+
+
+def test_production_profile():
+    options = server.server_options("production")
+    assert options["reload"] is False
+    assert options["workers"] == server.SERVER_WORKERS
+    assert options["loop"] == ("uvloop" if server._installed("uvloop") else "asyncio")
+    assert options["http"] == ("httptools" if server._installed("httptools") else "h11")
+    assert options["timeout_graceful_shutdown"] == server.SERVER_GRACEFUL_TIMEOUT
+
+    with pytest.raises(ValueError, match="Unknown server profile"):
+        server.server_options("staging")
+
+
+def test_launcher_passes_the_worker_count_on(monkeypatch):
+    monkeypatch.setenv("WEB_CONCURRENCY", "1")
+    monkeypatch.setattr(server, "server_options", lambda: {"workers": 4})
+    monkeypatch.setattr(server.uvicorn, "run", lambda app, **options: None)
+    server.main()
+    assert server.os.environ["WEB_CONCURRENCY"] == "4"
+
+
+def test_trade_cache_needs_a_ttl_with_several_workers():
+    assert trade_cache_size(None, None, 1) == 10000
+    assert trade_cache_size("50", None, 1) == 50
+    assert trade_cache_size(None, None, 4) == 0
+    assert trade_cache_size("0", None, 4) == 0
+    assert trade_cache_size(None, 5.0, 4) == 10000
+    assert trade_cache_size("50", 5.0, 4) == 50
+
+    with pytest.raises(ValueError, match="needs a TRADE_CACHE_TTL"):
+        trade_cache_size("50", None, 4)
+
+
+def test_thread_limiter_is_sized_at_startup(client):
+    async def total_tokens():
+        return anyio.to_thread.current_default_thread_limiter().total_tokens
+
+    assert client.portal.call(total_tokens) == SERVER_THREAD_LIMIT
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def test_shutdown_drains_requests_in_flight():
+    app = FastAPI()
+    started = threading.Event()
+
+    @app.get("/slow")
+    async def slow():
+        started.set()
+        await asyncio.sleep(0.5)
+        return {"done": True}
+
+    options = server.server_options("production")
+    for option in ("workers", "reload"):
+        options.pop(option)
+    options.update(host="127.0.0.1", port=_free_port(), log_level="warning")
+    uvicorn_server = uvicorn.Server(uvicorn.Config(app, **options))
+    thread = threading.Thread(target=uvicorn_server.run)
+    thread.start()
+    while not uvicorn_server.started:
+        time.sleep(0.01)
+
+    url = f"http://127.0.0.1:{options['port']}/slow"
+    responses = []
+    request = threading.Thread(target=lambda: responses.append(httpx.get(url)))
+    request.start()
+    assert started.wait(5)
+    # what the SIGTERM handler does.
+    uvicorn_server.should_exit = True
+    request.join()
+    thread.join(5)
+
+    assert responses[0].status_code == 200
+    assert responses[0].json() == {"done": True}
+    with pytest.raises(httpx.ConnectError):
+        httpx.get(url)
@@ -0,0 +1,119 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from tests.test_trades import create_sample_trade_payload
+import trading_execution_system.db.settings as db_settings
+from trading_execution_system.core.dependencies import get_trade_service, trade_cache
+from trading_execution_system.db.instrumentation import TimedAsyncAdaptedQueuePool
+
+BASE_URL = "/api/v1/trades"
+REQUESTER_HEADERS = {"x-user-id": "User1"}
+ADMIN_HEADERS = {"x-user-id": "admin"}
+
+
+@pytest.fixture
+def sessions_opened(monkeypatch):
+    opened = []
+    factory = db_settings.SessionLocal
+
+    def counting_factory():
+        opened.append(factory())
+        return opened[-1]
+
+    monkeypatch.setattr(db_settings, "SessionLocal", counting_factory)
+    return opened
+
+
+def test_one_session_per_request(client, sessions_opened):
+    response = client.post(
+        f"{BASE_URL}/", json=create_sample_trade_payload(), headers=REQUESTER_HEADERS
+    )
+    trade_id = response.json()["id"]
+    trade_cache.clear()
+    sessions_opened.clear()
+
+    # the ownership check, the load and the write of the approval.
+    response = client.post(f"{BASE_URL}/{trade_id}/approve", headers=ADMIN_HEADERS)
+    assert response.status_code == 200
+    response = client.get(f"{BASE_URL}/{trade_id}/history", headers=ADMIN_HEADERS)
+    assert [record["action"] for record in response.json()["history"]] == [
+        "SUBMIT",
+        "APPROVE",
+    ]
+    assert len(sessions_opened) == 2
+    assert db_settings.request_session.get() is None
+
+
+def test_calls_outside_a_request_open_their_own_session(client, sessions_opened):
+    details = create_sample_trade_payload()["details"]
+    response = client.post(
+        f"{BASE_URL}/bulk", json={"trades": [details]}, headers=REQUESTER_HEADERS
+    )
+    trade_id = response.json()["results"][0]["id"]
+    trade_cache.clear()
+    sessions_opened.clear()
+
+    service = get_trade_service()
+    service.get_trade_status(trade_id)
+    service.get_full_trade(trade_id)
+    assert len(sessions_opened) == 2
+
+
+def test_a_failed_call_leaves_the_request_session_usable():
+    with db_settings.SessionLocal() as db:
+        token = db_settings.request_session.set(db)
+        try:
+            with pytest.raises(OperationalError):
+                with db_settings.session() as shared:
+                    shared.execute(text("SELECT * FROM no_such_table"))
+            with db_settings.session() as shared:
+                assert shared is db
+                assert shared.execute(text("SELECT 1")).scalar() == 1
+        finally:
+            db_settings.request_session.reset(token)
+
+
+def test_pool_options():
+    assert db_settings.pool_options("sqlite:///:memory:").keys() == {
+        "pool_pre_ping",
+        "pool_recycle",
+    }
+    for url in ("sqlite:///./trades.db", "postgresql://user@localhost/trades"):
+        assert db_settings.pool_options(url).keys() == {
+            "pool_pre_ping",
+            "pool_recycle",
+            "poolclass",
+            "pool_size",
+            "max_overflow",
+            "pool_timeout",
+        }
+    assert (
+        db_settings.pool_options("postgresql+asyncpg://user@localhost/trades")[
+            "poolclass"
+        ]
+        is TimedAsyncAdaptedQueuePool
+    )
+
+
+def test_sqlite_readers_do_not_block_the_writer(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/wal.db")
+    db_settings.sqlite_pragmas(engine)
+    with engine.begin() as connection:
+        assert connection.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert connection.execute(text("PRAGMA synchronous")).scalar() == 1
+        connection.execute(text("CREATE TABLE t (x INTEGER)"))
+        connection.execute(text("INSERT INTO t VALUES (1)"))
+
+    with engine.connect() as reader, engine.connect() as writer:
+        reader.exec_driver_sql("BEGIN")
+        assert reader.execute(text("SELECT count(*) FROM t")).scalar() == 1
+        # with a rollback journal the commit would wait for the reader.
+        writer.exec_driver_sql("PRAGMA busy_timeout=0")
+        writer.execute(text("INSERT INTO t VALUES (2)"))
+        writer.commit()
+        # the reader keeps its snapshot until its transaction ends.
+        assert reader.execute(text("SELECT count(*) FROM t")).scalar() == 1
+        reader.exec_driver_sql("COMMIT")
+        assert reader.execute(text("SELECT count(*) FROM t")).scalar() == 2
+    engine.dispose()
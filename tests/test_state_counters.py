@@ -0,0 +1,107 @@
+from sqlalchemy import func, select, update
+
+import trading_execution_system.db.settings as db_settings
+from trading_execution_system.db.counters import StateCountRepository
+from trading_execution_system.db.settings import StateCountModel, TradeModel
+from tests.test_reports import _submit
+from tests.test_trades import create_sample_trade_payload
+
+ADMIN = {"x-user-id": "admin"}
+
+
+def _recounted(requester_id=None):
+    statement = select(TradeModel.state, func.count()).group_by(TradeModel.state)
+    if requester_id is not None:
+        statement = statement.where(TradeModel.requester_id == requester_id)
+    with db_settings.SessionLocal() as db:
+        return dict(db.execute(statement).all())
+
+
+def _summary(client, url="/api/v1/reports/summary", headers=ADMIN):
+    response = client.get(url, headers=headers)
+    assert response.status_code == 200, response.json()
+    return response.json()
+
+
+def _nonzero(counts):
+    return {state: count for state, count in counts.items() if count}
+
+
+def test_counters_follow_every_state_change(client):
+    approved = _submit(client)
+    updated = _submit(client)
+    cancelled = _submit(client, "User2")
+    client.post(f"/api/v1/trades/{approved}/approve", headers=ADMIN)
+    client.post(f"/api/v1/trades/{approved}/send_to_execute", headers=ADMIN)
+    client.post(f"/api/v1/trades/{updated}/approve", headers=ADMIN)
+    payload = create_sample_trade_payload()
+    client.post(
+        f"/api/v1/trades/{updated}/update",
+        json={"user_id": "User1", "details": payload["details"]},
+        headers={"x-user-id": "User1"},
+    )
+    client.post(f"/api/v1/trades/{cancelled}/cancel", headers=ADMIN)
+    bulk = client.post(
+        "/api/v1/trades/bulk",
+        json={"trades": [payload["details"]] * 3},
+        headers={"x-user-id": "User1"},
+    ).json()
+    client.post(
+        "/api/v1/trades/batch/approve",
+        json={"trade_ids": [trade["id"] for trade in bulk["results"]][:2]},
+        headers=ADMIN,
+    )
+
+    summary = _summary(client)
+    assert summary["requester_id"] is None
+    assert (
+        _nonzero(summary["counts"])
+        == _recounted()
+        == {
+            "SENT_TO_COUNTERPARTY": 1,
+            "NEEDS_REAPPROVAL": 1,
+            "CANCELLED": 1,
+            "APPROVED": 2,
+            "PENDING_APPROVAL": 1,
+        }
+    )
+    assert summary["total"] == 6
+
+    summary = _summary(client, "/api/v1/reports/summary?requester_id=User2")
+    assert _nonzero(summary["counts"]) == _recounted("User2") == {"CANCELLED": 1}
+
+
+def test_users_only_see_their_own_counts(client):
+    _submit(client)
+    _submit(client, "User2")
+    summary = _summary(client, headers={"x-user-id": "User2"})
+    assert summary["requester_id"] == "User2"
+    assert summary["total"] == 1
+    assert set(summary["counts"]) == {
+        "DRAFT",
+        "PENDING_APPROVAL",
+        "NEEDS_REAPPROVAL",
+        "APPROVED",
+        "SENT_TO_COUNTERPARTY",
+        "EXECUTED",
+        "CANCELLED",
+    }
+
+
+def test_rebuild_recomputes_drifted_counters(client):
+    _submit(client)
+    _submit(client, "User2")
+    with db_settings.SessionLocal() as db:
+        db.execute(
+            update(StateCountModel)
+            .where(StateCountModel.state == "PENDING_APPROVAL")
+            .values(count=42)
+        )
+        db.commit()
+    assert _summary(client, headers={"x-user-id": "User2"})["total"] == 42
+    # the totals are kept apart and did not drift.
+    assert _summary(client)["total"] == 2
+
+    StateCountRepository.rebuild()
+    assert _summary(client, headers={"x-user-id": "User2"})["total"] == 1
+    assert _nonzero(_summary(client)["counts"]) == {"PENDING_APPROVAL": 2}
@@ -0,0 +1,95 @@
+from trading_execution_system.core.dependencies import trade_cache
+from trading_execution_system.db.cache import LRUCache, TradeCache
+from trading_execution_system.db.settings import TradeORMRepository
+from trading_execution_system.models.trade import Trade
+from trading_execution_system.services.trade import TradeService
+from tests.test_trades import create_sample_trade_payload
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    stats = cache.stats()
+    assert (stats.hits, stats.misses, stats.evictions, stats.size) == (3, 1, 1, 2)
+
+
+def test_lru_cache_entries_expire_after_ttl():
+    now = [0.0]
+    cache = LRUCache(max_size=10, ttl=5, clock=lambda: now[0])
+    cache.set("a", 1)
+    now[0] = 5
+    assert cache.get("a") == 1
+    now[0] = 5.1
+    assert cache.get("a") is None
+    assert cache.stats().size == 0
+
+
+def test_stale_read_does_not_overwrite_a_newer_write():
+    cache = TradeCache(LRUCache(max_size=10))
+    trade = Trade(requester_id="User1")
+    generation = cache.generation
+    # a transition is stored while the read is still loading the old row.
+    cache.store(trade)
+    cache.fill(Trade(id=trade.id, requester_id="stale"), generation)
+    assert cache.get(str(trade.id)).requester_id == "User1"
+
+
+def test_reads_are_served_from_cache_and_transitions_refresh_it(client, query_counter):
+    headers = {"x-user-id": "User1"}
+    response = client.post(
+        "/api/v1/trades/", json=create_sample_trade_payload(), headers=headers
+    )
+    trade_id = response.json()["id"]
+
+    # the trade comes from the cache, the owner check reads its summary.
+    query_counter.reset()
+    response = client.get(f"/api/v1/trades/{trade_id}/history", headers=headers)
+    assert response.status_code == 200
+    assert query_counter.count == 1
+
+    response = client.post(
+        f"/api/v1/trades/{trade_id}/approve", headers={"x-user-id": "admin"}
+    )
+    assert response.status_code == 200
+
+    query_counter.reset()
+    response = client.get(f"/api/v1/trades/{trade_id}/status", headers=headers)
+    assert response.json()["state"] == "APPROVED"
+    assert query_counter.count == 1
+
+    # a cached trade handed to a request is a copy.
+    trade_cache.get(trade_id).state = None
+    assert trade_cache.get(trade_id).state is not None
+
+    response = client.get("/api/v1/trades/cache/stats", headers={"x-user-id": "admin"})
+    assert response.status_code == 200
+    assert response.json()["hits"] > 0
+    response = client.get("/api/v1/trades/cache/stats", headers=headers)
+    assert response.status_code == 403
+
+
+def test_status_is_read_past_the_cache(client):
+    headers = {"x-user-id": "User1"}
+    response = client.post(
+        "/api/v1/trades/", json=create_sample_trade_payload(), headers=headers
+    )
+    trade_id = response.json()["id"]
+    assert trade_cache.get(trade_id) is not None
+
+    # another worker approves the trade, this process's cache is not told.
+    TradeService(TradeORMRepository()).approve_trade(trade_id, "admin")
+
+    response = client.get(f"/api/v1/trades/{trade_id}/status", headers=headers)
+    assert response.json()["state"] == "APPROVED"
+    assert response.headers["ETag"] == '"2"'
+    response = client.get(
+        f"/api/v1/trades/{trade_id}/diff?from_index=0&to_index=1", headers=headers
+    )
+    assert response.status_code == 200
@@ -0,0 +1,74 @@
+from tests.test_trades import create_sample_trade_payload, TOMORROW_ISO
+
+ADMIN_HEADERS = {"x-user-id": "admin"}
+
+
+def _submit(client, requester_id="User1", **details):
+    payload = create_sample_trade_payload(requester_id)
+    payload["details"].update(details)
+    response = client.post(
+        "/api/v1/trades/", json=payload, headers={"x-user-id": requester_id}
+    )
+    assert response.status_code == 200, response.json()
+    return response.json()["id"]
+
+
+def test_filter_trades_in_database(client):
+    gbp_id = _submit(client, currency="GBP")
+    usd_id = _submit(client, currency="USD", counterparty="EntityC")
+    client.post(f"/api/v1/trades/{usd_id}/approve", headers=ADMIN_HEADERS)
+
+    response = client.get("/api/v1/trades/?currency=USD", headers=ADMIN_HEADERS)
+    assert [trade["id"] for trade in response.json()] == [usd_id]
+
+    response = client.get(
+        "/api/v1/trades/?state=PENDING_APPROVAL", headers=ADMIN_HEADERS
+    )
+    assert [trade["id"] for trade in response.json()] == [gbp_id]
+
+    response = client.get(
+        "/api/v1/trades/?counterparty=EntityC&state=APPROVED", headers=ADMIN_HEADERS
+    )
+    assert [trade["id"] for trade in response.json()] == [usd_id]
+
+    response = client.get(
+        f"/api/v1/trades/?trade_date_from={TOMORROW_ISO}", headers=ADMIN_HEADERS
+    )
+    assert response.json() == []
+
+
+def test_paginate_trades_with_cursor(client):
+    trade_ids = [_submit(client) for _ in range(5)]
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        url = "/api/v1/trades/?limit=2" + (f"&cursor={cursor}" if cursor else "")
+        response = client.get(url, headers=ADMIN_HEADERS)
+        assert response.status_code == 200
+        seen += [trade["id"] for trade in response.json()]
+        pages += 1
+        cursor = response.headers.get("x-next-cursor")
+        if cursor is None:
+            break
+
+    assert pages == 3
+    assert seen == trade_ids
+
+
+def test_users_only_query_their_own_trades(client):
+    _submit(client, requester_id="User2")
+    own_id = _submit(client, requester_id="User1")
+
+    response = client.get(
+        "/api/v1/trades/?requester_id=User2", headers={"x-user-id": "User1"}
+    )
+    assert [trade["id"] for trade in response.json()] == [own_id]
+
+
+def test_invalid_query_parameters(client):
+    response = client.get("/api/v1/trades/?cursor=garbage", headers=ADMIN_HEADERS)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
+
+    response = client.get("/api/v1/trades/?state=UNKNOWN", headers=ADMIN_HEADERS)
+    assert response.status_code == 400
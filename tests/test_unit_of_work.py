@@ -0,0 +1,70 @@
+from trading_execution_system.core.dependencies import trade_cache
+from tests.test_trades import create_sample_trade_payload
+
+
+def _trade_loads(query_counter):
+    return sum(
+        "trades.counterparty" in statement
+        and "FROM trades LEFT OUTER JOIN trade_history" in statement
+        for statement in query_counter.statements
+    )
+
+
+def _summary_lookups(query_counter):
+    return sum(
+        statement.startswith(
+            "SELECT trades.id, trades.requester_id, trades.state, trades.version \n"
+        )
+        and "JOIN" not in statement
+        for statement in query_counter.statements
+    )
+
+
+def test_trade_is_loaded_once_per_request(client, query_counter):
+    headers = {"x-user-id": "User1"}
+    response = client.post(
+        "/api/v1/trades/", json=create_sample_trade_payload(), headers=headers
+    )
+    trade_id = response.json()["id"]
+    # measure the database path, not the trade cache.
+    trade_cache.clear()
+
+    query_counter.reset()
+    response = client.post(f"/api/v1/trades/{trade_id}/cancel", headers=headers)
+    assert response.status_code == 200
+    # the RBAC check reads the owner from a projection, the service loads once.
+    assert _summary_lookups(query_counter) == 1
+    assert _trade_loads(query_counter) == 1
+    # the load selects the underlying in a second query, then the update:
+    # conditional UPDATE, next seq, history INSERT and the two counter upserts.
+    assert query_counter.count == 8
+
+    trade_cache.clear()
+    query_counter.reset()
+    response = client.get(
+        f"/api/v1/trades/{trade_id}/diff?from_index=0&to_index=1", headers=headers
+    )
+    assert response.status_code == 200
+    # owner projection, history length and the snapshots, no full trade load.
+    assert _trade_loads(query_counter) == 0
+    assert query_counter.count == 3
+
+
+def test_identity_map_is_not_shared_between_requests(client, query_counter):
+    headers = {"x-user-id": "User1"}
+    response = client.post(
+        "/api/v1/trades/", json=create_sample_trade_payload(), headers=headers
+    )
+    trade_id = response.json()["id"]
+    # measure the database path, not the trade cache.
+    trade_cache.clear()
+
+    query_counter.reset()
+    for _ in range(2):
+        response = client.get(f"/api/v1/trades/{trade_id}/status", headers=headers)
+        assert response.status_code == 200
+        assert response.json()["state"] == "PENDING_APPROVAL"
+    # one projection per request shared by RBAC and the status lookup.
+    assert _trade_loads(query_counter) == 0
+    assert _summary_lookups(query_counter) == 2
+    assert query_counter.count == 2
@@ -1,11 +1,57 @@
+import importlib.util
+import logging
+import os
+from typing import Any, Dict
+
 import uvicorn
 
+from trading_execution_system.core.config import (
+    SERVER_ACCESS_LOG,
+    SERVER_BACKLOG,
+    SERVER_GRACEFUL_TIMEOUT,
+    SERVER_HOST,
+    SERVER_KEEP_ALIVE,
+    SERVER_PORT,
+    SERVER_PROFILE,
+    SERVER_WORKERS,
+)
+
+logger = logging.getLogger(__name__)
+
+APP = "trading_execution_system.main:app"
+
+
+def _installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def server_options(profile: str = SERVER_PROFILE) -> Dict[str, Any]:
+    """uvicorn.run arguments of the SERVER_* settings for ``profile``"""
+    options = {"host": SERVER_HOST, "port": SERVER_PORT}
+    if profile == "development":
+        return {**options, "reload": True}
+    if profile != "production":
+        raise ValueError(f"Unknown server profile {profile}")
+    return {
+        **options,
+        "workers": SERVER_WORKERS,
+        "loop": "uvloop" if _installed("uvloop") else "asyncio",
+        "http": "httptools" if _installed("httptools") else "h11",
+        "timeout_graceful_shutdown": SERVER_GRACEFUL_TIMEOUT,
+        "timeout_keep_alive": SERVER_KEEP_ALIVE,
+        "backlog": SERVER_BACKLOG,
+        "access_log": SERVER_ACCESS_LOG,
+        "reload": False,
+    }
+
 
 def main():
-    # TODO: Create a settings file to store those and pass by .env
-    uvicorn.run(
-        "trading_execution_system.main:app", host="0.0.0.0", port=8000, reload=True
-    )
+    logging.basicConfig(level=logging.INFO)
+    options = server_options()
+    # the workers read it in core.config to size their trade cache.
+    os.environ["WEB_CONCURRENCY"] = str(options.get("workers", 1))
+    logger.info("Starting the %s server: %s", SERVER_PROFILE, options)
+    uvicorn.run(APP, **options)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,234 @@
+from typing import FrozenSet, List, Optional
+
+from fastapi import APIRouter, Query, Depends, Response
+from uuid import UUID
+
+from trading_execution_system.api.v1.routes.trades import (
+    page_query,
+    trade_errors,
+    trade_filters,
+    trade_list_response,
+    trade_response,
+    updated_details,
+)
+from trading_execution_system.core.rbac import (
+    any_user_only,
+    admin_only,
+    requester_only,
+    requester_or_approver,
+)
+from trading_execution_system.schemas.trade import (
+    TradeCreateRequest,
+    TradeActionRequest,
+    TradeResponse,
+    TradeHistoryResponse,
+    TradeDiffResponse,
+    TradeBookRequest,
+    TradeStatusResponse,
+    TradeView,
+)
+from trading_execution_system.models.trade import TradeDetails, TradeQuery
+from trading_execution_system.core.dependencies import (
+    get_current_user,
+    get_async_trade_service,
+    get_expected_versions,
+    get_trade_view,
+    get_trade_list_view,
+    trade_etag,
+)
+from trading_execution_system.core.query_budget import query_budget
+from trading_execution_system.services.async_trade import AsyncTradeService
+from trading_execution_system.utils.serialization import TradeJSONResponse
+from trading_execution_system.models.user import User
+
+# Same API as routes.trades served from the event loop, no worker thread is
+# held while a request waits on the database. The request handling is shared
+# with routes.trades, only the service calls are awaited here.
+router = APIRouter()
+
+
+@router.post("/", response_model=TradeResponse)
+# a submit is two transactions: the trade is created, then it is moved to
+# PENDING_APPROVAL, which costs more statements than a single transition.
+@query_budget(11)
+@any_user_only
+async def submit_trade(
+    request: TradeCreateRequest,
+    view: TradeView = Depends(get_trade_view),
+    current_user: User = Depends(get_current_user),
+    trade_service: AsyncTradeService = Depends(get_async_trade_service),
+):
+    with trade_errors():
+        details = TradeDetails(**request.details.model_dump())
+        trade = await trade_service.submit_trade(current_user.id, details)
+        return trade_response(trade, view)
+
+
+@router.post(
+    "/{trade_id}/approve",
+    response_model=TradeResponse,
+)
+@query_budget(7)
+@admin_only
+async def approve_trade(
+    trade_id: UUID,
+    view: TradeView = Depends(get_trade_view),
+    expected_versions: Optional[FrozenSet[int]] = Depends(get_expected_versions),
+    current_user: User = Depends(get_current_user),
+    trade_service: AsyncTradeService = Depends(get_async_trade_service),
+):
+    with trade_errors():
+        trade = await trade_service.approve_trade(
+            trade_id, current_user.id, expected_versions
+        )
+        return trade_response(trade, view)
+
+
+@router.post(
+    "/{trade_id}/update",
+    response_model=TradeResponse,
+)
+# an update runs more statements than the other transitions, because a
+# changed underlying is deleted and inserted again.
+@query_budget(9)
+@requester_only
+async def update_trade(
+    trade_id: UUID,
+    request: TradeActionRequest,
+    view: TradeView = Depends(get_trade_view),
+    expected_versions: Optional[FrozenSet[int]] = Depends(get_expected_versions),
+    current_user: User = Depends(get_current_user),
+    trade_service: AsyncTradeService = Depends(get_async_trade_service),
+):
+    new_details = updated_details(request)
+    with trade_errors():
+        trade = await trade_service.update_trade(
+            trade_id, current_user, new_details, expected_versions
+        )
+        return trade_response(trade, view)
+
+
+@router.post(
+    "/{trade_id}/cancel",
+    response_model=TradeResponse,
+)
+@query_budget(8)
+@requester_or_approver
+async def cancel_trade(
+    trade_id: UUID,
+    view: TradeView = Depends(get_trade_view),
+    expected_versions: Optional[FrozenSet[int]] = Depends(get_expected_versions),
+    current_user: User = Depends(get_current_user),
+    trade_service: AsyncTradeService = Depends(get_async_trade_service),
+):
+    with trade_errors():
+        trade = await trade_service.cancel_trade(
+            trade_id, current_user, expected_versions
+        )
+        return trade_response(trade, view)
+
+
+@router.post(
+    "/{trade_id}/send_to_execute",
+    response_model=TradeResponse,
+)
+@query_budget(8)
+@admin_only
+async def send_to_execute(
+    trade_id: UUID,
+    view: TradeView = Depends(get_trade_view),
+    expected_versions: Optional[FrozenSet[int]] = Depends(get_expected_versions),
+    current_user: User = Depends(get_current_user),
+    trade_service: AsyncTradeService = Depends(get_async_trade_service),
+):
+    with trade_errors():
+        trade = await trade_service.send_to_execute(
+            trade_id, current_user.id, expected_versions
+        )
+        return trade_response(trade, view)
+
+
+@router.post("/{trade_id}/book", response_model=TradeResponse)
+@query_budget(8)
+@requester_or_approver
+async def book_trade(
+    trade_id: UUID,
+    request: TradeBookRequest,
+    view: TradeView = Depends(get_trade_view),
+    expected_versions: Optional[FrozenSet[int]] = Depends(get_expected_versions),
+    current_user: User = Depends(get_current_user),
+    trade_service: AsyncTradeService = Depends(get_async_trade_service),
+):
+    with trade_errors():
+        trade = await trade_service.book_trade(
+            trade_id, current_user.id, request.strike, expected_versions
+        )
+        return trade_response(trade, view)
+
+
+@router.get("/{trade_id}/history", response_model=TradeHistoryResponse)
+@query_budget(3)
+@requester_or_approver
+async def get_trade_history(
+    trade_id: UUID,
+    offset: int = Query(0, ge=0, description="First history record to return"),
+    limit: Optional[int] = Query(None, ge=1, description="Maximum records"),
+    current_user: User = Depends(get_current_user),
+    trade_service: AsyncTradeService = Depends(get_async_trade_service),
+):
+    with trade_errors():
+        history = await trade_service.get_history(trade_id, offset, limit)
+        return TradeJSONResponse({"history": history})
+
+
+@router.get("/{trade_id}/diff", response_model=TradeDiffResponse)
+@query_budget(3)
+@requester_or_approver
+async def get_trade_diff(
+    trade_id: UUID,
+    from_index: int = Query(..., ge=0, description="History index to compare from"),
+    to_index: int = Query(..., ge=0, description="History index to compare to"),
+    current_user: User = Depends(get_current_user),
+    trade_service: AsyncTradeService = Depends(get_async_trade_service),
+):
+    with trade_errors():
+        diffs = await trade_service.compute_diff(trade_id, from_index, to_index)
+        return TradeDiffResponse(differences=diffs)
+
+
+@router.get("/{trade_id}/status", response_model=TradeStatusResponse)
+@query_budget(1)
+@requester_or_approver
+async def get_trade_status_endpoint(
+    trade_id: UUID,
+    response: Response,
+    current_user: User = Depends(get_current_user),
+    trade_service: AsyncTradeService = Depends(get_async_trade_service),
+):
+    with trade_errors():
+        trade_status = await trade_service.get_trade_status(trade_id)
+        response.headers["ETag"] = trade_etag(trade_status.version)
+        return trade_status
+
+
+@router.get("/", response_model=List[TradeResponse])
+# a page runs its query, then up to two IN lists each to load the
+# underlyings and the history of its trades.
+@query_budget(5)
+async def get_all_trades(
+    query: TradeQuery = Depends(trade_filters),
+    view: TradeView = Depends(get_trade_list_view),
+    cursor: Optional[str] = Query(None, description="Cursor of the page to fetch"),
+    limit: int = Query(100, ge=1, le=1000, description="Maximum trades per page"),
+    current_user: User = Depends(get_current_user),
+    trade_service: AsyncTradeService = Depends(get_async_trade_service),
+):
+    """
+    Retrieve trades for the current user, one page at a time.
+    The cursor of the next page is returned in the X-Next-Cursor header.
+    """
+    with trade_errors():
+        trades, next_cursor = await trade_service.query_trades(
+            current_user, page_query(query, cursor, limit, view)
+        )
+        return trade_list_response(trades, next_cursor, view)
@@ -0,0 +1,12 @@
+from fastapi import APIRouter
+from fastapi.responses import Response
+
+from trading_execution_system.core.metrics import CONTENT_TYPE, REGISTRY
+
+router = APIRouter()
+
+
+@router.get("/metrics", include_in_schema=False)
+def get_metrics():
+    """Every metric of this process, in the Prometheus text format."""
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
@@ -0,0 +1,87 @@
+from dataclasses import asdict
+from datetime import date
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query, Depends
+
+from trading_execution_system.core.dependencies import (
+    get_current_user,
+    get_report_service,
+)
+from trading_execution_system.models.report import ProfitLossQuery, ReportQuery
+from trading_execution_system.models.user import User
+from trading_execution_system.schemas.report import (
+    ProfitLossResponse,
+    StateSummaryResponse,
+    TradeReportResponse,
+)
+from trading_execution_system.services.reports import ReportService
+
+router = APIRouter()
+
+
+@router.get("/trades", response_model=TradeReportResponse)
+def get_trade_report(
+    requester_id: Optional[str] = None,
+    trade_date_from: Optional[date] = None,
+    trade_date_to: Optional[date] = None,
+    bucket: str = Query(
+        "month", pattern="^(day|month|year)$", description="Trade date bucket"
+    ),
+    current_user: User = Depends(get_current_user),
+    report_service: ReportService = Depends(get_report_service),
+):
+    """
+    Trade counts and notional sums by state, counterparty, currency, direction
+    and trade date bucket, aggregated in the database.
+    """
+    query = ReportQuery(
+        requester_id=requester_id,
+        trade_date_from=trade_date_from,
+        trade_date_to=trade_date_to,
+        bucket=bucket,
+    )
+    try:
+        report = report_service.trade_report(current_user, query)
+        return TradeReportResponse(**asdict(report))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/profit-loss", response_model=ProfitLossResponse)
+def get_profit_loss(
+    requester_id: Optional[str] = None,
+    group_by: str = Query("user", pattern="^(user|period)$"),
+    period: str = Query(
+        "month", pattern="^(month|year)$", description="Value date bucket"
+    ),
+    current_user: User = Depends(get_current_user),
+    report_service: ReportService = Depends(get_report_service),
+):
+    """
+    Mark-to-market P&L of the executed trades against the current rate file,
+    by requester or by value date period.
+    """
+    query = ProfitLossQuery(requester_id=requester_id, group_by=group_by, period=period)
+    try:
+        report = report_service.profit_loss(current_user, query)
+        return ProfitLossResponse(**asdict(report))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/summary", response_model=StateSummaryResponse)
+def get_state_summary(
+    requester_id: Optional[str] = None,
+    current_user: User = Depends(get_current_user),
+    report_service: ReportService = Depends(get_report_service),
+):
+    """
+    Trades per state for one requester, or over every requester when none is
+    given, read from counters kept up to date by every state change.
+    """
+    try:
+        summary = report_service.state_summary(current_user, requester_id)
+        return StateSummaryResponse(**asdict(summary))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -1,6 +1,11 @@
-from typing import List
+from contextlib import contextmanager
+from dataclasses import asdict
+from datetime import date
+from typing import Any, Dict, FrozenSet, Iterator, List, Optional
 
-from fastapi import APIRouter, HTTPException, Query, Depends
+from fastapi import APIRouter, HTTPException, Query, Depends, Response
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
 from uuid import UUID
 
 from trading_execution_system.core.rbac import (
@@ -10,6 +15,7 @@ from trading_execution_system.core.rbac import (
     requester_or_approver,
 )
 from trading_execution_system.schemas.trade import (
+    TradeDetailsSchema,
     TradeCreateRequest,
     TradeActionRequest,
     TradeResponse,
@@ -17,186 +23,445 @@ from trading_execution_system.schemas.trade import (
     TradeDiffResponse,
     TradeBookRequest,
     TradeStatusResponse,
+    TradeCacheStatsResponse,
+    TradeOutboxStatsResponse,
+    TradeBatchRequest,
+    TradeBatchResult,
+    TradeBatchResponse,
+    TradeBulkRequest,
+    TradeBulkResult,
+    TradeBulkResponse,
+    TradeView,
+    trade_payload,
 )
-from trading_execution_system.models.trade import TradeDetails
-from trading_execution_system.db.settings import TradeORMRepository
+from trading_execution_system.models.enums import TradeState, TradeAction
+from trading_execution_system.models.trade import Trade, TradeDetails, TradeQuery
 from trading_execution_system.services.trade import TradeService
-from trading_execution_system.core.dependencies import get_current_user
+from trading_execution_system.core.dependencies import (
+    get_current_user,
+    get_trade_service,
+    get_expected_versions,
+    get_trade_view,
+    get_trade_list_view,
+    trade_etag,
+    trade_cache,
+    outbox_dispatcher,
+)
+from trading_execution_system.core.metrics import allow_queries
+from trading_execution_system.core.query_budget import query_budget
+from trading_execution_system.core.exceptions import (
+    TradeConflictError,
+    PreconditionFailedError,
+)
+from trading_execution_system.db.outbox import OutboxRepository
+from trading_execution_system.db.settings import TradeORMRepository
+from trading_execution_system.models.outbox import OutboxStats
 from trading_execution_system.models.user import User, UserRole
+from trading_execution_system.utils.serialization import TradeJSONResponse, dumps
 
 router = APIRouter()
 
-trade_repo = TradeORMRepository()
-trade_service = TradeService(trade_repo)
+BATCH_ACTIONS = {
+    "approve": TradeAction.APPROVE,
+    "cancel": TradeAction.CANCEL,
+    "send_to_execute": TradeAction.SEND_TO_EXECUTE,
+}
+
+
+# the helpers below are shared with routes.async_trades, which serves the same
+# API from the event loop.
+
+
+@contextmanager
+def trade_errors() -> Iterator[None]:
+    """Answer the errors of the trade service with their HTTP status"""
+    try:
+        yield
+    except TradeConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except PreconditionFailedError as e:
+        raise HTTPException(status_code=412, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def trade_response(trade: Trade, view: TradeView) -> TradeJSONResponse:
+    return TradeJSONResponse(
+        trade_payload(trade, view), headers={"ETag": trade_etag(trade.version)}
+    )
+
+
+def trade_list_response(
+    trades: List[Trade], next_cursor: Optional[str], view: TradeView
+) -> TradeJSONResponse:
+    return TradeJSONResponse(
+        [trade_payload(trade, view) for trade in trades],
+        headers={"X-Next-Cursor": next_cursor} if next_cursor else None,
+    )
+
+
+def updated_details(request: TradeActionRequest) -> TradeDetails:
+    if request.details is None:
+        raise HTTPException(
+            status_code=400, detail="Updated trade details are required."
+        )
+    return TradeDetails(**request.details.model_dump())
 
 
 @router.post("/", response_model=TradeResponse)
+# a submit is two transactions: the trade is created, then it is moved to
+# PENDING_APPROVAL, which costs more statements than a single transition.
+@query_budget(11)
 @any_user_only
 def submit_trade(
-    request: TradeCreateRequest, current_user: User = Depends(get_current_user)
+    request: TradeCreateRequest,
+    view: TradeView = Depends(get_trade_view),
+    current_user: User = Depends(get_current_user),
+    trade_service: TradeService = Depends(get_trade_service),
 ):
-    try:
+    with trade_errors():
         details = TradeDetails(**request.details.model_dump())
         trade = trade_service.submit_trade(current_user.id, details)
-        return TradeResponse(
-            id=trade.id,
-            state=trade.state.name,
-            details=request.details,
-            history=[record.__dict__ for record in trade.history],
+        return trade_response(trade, view)
+
+
+@router.post("/bulk", response_model=TradeBulkResponse)
+@query_budget(5)
+@any_user_only
+def submit_trades(
+    request: TradeBulkRequest,
+    current_user: User = Depends(get_current_user),
+    trade_service: TradeService = Depends(get_trade_service),
+):
+    """
+    Submit many trades in one transaction. Rows failing validation are
+    reported by index and skipped, the valid ones are created.
+    """
+    results, valid, positions = [], [], []
+    for index, row in enumerate(request.trades):
+        try:
+            schema = TradeDetailsSchema.model_validate(row)
+        except ValidationError as e:
+            error = "; ".join(
+                f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}"
+                for err in e.errors()
+            )
+            results.append(TradeBulkResult(index=index, error=error))
+            continue
+        valid.append(TradeDetails(**schema.model_dump()))
+        positions.append(index)
+    with trade_errors():
+        trades = trade_service.submit_trades(current_user.id, valid)
+    results.extend(
+        TradeBulkResult(index=index, id=trade.id, state=trade.state.name)
+        for index, trade in zip(positions, trades)
+    )
+    return TradeBulkResponse(results=sorted(results, key=lambda r: r.index))
+
+
+# declared before the /{trade_id} routes so "batch" is not parsed as an id.
+@router.post("/batch/{action}", response_model=TradeBatchResponse)
+@query_budget(7)
+def batch_action(
+    action: str,
+    request: TradeBatchRequest,
+    current_user: User = Depends(get_current_user),
+    trade_service: TradeService = Depends(get_trade_service),
+):
+    """
+    Approve, cancel or send to execute many trades in one transaction. Trades
+    the action is not allowed on are reported and left unchanged.
+    """
+    if action not in BATCH_ACTIONS:
+        raise HTTPException(status_code=400, detail=f"Unknown batch action {action}")
+    # cancel is checked per trade, requesters may cancel their own trades.
+    if action != "cancel" and current_user.role != UserRole.ADMIN:
+        raise HTTPException(
+            status_code=403, detail="Only approvers can perform this action."
+        )
+    with trade_errors():
+        results = trade_service.batch_transition(
+            request.trade_ids, BATCH_ACTIONS[action], current_user
+        )
+        return TradeBatchResponse(
+            results=[
+                TradeBatchResult(
+                    id=result.id,
+                    state=result.state.name if result.state else None,
+                    error=result.error,
+                )
+                for result in results
+            ]
         )
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
 
 
-@router.post("/{trade_id}/approve", response_model=TradeResponse)
+@router.post(
+    "/{trade_id}/approve",
+    response_model=TradeResponse,
+)
+@query_budget(7)
 @admin_only
-def approve_trade(trade_id: UUID, current_user: User = Depends(get_current_user)):
-    try:
-        trade = trade_service.approve_trade(trade_id, current_user.id)
-        return TradeResponse(
-            id=trade.id,
-            state=trade.state.name,
-            details=trade.details.__dict__,
-            history=[record.__dict__ for record in trade.history],
+def approve_trade(
+    trade_id: UUID,
+    view: TradeView = Depends(get_trade_view),
+    expected_versions: Optional[FrozenSet[int]] = Depends(get_expected_versions),
+    current_user: User = Depends(get_current_user),
+    trade_service: TradeService = Depends(get_trade_service),
+):
+    with trade_errors():
+        trade = trade_service.approve_trade(
+            trade_id, current_user.id, expected_versions
         )
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+        return trade_response(trade, view)
 
 
-@router.post("/{trade_id}/update", response_model=TradeResponse)
+@router.post(
+    "/{trade_id}/update",
+    response_model=TradeResponse,
+)
+# an update runs more statements than the other transitions, because a
+# changed underlying is deleted and inserted again.
+@query_budget(9)
 @requester_only
 def update_trade(
     trade_id: UUID,
     request: TradeActionRequest,
+    view: TradeView = Depends(get_trade_view),
+    expected_versions: Optional[FrozenSet[int]] = Depends(get_expected_versions),
     current_user: User = Depends(get_current_user),
+    trade_service: TradeService = Depends(get_trade_service),
 ):
-    if request.details is None:
-        raise HTTPException(
-            status_code=400, detail="Updated trade details are required."
-        )
-
-    try:
-        new_details = TradeDetails(**request.details.model_dump())
+    new_details = updated_details(request)
+    with trade_errors():
         # Pass the entire current_user to the service.
-        trade = trade_service.update_trade(trade_id, current_user, new_details)
-        return TradeResponse(
-            id=trade.id,
-            state=trade.state.name,
-            details=trade.details.__dict__,
-            history=[record.__dict__ for record in trade.history],
+        trade = trade_service.update_trade(
+            trade_id, current_user, new_details, expected_versions
         )
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+        return trade_response(trade, view)
 
 
-@router.post("/{trade_id}/cancel", response_model=TradeResponse)
+@router.post(
+    "/{trade_id}/cancel",
+    response_model=TradeResponse,
+)
+@query_budget(8)
 @requester_or_approver
-def cancel_trade(trade_id: UUID, current_user: User = Depends(get_current_user)):
-    try:
-
-        trade = trade_service.cancel_trade(trade_id, current_user)
-
-        return TradeResponse(
-            id=trade.id,
-            state=trade.state.name,
-            details=trade.details.__dict__,
-            history=[record.__dict__ for record in trade.history],
-        )
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+def cancel_trade(
+    trade_id: UUID,
+    view: TradeView = Depends(get_trade_view),
+    expected_versions: Optional[FrozenSet[int]] = Depends(get_expected_versions),
+    current_user: User = Depends(get_current_user),
+    trade_service: TradeService = Depends(get_trade_service),
+):
+    with trade_errors():
+        trade = trade_service.cancel_trade(trade_id, current_user, expected_versions)
+        return trade_response(trade, view)
 
 
-@router.post("/{trade_id}/send_to_execute", response_model=TradeResponse)
+@router.post(
+    "/{trade_id}/send_to_execute",
+    response_model=TradeResponse,
+)
+@query_budget(8)
 @admin_only
-def send_to_execute(trade_id: UUID, current_user: User = Depends(get_current_user)):
-    try:
-
-        trade = trade_service.send_to_execute(trade_id, current_user.id)
-        return TradeResponse(
-            id=trade.id,
-            state=trade.state.name,
-            details=trade.details.__dict__,
-            history=[record.__dict__ for record in trade.history],
+def send_to_execute(
+    trade_id: UUID,
+    view: TradeView = Depends(get_trade_view),
+    expected_versions: Optional[FrozenSet[int]] = Depends(get_expected_versions),
+    current_user: User = Depends(get_current_user),
+    trade_service: TradeService = Depends(get_trade_service),
+):
+    with trade_errors():
+        trade = trade_service.send_to_execute(
+            trade_id, current_user.id, expected_versions
         )
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+        return trade_response(trade, view)
 
 
 @router.post("/{trade_id}/book", response_model=TradeResponse)
+@query_budget(8)
 @requester_or_approver
 def book_trade(
     trade_id: UUID,
     request: TradeBookRequest,
+    view: TradeView = Depends(get_trade_view),
+    expected_versions: Optional[FrozenSet[int]] = Depends(get_expected_versions),
     current_user: User = Depends(get_current_user),
+    trade_service: TradeService = Depends(get_trade_service),
 ):
-    try:
-        trade = trade_service.book_trade(trade_id, current_user.id, request.strike)
-        return TradeResponse(
-            id=trade.id,
-            state=trade.state.name,
-            details=trade.details.__dict__,
-            history=[record.__dict__ for record in trade.history],
+    with trade_errors():
+        trade = trade_service.book_trade(
+            trade_id, current_user.id, request.strike, expected_versions
         )
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+        return trade_response(trade, view)
 
 
 @router.get("/{trade_id}/history", response_model=TradeHistoryResponse)
+@query_budget(3)
 @requester_or_approver
-def get_trade_history(trade_id: UUID, current_user: User = Depends(get_current_user)):
-    try:
-        history = trade_service.get_history(trade_id)
-        return TradeHistoryResponse(history=history)
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+def get_trade_history(
+    trade_id: UUID,
+    offset: int = Query(0, ge=0, description="First history record to return"),
+    limit: Optional[int] = Query(None, ge=1, description="Maximum records"),
+    current_user: User = Depends(get_current_user),
+    trade_service: TradeService = Depends(get_trade_service),
+):
+    with trade_errors():
+        history = trade_service.get_history(trade_id, offset, limit)
+        return TradeJSONResponse({"history": history})
 
 
 @router.get("/{trade_id}/diff", response_model=TradeDiffResponse)
+@query_budget(3)
 @requester_or_approver
 def get_trade_diff(
     trade_id: UUID,
     from_index: int = Query(..., ge=0, description="History index to compare from"),
     to_index: int = Query(..., ge=0, description="History index to compare to"),
     current_user: User = Depends(get_current_user),
+    trade_service: TradeService = Depends(get_trade_service),
 ):
-    try:
+    with trade_errors():
         diffs = trade_service.compute_diff(trade_id, from_index, to_index)
         return TradeDiffResponse(differences=diffs)
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.get("/{trade_id}/status", response_model=TradeStatusResponse)
+@query_budget(1)
 @requester_or_approver
 def get_trade_status_endpoint(
-    trade_id: UUID, current_user: User = Depends(get_current_user)
+    trade_id: UUID,
+    response: Response,
+    current_user: User = Depends(get_current_user),
+    trade_service: TradeService = Depends(get_trade_service),
 ):
-    try:
+    with trade_errors():
         trade_status = trade_service.get_trade_status(trade_id)
+        response.headers["ETag"] = trade_etag(trade_status.version)
         return trade_status
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/cache/stats", response_model=TradeCacheStatsResponse)
+@query_budget(0)
+@admin_only
+def get_trade_cache_stats(current_user: User = Depends(get_current_user)):
+    """Hit, miss and eviction counters of the trade cache, to size it."""
+    return TradeCacheStatsResponse(**trade_cache.stats().__dict__)
+
+
+@router.get("/outbox/stats", response_model=TradeOutboxStatsResponse)
+@query_budget(1)
+@admin_only
+def get_trade_outbox_stats(current_user: User = Depends(get_current_user)):
+    """
+    Outbox queue depth, and the sends, retries and dispatch latency in seconds
+    of this process's dispatcher.
+    """
+    stats = outbox_dispatcher.stats() if outbox_dispatcher else OutboxStats()
+    depth = OutboxRepository.depth()
+    stats.pending, stats.failed = depth["PENDING"], depth["FAILED"]
+    return TradeOutboxStatsResponse(**asdict(stats))
+
+
+def trade_filters(
+    requester_id: Optional[str] = None,
+    state: Optional[str] = Query(None, description="Trade state, e.g. APPROVED"),
+    counterparty: Optional[str] = None,
+    currency: Optional[str] = None,
+    trade_date_from: Optional[date] = None,
+    trade_date_to: Optional[date] = None,
+    value_date_from: Optional[date] = None,
+    value_date_to: Optional[date] = None,
+) -> TradeQuery:
+    """Filters shared by the listing and the export."""
+    if state is not None and state not in TradeState.__members__:
+        raise HTTPException(status_code=400, detail=f"Unknown trade state {state}")
+    return TradeQuery(
+        requester_id=requester_id,
+        state=TradeState[state] if state else None,
+        counterparty=counterparty,
+        currency=currency,
+        trade_date_from=trade_date_from,
+        trade_date_to=trade_date_to,
+        value_date_from=value_date_from,
+        value_date_to=value_date_to,
+        limit=None,
+    )
+
+
+def page_query(
+    query: TradeQuery, cursor: Optional[str], limit: int, view: TradeView
+) -> TradeQuery:
+    """``query`` narrowed to one page of the listing"""
+    query.cursor = cursor
+    query.limit = limit
+    # the history is only loaded when it is returned.
+    query.include_history = view.include_history
+    return query
+
+
+def _budgeted_export(
+    records: Iterator[Dict[str, Any]], include_history: bool
+) -> Iterator[Dict[str, Any]]:
+    # the export's relationship loads grow with its rows, so does its budget.
+    rows = 0
+    for record in records:
+        rows += 1
+        yield record
+    allow_queries(TradeORMRepository.export_statements(rows, include_history))
+
+
+def _ndjson(records: Iterator[Dict[str, Any]], chunk_size: int = 500):
+    # group lines so the response is not written one small chunk per trade.
+    lines = []
+    for record in records:
+        lines.append(dumps(record))
+        if len(lines) == chunk_size:
+            yield b"\n".join(lines) + b"\n"
+            lines = []
+    if lines:
+        yield b"\n".join(lines) + b"\n"
+
+
+@router.get("/export")
+# the budget covers the SELECT. The route adds the relationship loads of
+# each batch of streamed rows to it.
+@query_budget(1)
+def export_trades(
+    query: TradeQuery = Depends(trade_filters),
+    include_history: bool = Query(False, description="Add each trade's history"),
+    current_user: User = Depends(get_current_user),
+    trade_service: TradeService = Depends(get_trade_service),
+):
+    """
+    Stream every matching trade as newline delimited JSON, one trade per line.
+    Rows are read from a server side cursor, memory stays flat for any size.
+    """
+    records = _budgeted_export(
+        trade_service.export_trades(current_user, query, include_history),
+        include_history,
+    )
+    return StreamingResponse(_ndjson(records), media_type="application/x-ndjson")
 
 
 @router.get("/", response_model=List[TradeResponse])
-def get_all_trades(current_user: User = Depends(get_current_user)):
+# a page runs its query, then up to two IN lists each to load the
+# underlyings and the history of its trades.
+@query_budget(5)
+def get_all_trades(
+    query: TradeQuery = Depends(trade_filters),
+    view: TradeView = Depends(get_trade_list_view),
+    cursor: Optional[str] = Query(None, description="Cursor of the page to fetch"),
+    limit: int = Query(100, ge=1, le=1000, description="Maximum trades per page"),
+    current_user: User = Depends(get_current_user),
+    trade_service: TradeService = Depends(get_trade_service),
+):
     """
-    Retrieve all trades for the current user.
+    Retrieve trades for the current user, one page at a time.
+    The cursor of the next page is returned in the X-Next-Cursor header.
     """
-    try:
-        is_admin = current_user.role == UserRole.ADMIN
-        trades = trade_service.get_all_trades(current_user.id, is_admin)
-
-        return [
-            TradeResponse(
-                id=trade.id,
-                state=trade.state.name,
-                details=trade.details.__dict__,
-                history=[record.__dict__ for record in trade.history],
-            )
-            for trade in trades
-        ]
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+    with trade_errors():
+        trades, next_cursor = trade_service.query_trades(
+            current_user, page_query(query, cursor, limit, view)
+        )
+        return trade_list_response(trades, next_cursor, view)
@@ -1,7 +1,139 @@
 import os
+from typing import Optional
+
 from dotenv import load_dotenv
 
 load_dotenv()
 
 # TODO: Use those for authentication
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./test.db")
+
+_ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+}
+
+
+def to_async_url(url: str) -> str:
+    """Swap the driver of a sync database url for its asyncio counterpart."""
+    scheme, sep, rest = url.partition("://")
+    return _ASYNC_DRIVERS.get(scheme, scheme) + sep + rest
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", to_async_url(DATABASE_URL))
+
+# connection pool of both engines. Size, overflow and timeout only apply to
+# queue pools, in-memory SQLite keeps its single connection. Pre-ping tests a
+# connection before it is handed out, recycle replaces connections older than
+# DB_POOL_RECYCLE seconds (-1 never does).
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1").lower() not in (
+    "0",
+    "false",
+    "no",
+)
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
+# pragmas of every SQLite connection. WAL lets readers run while a write is in
+# progress, synchronous NORMAL is durable in WAL mode except on power loss.
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_BUSY_TIMEOUT = int(os.getenv("SQLITE_BUSY_TIMEOUT", "5000"))  # ms
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-65536"))  # KiB when < 0
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+
+# "full" stores every history snapshot, "delta" stores a full checkpoint every
+# HISTORY_CHECKPOINT_INTERVAL records and field level deltas in between.
+HISTORY_STORAGE_MODE = os.getenv("HISTORY_STORAGE_MODE", "full")
+HISTORY_CHECKPOINT_INTERVAL = int(os.getenv("HISTORY_CHECKPOINT_INTERVAL", "10"))
+if HISTORY_CHECKPOINT_INTERVAL < 1:
+    raise ValueError(
+        f"HISTORY_CHECKPOINT_INTERVAL={HISTORY_CHECKPOINT_INTERVAL}, it must be at least 1"
+    )
+
+# worker processes serving the app, each with a trade cache of its own. uvicorn
+# and gunicorn read their worker count from WEB_CONCURRENCY, ``poetry run start``
+# and the entrypoint set it for the workers they start.
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+
+
+def trade_cache_size(size: Optional[str], ttl: Optional[float], workers: int) -> int:
+    """Trade cache entries per process for the TRADE_CACHE_* settings.
+
+    A write only replaces the copy cached by the worker that made it, so with
+    several workers the cache is off unless a TTL bounds how long the others
+    serve a stale trade.
+    """
+    if workers <= 1 or ttl:
+        return int(size if size is not None else "10000")
+    if size is not None and int(size) > 0:
+        raise ValueError(
+            f"TRADE_CACHE_SIZE={size} with {workers} workers needs a TRADE_CACHE_TTL"
+        )
+    return 0
+
+
+# read-through cache of loaded trades, TRADE_CACHE_SIZE=0 turns it off and a
+# TRADE_CACHE_TTL of 0 keeps entries until they are evicted or replaced. With
+# more than one worker it is off by default, and only allowed with a TTL.
+TRADE_CACHE_TTL = float(os.getenv("TRADE_CACHE_TTL", "0")) or None
+TRADE_CACHE_SIZE = trade_cache_size(
+    os.getenv("TRADE_CACHE_SIZE"), TRADE_CACHE_TTL, WEB_CONCURRENCY
+)
+
+# market rates the executed book is revalued against, ``currency,rate`` rows.
+PNL_RATES_FILE = os.getenv("PNL_RATES_FILE", "./rates.csv")
+# revaluations kept per rate snapshot and book state.
+PNL_CACHE_SIZE = int(os.getenv("PNL_CACHE_SIZE", "64"))
+
+# transactional outbox to the counterparty. COUNTERPARTY_CLIENT is the
+# "module:factory" of the client the dispatcher sends through, the dispatcher
+# only runs when it is set.
+COUNTERPARTY_CLIENT = os.getenv("COUNTERPARTY_CLIENT", "")
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "100"))
+OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", "0.5"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "10"))
+OUTBOX_RETRY_DELAY = float(os.getenv("OUTBOX_RETRY_DELAY", "0.5"))
+OUTBOX_MAX_RETRY_DELAY = float(os.getenv("OUTBOX_MAX_RETRY_DELAY", "60"))
+# a claimed message is offered again after this long if it was never settled.
+OUTBOX_LEASE = float(os.getenv("OUTBOX_LEASE", "30"))
+
+# execution gateway, the counterparty client of
+# COUNTERPARTY_CLIENT=trading_execution_system.services.gateway:from_config.
+# Requests are pipelined over GATEWAY_CONNECTIONS connections, with up to
+# GATEWAY_MAX_IN_FLIGHT unanswered on each, and fills are booked
+# GATEWAY_BATCH_SIZE at a time.
+COUNTERPARTY_HOST = os.getenv("COUNTERPARTY_HOST", "127.0.0.1")
+COUNTERPARTY_PORT = int(os.getenv("COUNTERPARTY_PORT", "9100"))
+GATEWAY_CONNECTIONS = int(os.getenv("GATEWAY_CONNECTIONS", "4"))
+GATEWAY_MAX_IN_FLIGHT = int(os.getenv("GATEWAY_MAX_IN_FLIGHT", "256"))
+GATEWAY_TIMEOUT = float(os.getenv("GATEWAY_TIMEOUT", "5"))
+GATEWAY_BATCH_SIZE = int(os.getenv("GATEWAY_BATCH_SIZE", "500"))
+
+# Prometheus metrics at GET /metrics: request latency by route, SQL statements
+# and time per request, trade transitions and connection pool usage.
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1").lower() not in ("0", "false", "no")
+# what to do when a route runs more SQL statements than its query budget:
+# "log" an error, "raise" QueryBudgetExceededError (the tests do) or "off".
+# Statements are only counted while METRICS_ENABLED is on.
+QUERY_BUDGET_MODE = os.getenv("QUERY_BUDGET_MODE", "log")
+
+# server started by ``poetry run start``. The development profile runs one
+# process that reloads on code changes. The production profile runs
+# SERVER_WORKERS processes on uvloop and httptools when they are installed,
+# and on SIGTERM stops accepting connections and waits up to
+# SERVER_GRACEFUL_TIMEOUT seconds for the requests in flight to finish.
+SERVER_PROFILE = os.getenv("SERVER_PROFILE", "development")
+SERVER_HOST = os.getenv("SERVER_HOST", "0.0.0.0")
+SERVER_PORT = int(os.getenv("SERVER_PORT", "8000"))
+SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", str(os.cpu_count() or 1)))
+SERVER_GRACEFUL_TIMEOUT = int(os.getenv("SERVER_GRACEFUL_TIMEOUT", "30"))
+SERVER_KEEP_ALIVE = int(os.getenv("SERVER_KEEP_ALIVE", "5"))
+SERVER_BACKLOG = int(os.getenv("SERVER_BACKLOG", "2048"))
+SERVER_ACCESS_LOG = os.getenv("SERVER_ACCESS_LOG", "0").lower() in ("1", "true", "yes")
+# worker threads the sync routes run in, per process. Keep it within
+# DB_POOL_SIZE + DB_MAX_OVERFLOW or threads wait for connections.
+SERVER_THREAD_LIMIT = int(os.getenv("SERVER_THREAD_LIMIT", "30"))
@@ -1,8 +1,154 @@
-from fastapi import HTTPException, Header
+from typing import AsyncIterator, FrozenSet, Optional
+
+from fastapi import HTTPException, Header, Query
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+
+import trading_execution_system.db.settings as db_settings
+from trading_execution_system.core.config import (
+    COUNTERPARTY_CLIENT,
+    OUTBOX_BATCH_SIZE,
+    OUTBOX_LEASE,
+    OUTBOX_MAX_ATTEMPTS,
+    OUTBOX_MAX_RETRY_DELAY,
+    OUTBOX_POLL_INTERVAL,
+    OUTBOX_RETRY_DELAY,
+    PNL_CACHE_SIZE,
+    PNL_RATES_FILE,
+    TRADE_CACHE_SIZE,
+    TRADE_CACHE_TTL,
+)
+from trading_execution_system.db.cache import (
+    LRUCache,
+    TradeCache,
+    CachedTradeRepository,
+    AsyncCachedTradeRepository,
+)
+from trading_execution_system.db.settings import TradeORMRepository
+from trading_execution_system.db.counters import StateCountRepository
+from trading_execution_system.db.reports import TradeReportRepository
+from trading_execution_system.db.async_settings import AsyncTradeORMRepository
+from trading_execution_system.db.unit_of_work import (
+    TradeUnitOfWork,
+    AsyncTradeUnitOfWork,
+)
 from trading_execution_system.models.user import USERS, User
+from trading_execution_system.schemas.trade import TRADE_FIELDS, TradeView
+from trading_execution_system.services.trade import TradeService
+from trading_execution_system.services.async_trade import AsyncTradeService
+from trading_execution_system.services.counterparty import load_client
+from trading_execution_system.services.dispatcher import OutboxDispatcher
+from trading_execution_system.services.pnl import ProfitLossEngine
+from trading_execution_system.services.reports import ReportService
+
+# one cache for both stacks so a write on either side refreshes it.
+trade_cache = TradeCache(LRUCache(TRADE_CACHE_SIZE, TRADE_CACHE_TTL))
+trade_repo = CachedTradeRepository(TradeORMRepository(), trade_cache)
+async_trade_repo = AsyncCachedTradeRepository(AsyncTradeORMRepository(), trade_cache)
+# holds the executed book and its revaluations between requests.
+pnl_engine = ProfitLossEngine(TradeReportRepository(), PNL_RATES_FILE, PNL_CACHE_SIZE)
+# drains the outbox while the app runs, None without a counterparty client.
+outbox_dispatcher = (
+    OutboxDispatcher(
+        load_client(COUNTERPARTY_CLIENT),
+        batch_size=OUTBOX_BATCH_SIZE,
+        poll_interval=OUTBOX_POLL_INTERVAL,
+        max_attempts=OUTBOX_MAX_ATTEMPTS,
+        retry_delay=OUTBOX_RETRY_DELAY,
+        max_retry_delay=OUTBOX_MAX_RETRY_DELAY,
+        lease=OUTBOX_LEASE,
+    )
+    if COUNTERPARTY_CLIENT
+    else None
+)
 
 
 def get_current_user(x_user_id: str = Header(...)) -> User:
     if x_user_id not in USERS:
         raise HTTPException(status_code=401, detail="User not found")
     return USERS[x_user_id]
+
+
+async def get_db_session() -> AsyncIterator[Session]:
+    """
+    One session for every repository call of the request, bound in the
+    request's task so the thread of a sync route sees it. Closing may roll back
+    on the server, so it runs in a worker thread.
+    """
+    db = db_settings.SessionLocal()
+    token = db_settings.request_session.set(db)
+    try:
+        yield db
+    finally:
+        db_settings.request_session.reset(token)
+        await run_in_threadpool(db.close)
+
+
+def get_trade_service() -> TradeService:
+    """One service and identity map per request, shared by RBAC and the route."""
+    return TradeService(TradeUnitOfWork(trade_repo))
+
+
+def get_async_trade_service() -> AsyncTradeService:
+    return AsyncTradeService(AsyncTradeUnitOfWork(async_trade_repo))
+
+
+def get_report_service() -> ReportService:
+    return ReportService(TradeReportRepository(), pnl_engine, StateCountRepository())
+
+
+def trade_etag(version: int) -> str:
+    return f'"{version}"'
+
+
+def get_expected_versions(
+    if_match: Optional[str] = Header(None),
+) -> Optional[FrozenSet[int]]:
+    """
+    Trade versions an If-Match header allows, None when any will do. The header
+    is ``*`` or a comma separated list of ETags, as in RFC 9110.
+    """
+    if if_match is None or if_match.strip() == "*":
+        return None
+    versions = set()
+    for tag in if_match.split(","):
+        tag = tag.strip().removeprefix("W/").strip('"')
+        if not tag.isdigit():
+            raise HTTPException(status_code=412, detail=f"Invalid If-Match {if_match}")
+        versions.add(int(tag))
+    return frozenset(versions)
+
+
+def _trade_view_dependency(include_history_default: bool):
+    def get_view(
+        include_history: bool = Query(
+            include_history_default, description="Embed the trade history"
+        ),
+        history_offset: int = Query(
+            0, ge=0, description="First history record to embed"
+        ),
+        history_limit: Optional[int] = Query(
+            None, ge=1, description="Maximum history records to embed"
+        ),
+        fields: Optional[str] = Query(
+            None, description="Comma separated fields to return, e.g. id,state"
+        ),
+    ) -> TradeView:
+        selected = set(TRADE_FIELDS)
+        if fields is not None:
+            selected = {name.strip() for name in fields.split(",") if name.strip()}
+        unknown = selected - set(TRADE_FIELDS)
+        if unknown:
+            raise HTTPException(
+                status_code=400, detail=f"Unknown fields {', '.join(sorted(unknown))}"
+            )
+        if not include_history:
+            selected.discard("history")
+        return TradeView(frozenset(selected), history_offset, history_limit)
+
+    return get_view
+
+
+# single trade responses embed the history unless told otherwise, lists do not.
+get_trade_view = _trade_view_dependency(include_history_default=True)
+get_trade_list_view = _trade_view_dependency(include_history_default=False)
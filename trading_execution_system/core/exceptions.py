@@ -0,0 +1,10 @@
+class TradeConflictError(Exception):
+    """The trade was changed by someone else since it was read, nothing was written"""
+
+
+class PreconditionFailedError(Exception):
+    """The If-Match version sent by the client is not the current one"""
+
+
+class QueryBudgetExceededError(Exception):
+    """A route ran more SQL statements than its query budget allows"""
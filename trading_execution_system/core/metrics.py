@@ -0,0 +1,297 @@
+"""
+In-process metrics, rendered in the Prometheus text format at GET /metrics.
+
+Counters and histograms keep a few numbers per label set behind one lock each,
+so recording is a dict lookup and an addition. Gauges are read from a callback
+when the metrics are rendered, nothing is recorded for them. Every worker
+process has its own registry, scrape each worker or aggregate them upstream.
+
+``MetricsMiddleware`` times every request by route template and status, and
+keeps the per-request SQL statement count and time that ``db.instrumentation``
+adds to, checked against the route's ``query_budget``.
+"""
+
+import bisect
+import contextvars
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from trading_execution_system.core.query_budget import budget_of, over_budget
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+QUERY_BUCKETS = (0, 1, 2, 3, 4, 5, 6, 8, 10, 15, 20, 30, 50)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n")
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.help}",
+            f"# TYPE {self.name} {self.kind}",
+            *self.samples(),
+        ]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        super().__init__(name, help, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [
+            f"{self.name}{_labels(self.label_names, key)} {_number(value)}"
+            for key, value in values
+        ]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+        # per label set, the count in each bucket (not cumulative, the last
+        # one is +Inf) and the sum of the observations.
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.get(labels) or self._values.setdefault(
+                labels, ([0] * (len(self.buckets) + 1), [0.0])
+            )
+            counts[index] += 1
+            total[0] += value
+
+    def count(self, *labels: str) -> int:
+        values = self._values.get(labels)
+        return sum(values[0]) if values else 0
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(
+                (key, (list(counts), total[0]))
+                for key, (counts, total) in self._values.items()
+            )
+        lines = []
+        for key, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                bucket = _labels(self.label_names, key, f'le="{_number(bound)}"')
+                lines.append(f"{self.name}_bucket{bucket} {cumulative}")
+            labels = _labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_number(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Gauge(_Metric):
+    """Values read from ``collect`` at render time, as ``(labels, value)`` pairs"""
+
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        collect: Callable[[], Iterable[Tuple[LabelValues, float]]],
+        labels: Sequence[str] = (),
+    ):
+        super().__init__(name, help, labels)
+        self.collect = collect
+
+    def samples(self) -> List[str]:
+        return [
+            f"{self.name}{_labels(self.label_names, key)} {_number(value)}"
+            for key, value in self.collect()
+        ]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_REQUEST_DURATION = REGISTRY.register(
+    Histogram(
+        "http_request_duration_seconds",
+        "Time to serve a request, by route template and status.",
+        ("method", "route", "status"),
+    )
+)
+DB_QUERIES_PER_REQUEST = REGISTRY.register(
+    Histogram(
+        "db_queries_per_request",
+        "SQL statements executed while serving a request.",
+        ("route",),
+        QUERY_BUCKETS,
+    )
+)
+DB_TIME_PER_REQUEST = REGISTRY.register(
+    Histogram(
+        "db_time_per_request_seconds",
+        "Time spent in SQL statements while serving a request.",
+        ("route",),
+    )
+)
+DB_QUERIES = REGISTRY.register(
+    Counter("db_queries_total", "SQL statements executed.", ("engine",))
+)
+DB_QUERY_TIME = REGISTRY.register(
+    Counter("db_query_seconds_total", "Time spent in SQL statements.", ("engine",))
+)
+QUERY_BUDGET_EXCEEDED = REGISTRY.register(
+    Counter(
+        "db_query_budget_exceeded_total",
+        "Requests that ran more SQL statements than their route's query budget.",
+        ("route",),
+    )
+)
+TRADE_TRANSITIONS = REGISTRY.register(
+    Counter(
+        "trade_transitions_total",
+        "Trade history records written, by action.",
+        ("action",),
+    )
+)
+
+
+class RequestStats:
+    """SQL work of the request being served"""
+
+    __slots__ = ("queries", "db_time", "allowance")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        # statements allowed on top of the route's query budget.
+        self.allowance = 0
+
+
+# set by the middleware, copied into the threads sync routes run in.
+current_request: contextvars.ContextVar[Optional[RequestStats]] = (
+    contextvars.ContextVar("current_request", default=None)
+)
+
+
+def allow_queries(statements: int) -> None:
+    """Raise the query budget of the current request, for work that scales with data"""
+    stats = current_request.get()
+    if stats is not None:
+        stats.allowance += statements
+
+
+def _route_of(scope) -> str:
+    route = scope.get("route")
+    # requests that match no route share one label, paths are unbounded.
+    return getattr(route, "path_format", None) or getattr(route, "path", "unmatched")
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording ``HTTP_REQUEST_DURATION`` and the SQL per request"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = "500"
+        stats = RequestStats()
+        exceeded = False
+
+        def check_budget():
+            nonlocal exceeded
+            budget = budget_of(scope.get("route"))
+            if exceeded or budget is None:
+                return
+            if stats.queries > budget + stats.allowance:
+                exceeded = True
+                route = _route_of(scope)
+                QUERY_BUDGET_EXCEEDED.inc(route)
+                over_budget(route, stats.queries, budget + stats.allowance)
+
+        async def send_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                # before the response starts, so "raise" fails the request.
+                check_budget()
+                status = str(message["status"])
+            await send(message)
+
+        token = current_request.set(stats)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            current_request.reset(token)
+            route = _route_of(scope)
+            HTTP_REQUEST_DURATION.observe(elapsed, scope["method"], route, status)
+            DB_QUERIES_PER_REQUEST.observe(stats.queries, route)
+            DB_TIME_PER_REQUEST.observe(stats.db_time, route)
+        # statements run while a streamed body was sent, after the status.
+        check_budget()
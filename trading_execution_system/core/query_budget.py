@@ -0,0 +1,46 @@
+"""
+SQL statement budgets per route, so a route that starts making an extra
+round-trip is caught rather than quietly slower.
+
+``query_budget(n)`` declares the most statements one request to the route may
+run, counted by ``MetricsMiddleware`` through the engine events. A request over
+its budget is counted in ``db_query_budget_exceeded_total`` and, depending on
+QUERY_BUDGET_MODE, logged as an error or failed with QueryBudgetExceededError.
+
+The budget is checked before the response starts, so a failed request gets a
+500. Statements a streamed body runs are checked once it is sent, when the
+status has gone out and the error can only surface on the server.
+"""
+
+import logging
+from typing import Optional
+
+from trading_execution_system.core.config import QUERY_BUDGET_MODE
+from trading_execution_system.core.exceptions import QueryBudgetExceededError
+
+logger = logging.getLogger(__name__)
+
+# "off", "log" or "raise", the tests switch it to "raise".
+mode = QUERY_BUDGET_MODE
+
+
+def query_budget(statements: int):
+    """Declare the most SQL statements one request to the decorated route may run"""
+
+    def decorate(func):
+        func.query_budget = statements
+        return func
+
+    return decorate
+
+
+def budget_of(route) -> Optional[int]:
+    return getattr(getattr(route, "endpoint", None), "query_budget", None)
+
+
+def over_budget(route: str, statements: int, budget: int) -> None:
+    message = f"{route} ran {statements} SQL statements, its query budget is {budget}"
+    if mode == "raise":
+        raise QueryBudgetExceededError(message)
+    if mode == "log":
+        logger.error(message)
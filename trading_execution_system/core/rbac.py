@@ -1,13 +1,41 @@
+import inspect
 from functools import wraps
 from fastapi import HTTPException, status
 
-from trading_execution_system.db.settings import TradeORMRepository
 from trading_execution_system.models.user import UserRole
-from trading_execution_system.services.trade import TradeService
 
 
-trade_repo = TradeORMRepository()
-trade_service = TradeService(trade_repo)
+def _guard(func, check, needs_owner=lambda current_user: False):
+    """
+    Wrap a sync or async route handler so ``check(current_user, trade_owner)``
+    runs first. The trade owner is only looked up when ``needs_owner`` says so,
+    through the request's ``trade_service`` so the route reuses the loaded trade.
+    """
+    if inspect.iscoroutinefunction(func):
+
+        @wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            current_user = kwargs.get("current_user")
+            trade_owner = None
+            if needs_owner(current_user):
+                trade_service = kwargs.get("trade_service")
+                trade_owner = await trade_service.get_trade_user(kwargs.get("trade_id"))
+            check(current_user, trade_owner)
+            return await func(*args, **kwargs)
+
+        return async_wrapper
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        current_user = kwargs.get("current_user")
+        trade_owner = None
+        if needs_owner(current_user):
+            trade_service = kwargs.get("trade_service")
+            trade_owner = trade_service.get_trade_user(kwargs.get("trade_id"))
+        check(current_user, trade_owner)
+        return func(*args, **kwargs)
+
+    return wrapper
 
 
 # TODO: I need to implemnent proper RBAC , similar to this and store the user session data , as well as issue jwt tokens
@@ -16,17 +44,14 @@ def any_user_only(func):
     Decorator to ensure the current user is a requester.
     """
 
-    @wraps(func)
-    def wrapper(*args, **kwargs):
-        current_user = kwargs.get("current_user")
+    def check(current_user, trade_owner):
         if current_user.role != UserRole.USER:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Only requesters can perform this action.",
             )
-        return func(*args, **kwargs)
 
-    return wrapper
+    return _guard(func, check)
 
 
 def requester_only(func):
@@ -34,21 +59,16 @@ def requester_only(func):
     Decorator to ensure the current user is a requester.
     """
 
-    @wraps(func)
-    def wrapper(*args, **kwargs):
-        current_user = kwargs.get("current_user")
-        trade_id = kwargs.get("trade_id")
-        if (
-            current_user.role != UserRole.USER
-            and current_user.id != trade_service.get_trade_user(trade_id)
-        ):
+    def check(current_user, trade_owner):
+        if current_user.role != UserRole.USER and current_user.id != trade_owner:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Only requesters can perform this action.",
             )
-        return func(*args, **kwargs)
 
-    return wrapper
+    return _guard(
+        func, check, needs_owner=lambda current_user: current_user.role != UserRole.USER
+    )
 
 
 def admin_only(func):
@@ -56,17 +76,14 @@ def admin_only(func):
     Decorator to ensure the current user is an approver.
     """
 
-    @wraps(func)
-    def wrapper(*args, **kwargs):
-        current_user = kwargs.get("current_user")
+    def check(current_user, trade_owner):
         if current_user.role != UserRole.ADMIN:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Only approvers can perform this action.",
             )
-        return func(*args, **kwargs)
 
-    return wrapper
+    return _guard(func, check)
 
 
 def requester_or_approver(func):
@@ -74,18 +91,11 @@ def requester_or_approver(func):
     Decorator to ensure the current user is either a requester or an approver.
     """
 
-    @wraps(func)
-    def wrapper(*args, **kwargs):
-        current_user = kwargs.get("current_user")
-        trade_id = kwargs.get("trade_id")
-        if (
-            current_user.id != trade_service.get_trade_user(trade_id)
-            and current_user.role != UserRole.ADMIN
-        ):
+    def check(current_user, trade_owner):
+        if current_user.id != trade_owner and current_user.role != UserRole.ADMIN:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Only requesters or approvers can perform this action.",
             )
-        return func(*args, **kwargs)
 
-    return wrapper
+    return _guard(func, check, needs_owner=lambda current_user: True)
@@ -0,0 +1,131 @@
+from collections import Counter
+from typing import List, Optional, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from trading_execution_system.core.config import ASYNC_DATABASE_URL
+from trading_execution_system.db.settings import (
+    StoredSnapshot,
+    OutboxModel,
+    UnderlyingModel,
+    _delete_underlying,
+    _underlying_changed,
+    _underlying_rows,
+    _json_serializer,
+    _trade_model,
+    _history_models,
+    _update_trade,
+    _conflict,
+    _count_transitions,
+    _count_change,
+    _count_updates,
+    _outbox_rows,
+    _new_trades,
+    _stored_state,
+    _to_domain,
+    _page,
+    _select_trade,
+    _select_summary,
+    _to_summary,
+    _select_next_seq,
+    _select_history_length,
+    _select_history_entries,
+    _select_page,
+    pool_options,
+    sqlite_pragmas,
+)
+from trading_execution_system.models.trade import Trade, TradeQuery, TradeSummary
+from trading_execution_system.utils.serialization import loads
+
+# aiosqlite for local runs and tests, asyncpg in production. The schema is
+# created through the sync engine in db.settings.
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    json_serializer=_json_serializer,
+    json_deserializer=loads,
+    **pool_options(ASYNC_DATABASE_URL),
+)
+sqlite_pragmas(async_engine.sync_engine)
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, autoflush=False, expire_on_commit=False
+)
+
+
+async def _update_counts(db, changes: Counter) -> None:
+    for statement, rows in _count_updates(db.bind.dialect.name, changes):
+        await db.execute(statement, rows)
+
+
+class AsyncTradeORMRepository:
+    """Same contract as TradeORMRepository on top of AsyncSession"""
+
+    @staticmethod
+    async def create(trade: Trade) -> Trade:
+        async with AsyncSessionLocal() as db:
+            db.add(_trade_model(trade))
+            await _update_counts(db, _new_trades([trade]))
+            await db.commit()
+        _count_transitions(record.action for record in trade.history)
+        return trade
+
+    @staticmethod
+    async def get(trade_id: str) -> Optional[Trade]:
+        async with AsyncSessionLocal() as db:
+            result = await db.scalars(_select_trade(trade_id))
+            trade_model = result.unique().first()
+            if not trade_model:
+                return None
+            return _to_domain(trade_model)
+
+    @staticmethod
+    async def get_summary(trade_id: str) -> Optional[TradeSummary]:
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(_select_summary(trade_id))
+            return _to_summary(result.first())
+
+    @staticmethod
+    async def update(trade: Trade) -> None:
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(_update_trade(trade))
+            if result.rowcount != 1:
+                await db.rollback()
+                raise _conflict(trade)
+            next_seq = await db.scalar(_select_next_seq(str(trade.id)))
+            if _underlying_changed(trade, next_seq):
+                await db.execute(_delete_underlying(str(trade.id)))
+                await db.execute(insert(UnderlyingModel), _underlying_rows(trade))
+            db.add_all(_history_models(trade, next_seq))
+            outbox_rows = _outbox_rows(trade, next_seq)
+            if outbox_rows:
+                await db.execute(insert(OutboxModel), outbox_rows)
+            changes = Counter()
+            _count_change(
+                changes,
+                trade.requester_id,
+                _stored_state(trade, next_seq),
+                trade.state,
+            )
+            await _update_counts(db, changes)
+            await db.commit()
+        trade.version += 1
+        _count_transitions(record.action for record in trade.history[next_seq:])
+
+    @staticmethod
+    async def get_history_length(trade_id: str) -> Optional[int]:
+        async with AsyncSessionLocal() as db:
+            return await db.scalar(_select_history_length(trade_id))
+
+    @staticmethod
+    async def get_history_entries(
+        trade_id: str, from_seq: int, to_seq: int
+    ) -> List[StoredSnapshot]:
+        async with AsyncSessionLocal() as db:
+            rows = await db.execute(_select_history_entries(trade_id, from_seq, to_seq))
+            return [StoredSnapshot(*row) for row in rows]
+
+    @staticmethod
+    async def query(query: TradeQuery) -> Tuple[List[Trade], Optional[str]]:
+        async with AsyncSessionLocal() as db:
+            result = await db.scalars(_select_page(query))
+            return _page(list(result.all()), query)
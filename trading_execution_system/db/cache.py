@@ -0,0 +1,276 @@
+import copy
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional, Tuple
+
+from trading_execution_system.db.settings import TradeORMRepository, StoredSnapshot
+from trading_execution_system.db.async_settings import AsyncTradeORMRepository
+from trading_execution_system.models.enums import TradeAction, TradeState
+from trading_execution_system.models.trade import (
+    Trade,
+    TradeQuery,
+    TradeSummary,
+    BatchResult,
+)
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    size: int = 0
+    max_size: int = 0
+
+
+class CacheBackend(ABC):
+    """
+    Key/value store behind the trade cache. The in-process LRUCache is the
+    default, a shared store only has to implement these methods.
+    """
+
+    @abstractmethod
+    def get(self, key: Hashable) -> Optional[Any]:
+        """The cached value, None on a miss."""
+
+    @abstractmethod
+    def set(self, key: Hashable, value: Any) -> None: ...
+
+    @abstractmethod
+    def delete(self, key: Hashable) -> None: ...
+
+    @abstractmethod
+    def clear(self) -> None: ...
+
+    @abstractmethod
+    def stats(self) -> CacheStats: ...
+
+
+class LRUCache(CacheBackend):
+    """
+    Thread safe, size bounded cache evicting the least recently used entry.
+    Entries older than ``ttl`` seconds are treated as misses when ttl is set.
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        ttl: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = CacheStats(max_size=max_size)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl is not None:
+                if self.clock() - entry[0] > self.ttl:
+                    del self._entries[key]
+                    entry = None
+            if entry is None:
+                self._stats.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (self.clock(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._stats.evictions += 1
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._stats = CacheStats(max_size=self.max_size)
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(
+                hits=self._stats.hits,
+                misses=self._stats.misses,
+                evictions=self._stats.evictions,
+                size=len(self._entries),
+                max_size=self.max_size,
+            )
+
+
+class TradeCache:
+    """
+    Trades by id on top of a CacheBackend. Callers always get their own copy,
+    so a request mutating its trade never leaks into the cache.
+
+    Every write bumps a generation number. A read only fills the cache when no
+    write happened while it was loading, which keeps a slow read from putting
+    back a version that a concurrent transition already replaced.
+    """
+
+    def __init__(self, backend: CacheBackend):
+        self.backend = backend
+        self.generation = 0
+        self._lock = threading.Lock()
+
+    def get(self, trade_id: str) -> Optional[Trade]:
+        trade = self.backend.get(trade_id)
+        return copy.deepcopy(trade) if trade is not None else None
+
+    def fill(self, trade: Trade, generation: int) -> None:
+        with self._lock:
+            if generation == self.generation:
+                self.backend.set(str(trade.id), copy.deepcopy(trade))
+
+    def store(self, trade: Trade) -> None:
+        with self._lock:
+            self.generation += 1
+            self.backend.set(str(trade.id), copy.deepcopy(trade))
+
+    def invalidate(self, trade_id: str) -> None:
+        with self._lock:
+            self.generation += 1
+            self.backend.delete(trade_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.generation += 1
+            self.backend.clear()
+
+    def stats(self) -> CacheStats:
+        return self.backend.stats()
+
+
+class CachedTradeRepository:
+    """
+    Read-through cache in front of TradeORMRepository. Writes go to the
+    database first and then replace the cached trade, a failed write drops it.
+    Summaries and history lengths are column-only lookups and always read from
+    the database, the cache only holds this process's writes.
+    """
+
+    def __init__(self, repository: TradeORMRepository, cache: TradeCache):
+        self.repository = repository
+        self.cache = cache
+
+    def create(self, trade: Trade) -> Trade:
+        self.repository.create(trade)
+        self.cache.store(trade)
+        return trade
+
+    def create_many(self, trades: List[Trade]) -> List[Trade]:
+        # new trades are not cached, a bulk load would evict the hot ones.
+        return self.repository.create_many(trades)
+
+    def get(self, trade_id: str) -> Optional[Trade]:
+        trade = self.cache.get(trade_id)
+        if trade is None:
+            generation = self.cache.generation
+            trade = self.repository.get(trade_id)
+            if trade is not None:
+                self.cache.fill(trade, generation)
+        return trade
+
+    def get_summary(self, trade_id: str) -> Optional[TradeSummary]:
+        return self.repository.get_summary(trade_id)
+
+    def update(self, trade: Trade) -> None:
+        try:
+            self.repository.update(trade)
+        except Exception:
+            self.cache.invalidate(str(trade.id))
+            raise
+        self.cache.store(trade)
+
+    def batch_transition(
+        self,
+        trade_ids: List[str],
+        action: TradeAction,
+        user_id: str,
+        check: Callable[[TradeSummary], TradeState],
+        strikes: Optional[Dict[str, float]] = None,
+    ) -> List[BatchResult]:
+        try:
+            return self.repository.batch_transition(
+                trade_ids, action, user_id, check, strikes
+            )
+        finally:
+            for trade_id in trade_ids:
+                self.cache.invalidate(trade_id)
+
+    def get_history_length(self, trade_id: str) -> Optional[int]:
+        return self.repository.get_history_length(trade_id)
+
+    def get_history_entries(
+        self, trade_id: str, from_seq: int, to_seq: int
+    ) -> List[StoredSnapshot]:
+        return self.repository.get_history_entries(trade_id, from_seq, to_seq)
+
+    def query(self, query: TradeQuery) -> Tuple[List[Trade], Optional[str]]:
+        return self.repository.query(query)
+
+    def export(
+        self, query: TradeQuery, include_history: bool
+    ) -> Iterator[Dict[str, Any]]:
+        return self.repository.export(query, include_history)
+
+    def list_all(self) -> List[Trade]:
+        return self.repository.list_all()
+
+
+class AsyncCachedTradeRepository:
+    """CachedTradeRepository for the asyncio repository, sharing the same cache"""
+
+    def __init__(self, repository: AsyncTradeORMRepository, cache: TradeCache):
+        self.repository = repository
+        self.cache = cache
+
+    async def create(self, trade: Trade) -> Trade:
+        await self.repository.create(trade)
+        self.cache.store(trade)
+        return trade
+
+    async def get(self, trade_id: str) -> Optional[Trade]:
+        trade = self.cache.get(trade_id)
+        if trade is None:
+            generation = self.cache.generation
+            trade = await self.repository.get(trade_id)
+            if trade is not None:
+                self.cache.fill(trade, generation)
+        return trade
+
+    async def get_summary(self, trade_id: str) -> Optional[TradeSummary]:
+        return await self.repository.get_summary(trade_id)
+
+    async def update(self, trade: Trade) -> None:
+        try:
+            await self.repository.update(trade)
+        except Exception:
+            self.cache.invalidate(str(trade.id))
+            raise
+        self.cache.store(trade)
+
+    async def get_history_length(self, trade_id: str) -> Optional[int]:
+        return await self.repository.get_history_length(trade_id)
+
+    async def get_history_entries(
+        self, trade_id: str, from_seq: int, to_seq: int
+    ) -> List[StoredSnapshot]:
+        return await self.repository.get_history_entries(trade_id, from_seq, to_seq)
+
+    async def query(self, query: TradeQuery) -> Tuple[List[Trade], Optional[str]]:
+        return await self.repository.query(query)
@@ -0,0 +1,79 @@
+"""
+Trade counts per state, per requester and over every requester. The counters
+are moved by the repository writes in the same transaction as the state
+change, reading them is a primary key lookup.
+
+If they ever drift, rebuild them from ``trades`` with:
+    poetry run rebuild-counters
+"""
+
+import argparse
+from typing import Dict, Optional
+
+from sqlalchemy import delete, func, insert, select, text
+
+import trading_execution_system.db.settings as db_settings
+from trading_execution_system.db.settings import (
+    StateCountModel,
+    StateTotalModel,
+    TradeModel,
+)
+from trading_execution_system.models.enums import TradeState
+
+
+def _select_counts(requester_id: Optional[str]):
+    if requester_id is None:
+        return select(StateTotalModel.state, StateTotalModel.count)
+    return select(StateCountModel.state, StateCountModel.count).where(
+        StateCountModel.requester_id == requester_id
+    )
+
+
+class StateCountRepository:
+    @staticmethod
+    def state_counts(requester_id: Optional[str] = None) -> Dict[str, int]:
+        """Trades in every state, for one requester or for all of them."""
+        counts = {state.name: 0 for state in TradeState}
+        with db_settings.session() as db:
+            for state, count in db.execute(_select_counts(requester_id)):
+                counts[state] = count
+        return counts
+
+    @staticmethod
+    def rebuild() -> None:
+        """Recompute every counter from ``trades`` in one transaction."""
+        with db_settings.session() as db:
+            if db.get_bind().dialect.name == "postgresql":
+                # writers wait until the counters are rebuilt.
+                db.execute(text("LOCK TABLE trades IN SHARE MODE"))
+            db.execute(delete(StateCountModel))
+            db.execute(delete(StateTotalModel))
+            db.execute(
+                insert(StateCountModel).from_select(
+                    ["requester_id", "state", "count"],
+                    select(
+                        TradeModel.requester_id, TradeModel.state, func.count()
+                    ).group_by(TradeModel.requester_id, TradeModel.state),
+                )
+            )
+            db.execute(
+                insert(StateTotalModel).from_select(
+                    ["state", "count"],
+                    select(TradeModel.state, func.count()).group_by(TradeModel.state),
+                )
+            )
+            db.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Rebuild the per requester and per state trade counters"
+    )
+    parser.parse_args()
+    StateCountRepository.rebuild()
+    for state, count in StateCountRepository.state_counts().items():
+        print(f"{state:<22} {count:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+SQLAlchemy instrumentation feeding ``core.metrics``.
+
+``install`` listens on every Engine, so SQL statements are counted and timed
+whatever engine runs them, and added to the request being served.
+``instrument_pool`` times how long checkouts of one engine's pool wait for a
+connection and reports how much of the pool is in use, for engines created with
+one of the TIMED_POOLS.
+"""
+
+import time
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from trading_execution_system.core.metrics import (
+    DB_QUERIES,
+    DB_QUERY_TIME,
+    REGISTRY,
+    Counter,
+    Gauge,
+    Histogram,
+    current_request,
+)
+
+POOL_WAIT = REGISTRY.register(
+    Histogram(
+        "db_pool_checkout_wait_seconds",
+        "Time to check a connection out of the pool.",
+        ("pool",),
+        (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5),
+    )
+)
+POOL_TIMEOUTS = REGISTRY.register(
+    Counter(
+        "db_pool_checkout_timeouts_total",
+        "Checkouts that gave up waiting for a connection.",
+        ("pool",),
+    )
+)
+
+_pools = {}
+
+
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    driver = conn.dialect.driver
+    DB_QUERIES.inc(driver)
+    DB_QUERY_TIME.inc(driver, amount=elapsed)
+    stats = current_request.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_time += elapsed
+
+
+def _failed_execute(context):
+    # a statement that raises never reaches after_cursor_execute, its start
+    # would be left on the connection. Errors raised before the statement ran,
+    # connecting or creating its cursor, have no execution context.
+    if context.connection is not None and context.execution_context is not None:
+        starts = context.connection.info.get("query_start")
+        if starts:
+            starts.pop()
+
+
+def install() -> None:
+    """Count and time the statements of every engine, idempotent"""
+    if not event.contains(Engine, "before_cursor_execute", _before_execute):
+        event.listen(Engine, "before_cursor_execute", _before_execute)
+        event.listen(Engine, "after_cursor_execute", _after_execute)
+        event.listen(Engine, "handle_error", _failed_execute)
+
+
+class _TimedCheckouts:
+    """
+    Pool timing ``connect``, the checkout that waits for a free connection, once
+    ``instrument_pool`` has named it. ``capacity`` is the most connections it
+    hands out, None when it is unbounded.
+    """
+
+    metrics_name: Optional[str] = None
+
+    def __init__(self, creator, pool_size: int = 5, max_overflow: int = 10, **kw):
+        super().__init__(creator, pool_size=pool_size, max_overflow=max_overflow, **kw)
+        # QueuePool turns a pool_size of 0 into an unbounded overflow.
+        bounded = pool_size > 0 and max_overflow >= 0
+        self.capacity = pool_size + max_overflow if bounded else None
+
+    def connect(self):
+        name = self.metrics_name
+        if name is None:
+            return super().connect()
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        except PoolTimeoutError:
+            POOL_TIMEOUTS.inc(name)
+            raise
+        finally:
+            POOL_WAIT.observe(time.perf_counter() - start, name)
+
+    def recreate(self):
+        # dispose replaces the pool with a recreated one.
+        pool = super().recreate()
+        pool.metrics_name = self.metrics_name
+        return pool
+
+
+class TimedQueuePool(_TimedCheckouts, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(_TimedCheckouts, AsyncAdaptedQueuePool):
+    pass
+
+
+# the timed pool to create an engine with in place of its default pool.
+TIMED_POOLS = {
+    QueuePool: TimedQueuePool,
+    AsyncAdaptedQueuePool: TimedAsyncAdaptedQueuePool,
+}
+
+
+def instrument_pool(engine: Engine, name: str) -> None:
+    """
+    Time the checkouts of ``engine``'s pool and report its use under ``name``.
+    Only the TIMED_POOLS have waits and a capacity, other pools are left alone.
+    """
+    if not isinstance(engine.pool, _TimedCheckouts) or name in _pools:
+        return
+    engine.pool.metrics_name = name
+    _pools[name] = engine
+
+
+def _collect_pools(value):
+    def collect():
+        for name, engine in _pools.items():
+            pool = engine.pool
+            if pool.capacity is not None:
+                yield (name,), value(pool)
+
+    return collect
+
+
+REGISTRY.register(
+    Gauge(
+        "db_pool_checked_out",
+        "Connections checked out of the pool.",
+        _collect_pools(lambda pool: pool.checkedout()),
+        ("pool",),
+    )
+)
+REGISTRY.register(
+    Gauge(
+        "db_pool_capacity",
+        "Pool size plus overflow, the most connections the pool hands out.",
+        _collect_pools(lambda pool: pool.capacity),
+        ("pool",),
+    )
+)
+REGISTRY.register(
+    Gauge(
+        "db_pool_saturation",
+        "Share of the pool capacity checked out.",
+        _collect_pools(lambda pool: pool.checkedout() / pool.capacity),
+        ("pool",),
+    )
+)
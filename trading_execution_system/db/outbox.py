@@ -0,0 +1,148 @@
+"""
+Outbox reads and writes of the dispatcher. Messages are claimed with a lease
+rather than held in a transaction during the counterparty round-trip, so
+several dispatchers can drain one table and a crashed one only delays its
+messages until the lease runs out.
+"""
+
+import datetime
+from typing import Dict, List, Tuple
+
+from sqlalchemy import bindparam, func, select, update
+
+import trading_execution_system.db.async_settings as async_db_settings
+import trading_execution_system.db.settings as db_settings
+from trading_execution_system.db.settings import OutboxModel
+from trading_execution_system.models.enums import OutboxStatus
+from trading_execution_system.models.outbox import OutboxMessage
+
+
+def _select_due(now: datetime.datetime, limit: int):
+    return (
+        select(
+            OutboxModel.id,
+            OutboxModel.trade_id,
+            OutboxModel.action,
+            OutboxModel.payload,
+            OutboxModel.attempts,
+            OutboxModel.created_at,
+        )
+        .where(
+            OutboxModel.status == OutboxStatus.PENDING.name,
+            OutboxModel.available_at <= now,
+        )
+        .order_by(OutboxModel.available_at, OutboxModel.id)
+        .limit(limit)
+        # concurrent dispatchers skip each other's rows where supported.
+        .with_for_update(skip_locked=True)
+    )
+
+
+def _settle_retry():
+    # executemany, parameters are b_id, available_at, status and last_error.
+    table = OutboxModel.__table__
+    return (
+        update(table)
+        .where(table.c.id == bindparam("b_id"))
+        .values(
+            available_at=bindparam("available_at"),
+            status=bindparam("status"),
+            last_error=bindparam("last_error"),
+        )
+    )
+
+
+class OutboxRepository:
+    @staticmethod
+    def depth() -> Dict[str, int]:
+        """
+        Pending and failed messages, counted from the status index. Dispatched
+        rows stay as a record and are not counted.
+        """
+        waiting = [OutboxStatus.PENDING.name, OutboxStatus.FAILED.name]
+        counts = dict.fromkeys(waiting, 0)
+        with db_settings.session() as db:
+            rows = db.execute(
+                select(OutboxModel.status, func.count())
+                .where(OutboxModel.status.in_(waiting))
+                .group_by(OutboxModel.status)
+            )
+            counts.update(dict(rows.all()))
+        return counts
+
+
+class AsyncOutboxRepository:
+    @staticmethod
+    async def claim(limit: int, lease: float) -> List[OutboxMessage]:
+        """
+        Up to ``limit`` due messages, oldest first. They are not offered again
+        for ``lease`` seconds, unless they are settled before.
+        """
+        now = datetime.datetime.utcnow()
+        async with async_db_settings.AsyncSessionLocal() as db:
+            rows = (await db.execute(_select_due(now, limit))).all()
+            if not rows:
+                return []
+            await db.execute(
+                update(OutboxModel)
+                .where(OutboxModel.id.in_([row.id for row in rows]))
+                .values(
+                    available_at=now + datetime.timedelta(seconds=lease),
+                    attempts=OutboxModel.attempts + 1,
+                )
+            )
+            await db.commit()
+        return [
+            OutboxMessage(
+                id=row.id,
+                trade_id=row.trade_id,
+                action=row.action,
+                payload=row.payload,
+                attempts=row.attempts + 1,
+                created_at=row.created_at,
+            )
+            for row in rows
+        ]
+
+    @staticmethod
+    async def settle(
+        dispatched: List[int],
+        retries: Dict[int, Tuple[datetime.datetime, str]],
+        failed: Dict[int, str],
+    ) -> None:
+        """
+        Mark messages dispatched, offer others again at their retry time with
+        their last error, and give up on the failed ones, in one transaction.
+        """
+        now = datetime.datetime.utcnow()
+        async with async_db_settings.AsyncSessionLocal() as db:
+            if dispatched:
+                await db.execute(
+                    update(OutboxModel)
+                    .where(OutboxModel.id.in_(dispatched))
+                    .values(
+                        status=OutboxStatus.DISPATCHED.name,
+                        dispatched_at=now,
+                        last_error=None,
+                    )
+                )
+            rows = [
+                {
+                    "b_id": message_id,
+                    "available_at": available_at,
+                    "status": OutboxStatus.PENDING.name,
+                    "last_error": error,
+                }
+                for message_id, (available_at, error) in retries.items()
+            ] + [
+                {
+                    "b_id": message_id,
+                    "available_at": now,
+                    "status": OutboxStatus.FAILED.name,
+                    "last_error": error,
+                }
+                for message_id, error in failed.items()
+            ]
+            if rows:
+                await db.execute(_settle_retry(), rows)
+            await db.commit()
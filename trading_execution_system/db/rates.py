@@ -0,0 +1,50 @@
+"""
+Market rates the P&L engine revalues the executed book against, read from a
+local CSV file with a ``currency,rate`` header. Rates are quoted like the
+strikes they are compared to.
+"""
+
+import csv
+import hashlib
+import io
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, Tuple
+
+
+@dataclass(frozen=True)
+class RateSnapshot:
+    """One version of the rate file, ``id`` changes with its contents"""
+
+    id: str
+    rates: Dict[str, float] = field(hash=False)
+
+
+_snapshots: Dict[str, Tuple[Tuple[int, int], RateSnapshot]] = {}
+_lock = threading.Lock()
+
+
+def parse_rates(content: bytes) -> RateSnapshot:
+    rates = {}
+    for line, row in enumerate(csv.DictReader(io.StringIO(content.decode())), 2):
+        try:
+            rates[row["currency"].strip()] = float(row["rate"])
+        except (KeyError, AttributeError, TypeError, ValueError):
+            raise ValueError(f"Invalid rate on line {line}: {row}")
+    return RateSnapshot(hashlib.sha256(content).hexdigest()[:16], rates)
+
+
+def load_rate_snapshot(path: str) -> RateSnapshot:
+    """The rates in ``path``, only read again once the file has changed."""
+    stat = os.stat(path)
+    version = (stat.st_mtime_ns, stat.st_size)
+    with _lock:
+        cached = _snapshots.get(path)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+    with open(path, "rb") as f:
+        snapshot = parse_rates(f.read())
+    with _lock:
+        _snapshots[path] = (version, snapshot)
+    return snapshot
@@ -0,0 +1,171 @@
+"""
+Trade report aggregated by the database, only the groups travel back to
+Python. PostgreSQL computes every dimension in one scan with GROUPING SETS,
+other databases run one GROUP BY per dimension over its covering index.
+
+The P&L engine reads the executed book from here as plain columns.
+"""
+
+import datetime
+from typing import Any, Dict, List, Tuple
+
+from sqlalchemy import Float, String, func, select, tuple_, type_coerce
+
+import trading_execution_system.db.settings as db_settings
+from trading_execution_system.db.settings import StateTotalModel, TradeModel
+from trading_execution_system.models.enums import TradeState
+from trading_execution_system.models.report import (
+    REPORT_BUCKETS,
+    ReportGroup,
+    ReportQuery,
+    TradeReport,
+)
+
+_DIMENSIONS = {
+    "by_state": TradeModel.state,
+    "by_counterparty": TradeModel.counterparty,
+    "by_currency": TradeModel.currency,
+    "by_direction": TradeModel.direction,
+    # grouped by day in the database, in index order, then into buckets.
+    "by_trade_date": TradeModel.trade_date,
+}
+
+# numbers and dates come back as the driver returns them, skipping the per-row
+# conversions: SQLite gives ISO date strings, PostgreSQL date objects.
+_BOOK_COLUMNS = (
+    TradeModel.requester_id,
+    TradeModel.currency,
+    type_coerce(TradeModel.notional_amount, Float),
+    type_coerce(TradeModel.strike, Float),
+    TradeModel.direction,
+    type_coerce(TradeModel.value_date, String),
+)
+
+
+def _report_filters(query: ReportQuery) -> list:
+    filters = []
+    if query.requester_id is not None:
+        filters.append(TradeModel.requester_id == query.requester_id)
+    if query.trade_date_from is not None:
+        filters.append(TradeModel.trade_date >= query.trade_date_from)
+    if query.trade_date_to is not None:
+        filters.append(TradeModel.trade_date <= query.trade_date_to)
+    return filters
+
+
+def _aggregates():
+    # count(*) rather than count(id), so the covering indexes are enough.
+    return func.count(), func.coalesce(func.sum(TradeModel.notional_amount), 0)
+
+
+def _select_groups(key, query: ReportQuery):
+    return (
+        select(key, *_aggregates())
+        .where(*_report_filters(query))
+        .group_by(key)
+        .order_by(key)
+    )
+
+
+def _select_grouping_sets(query: ReportQuery):
+    """Every dimension in one scan, GROUPING() tells which one a row is for."""
+    keys = list(_DIMENSIONS.values())
+    return (
+        select(*keys, *(func.grouping(key) for key in keys), *_aggregates())
+        .where(*_report_filters(query))
+        .group_by(func.grouping_sets(*(tuple_(key) for key in keys)))
+    )
+
+
+def _grouping_set_rows(result) -> Dict[str, list]:
+    """``(key, count, notional)`` rows per dimension from ``_select_grouping_sets``"""
+    width = len(_DIMENSIONS)
+    rows = {name: [] for name in _DIMENSIONS}
+    for row in result:
+        position = list(row[width : 2 * width]).index(0)
+        name = list(_DIMENSIONS)[position]
+        rows[name].append((row[position], *row[2 * width :]))
+    return rows
+
+
+def _bucket_start(day: datetime.date, bucket: str) -> datetime.date:
+    if bucket == "year":
+        return day.replace(month=1, day=1)
+    if bucket == "month":
+        return day.replace(day=1)
+    return day
+
+
+def _groups(rows, bucket: str = None) -> List[ReportGroup]:
+    groups: Dict[Any, ReportGroup] = {}
+    for key, count, notional in rows:
+        if bucket is not None:
+            key = _bucket_start(key, bucket).isoformat()
+        group = groups.setdefault(key, ReportGroup(key, 0, 0.0))
+        group.count += count
+        group.notional += float(notional)
+    return sorted(groups.values(), key=lambda group: group.key)
+
+
+class TradeReportRepository:
+    @staticmethod
+    def trade_report(query: ReportQuery) -> TradeReport:
+        if query.bucket not in REPORT_BUCKETS:
+            raise ValueError(f"Unknown report bucket {query.bucket}")
+        with db_settings.session() as db:
+            if db.get_bind().dialect.name == "postgresql":
+                rows = _grouping_set_rows(db.execute(_select_grouping_sets(query)))
+            else:
+                rows = {
+                    name: db.execute(_select_groups(key, query)).all()
+                    for name, key in _DIMENSIONS.items()
+                }
+        groups = {
+            name: _groups(
+                dimension_rows, query.bucket if name == "by_trade_date" else None
+            )
+            for name, dimension_rows in rows.items()
+        }
+        # every trade has a state, the totals add up from that dimension.
+        return TradeReport(
+            count=sum(group.count for group in groups["by_state"]),
+            notional=sum(group.notional for group in groups["by_state"]),
+            **groups,
+        )
+
+    @staticmethod
+    def executed_book_version() -> Tuple[int, Any]:
+        """
+        Changes whenever a trade is booked, written or updated out of EXECUTED:
+        a new one moves the latest write, a leaving one lowers the count. Both
+        are index lookups, the count is read from the state counters.
+        """
+        executed = TradeState.EXECUTED.name
+        with db_settings.session() as db:
+            count = db.scalar(
+                select(StateTotalModel.count).where(StateTotalModel.state == executed)
+            )
+            updated_at = db.scalar(
+                select(func.max(TradeModel.updated_at)).where(
+                    TradeModel.state == executed
+                )
+            )
+        return count or 0, updated_at
+
+    @staticmethod
+    def executed_book() -> List[tuple]:
+        """requester, currency, notional, strike, direction and value date columns"""
+        with db_settings.session() as db:
+            # plain rows from the connection, the ORM adds nothing for columns.
+            rows = (
+                db.connection()
+                .execute(
+                    select(*_BOOK_COLUMNS).where(
+                        TradeModel.state == TradeState.EXECUTED.name
+                    )
+                )
+                .all()
+            )
+        if not rows:
+            return [() for _ in _BOOK_COLUMNS]
+        return list(zip(*rows))
@@ -1,29 +1,87 @@
+import base64
+import contextvars
 import datetime
+import json
 import uuid
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
 from uuid import UUID
-from typing import Optional, List
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, List, Tuple
 
-from sqlalchemy import create_engine, Column, String, DateTime, JSON, ForeignKey
-from sqlalchemy.orm import sessionmaker, relationship, declarative_base
+from sqlalchemy import (
+    create_engine,
+    select,
+    insert,
+    update,
+    delete,
+    func,
+    and_,
+    or_,
+    bindparam,
+    Index,
+    Column,
+    String,
+    Integer,
+    Boolean,
+    Date,
+    DateTime,
+    Numeric,
+    JSON,
+    ForeignKey,
+    UniqueConstraint,
+    event,
+)
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.orm import (
+    sessionmaker,
+    relationship,
+    declarative_base,
+    joinedload,
+    noload,
+    selectinload,
+    Session,
+)
+from sqlalchemy.pool import QueuePool
 
-from trading_execution_system.core.config import DATABASE_URL
-from trading_execution_system.models.enums import TradeState
-from trading_execution_system.models.trade import Trade, TradeDetails, HistoryRecord
+from trading_execution_system.core.exceptions import TradeConflictError
+from trading_execution_system.core.metrics import TRADE_TRANSITIONS
+from trading_execution_system.db.instrumentation import TIMED_POOLS
+from trading_execution_system.core.config import (
+    DATABASE_URL,
+    DB_MAX_OVERFLOW,
+    DB_POOL_PRE_PING,
+    DB_POOL_RECYCLE,
+    DB_POOL_SIZE,
+    DB_POOL_TIMEOUT,
+    HISTORY_STORAGE_MODE,
+    HISTORY_CHECKPOINT_INTERVAL,
+    SQLITE_BUSY_TIMEOUT,
+    SQLITE_CACHE_SIZE,
+    SQLITE_JOURNAL_MODE,
+    SQLITE_MMAP_SIZE,
+    SQLITE_SYNCHRONOUS,
+)
+from trading_execution_system.models.enums import (
+    OutboxStatus,
+    TradeState,
+    TradeAction,
+)
+from trading_execution_system.models.trade import (
+    Trade,
+    TradeDetails,
+    HistoryRecord,
+    TradeQuery,
+    TradeSummary,
+    BatchResult,
+)
+from trading_execution_system.utils.diff import compute_delta, apply_delta
+from trading_execution_system.utils.serialization import dumps, loads, to_json_value
 
 Base = declarative_base()
 
 
-def serialize_data(data):
-    if isinstance(data, dict):
-        return {k: serialize_data(v) for k, v in data.items()}
-    elif isinstance(data, list):
-        return [serialize_data(item) for item in data]
-    elif isinstance(data, (datetime.date, datetime.datetime)):
-        return data.isoformat()
-    else:
-        return data
-
-
 class TradeModel(Base):
     """Base Trade model"""
 
@@ -31,7 +89,20 @@ class TradeModel(Base):
     id = Column(String, primary_key=True, index=True)
     requester_id = Column(String, nullable=False)
     state = Column(String, nullable=False)
-    details = Column(JSON, nullable=False)  # JSON col to store trade details.
+    # TradeDetails, one typed column per field and underlying in its own table.
+    trading_entity = Column(String, nullable=False)
+    counterparty = Column(String, nullable=False)
+    direction = Column(String, nullable=False)
+    style = Column(String, nullable=False)
+    currency = Column(String, nullable=False)
+    notional_amount = Column(Numeric(24, 8, asdecimal=False), nullable=False)
+    trade_date = Column(Date, nullable=False)
+    value_date = Column(Date, nullable=False)
+    delivery_date = Column(Date, nullable=False)
+    strike = Column(Numeric(24, 8, asdecimal=False))
+    # compared and bumped by every write, see _update_trade.
+    version = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, nullable=False, default=datetime.datetime.utcnow)
     updated_at = Column(
         DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow
     )
@@ -39,144 +110,1030 @@ class TradeModel(Base):
         "HistoryModel",
         back_populates="trade",
         cascade="all, delete-orphan",
-        lazy="joined",
+        # loaded per query: joined for a single trade, selectin for pages and
+        # not at all when the caller does not need it.
+        order_by="HistoryModel.seq",
+    )
+    # a handful of rows per trade, loaded with one IN query per statement.
+    underlyings = relationship(
+        "UnderlyingModel",
+        cascade="all, delete-orphan",
+        order_by="UnderlyingModel.position",
+        lazy="selectin",
     )
 
 
+class UnderlyingModel(Base):
+    """One currency of a trade's underlying, ``position`` keeps their order"""
+
+    __tablename__ = "trade_underlyings"
+    trade_id = Column(String, ForeignKey("trades.id"), primary_key=True)
+    position = Column(Integer, primary_key=True)
+    currency = Column(String, nullable=False)
+
+
+# trades by underlying currency, answered from the index alone.
+Index(
+    "ix_trade_underlyings_currency_trade_id",
+    UnderlyingModel.currency,
+    UnderlyingModel.trade_id,
+)
+
+
+class StateCountModel(Base):
+    """Trades per requester and state, changed with every state change"""
+
+    __tablename__ = "trade_state_counts"
+    requester_id = Column(String, primary_key=True)
+    state = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+
+class StateTotalModel(Base):
+    """Trades per state over every requester"""
+
+    __tablename__ = "trade_state_totals"
+    state = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+
+class OutboxModel(Base):
+    """
+    Message to the counterparty, written in the transaction of the transition
+    that produced it and sent later by the outbox dispatcher.
+    """
+
+    __tablename__ = "trade_outbox"
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    trade_id = Column(String, ForeignKey("trades.id"), nullable=False)
+    action = Column(String, nullable=False)
+    payload = Column(JSON, nullable=False)
+    status = Column(String, nullable=False, default=OutboxStatus.PENDING.name)
+    attempts = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, nullable=False, default=datetime.datetime.utcnow)
+    # not claimed before then: the retry backoff or the lease of a dispatcher.
+    available_at = Column(DateTime, nullable=False, default=datetime.datetime.utcnow)
+    dispatched_at = Column(DateTime)
+    last_error = Column(String)
+
+
+# the dispatcher claims due PENDING messages in this order.
+Index(
+    "ix_trade_outbox_status_available_at",
+    OutboxModel.status,
+    OutboxModel.available_at,
+    OutboxModel.id,
+)
+
+
+# keyset pagination walks (created_at, id) within the filtered column.
+Index("ix_trades_created_at_id", TradeModel.created_at, TradeModel.id)
+Index(
+    "ix_trades_requester_created_at_id",
+    TradeModel.requester_id,
+    TradeModel.created_at,
+    TradeModel.id,
+)
+# the trailing columns let the trade report group by state, counterparty,
+# currency and direction from these indexes alone, in index order.
+_REPORT_COLUMNS = (
+    TradeModel.trade_date,
+    TradeModel.requester_id,
+    TradeModel.notional_amount,
+)
+Index(
+    "ix_trades_state_created_at_id",
+    TradeModel.state,
+    TradeModel.created_at,
+    TradeModel.id,
+    *_REPORT_COLUMNS,
+)
+Index(
+    "ix_trades_counterparty_created_at_id",
+    TradeModel.counterparty,
+    TradeModel.created_at,
+    TradeModel.id,
+    *_REPORT_COLUMNS,
+)
+Index(
+    "ix_trades_currency_created_at_id",
+    TradeModel.currency,
+    TradeModel.created_at,
+    TradeModel.id,
+    *_REPORT_COLUMNS,
+)
+Index("ix_trades_direction_report", TradeModel.direction, *_REPORT_COLUMNS)
+# covers the report on its own when it is filtered by a trade date range.
+Index(
+    "ix_trades_trade_date",
+    *_REPORT_COLUMNS,
+    TradeModel.state,
+    TradeModel.counterparty,
+    TradeModel.currency,
+    TradeModel.direction,
+)
+Index("ix_trades_value_date", TradeModel.value_date)
+# latest write of the executed book, which versions the P&L cache.
+Index("ix_trades_state_updated_at", TradeModel.state, TradeModel.updated_at)
+
+
 class HistoryModel(Base):
+    """Immutable audit row, ordered per trade by ``seq``"""
+
     __tablename__ = "trade_history"
+    __table_args__ = (UniqueConstraint("trade_id", "seq", name="uq_trade_history_seq"),)
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()), index=True)
     trade_id = Column(String, ForeignKey("trades.id"), nullable=False)
+    seq = Column(Integer, nullable=False)  # position of the record in the trade history
     timestamp = Column(DateTime, default=datetime.datetime.utcnow)
     user_id = Column(String, nullable=False)
     action = Column(String, nullable=False)
     previous_state = Column(String, nullable=False)
     new_state = Column(String, nullable=False)
+    # full snapshot for checkpoints, changed fields only otherwise.
+    is_checkpoint = Column(Boolean, nullable=False, default=True)
     details_snapshot = Column(JSON, nullable=False)
 
     trade = relationship("TradeModel", back_populates="history")
 
 
-# Create the engine.
+@dataclass
+class StoredSnapshot:
+    """History snapshot as stored, either a checkpoint or a delta"""
+
+    seq: int
+    is_checkpoint: bool
+    payload: Dict[str, Any]
+
+
+def _encode_snapshot(
+    seq: int, snapshot: Dict[str, Any], previous: Optional[Dict[str, Any]]
+) -> Tuple[bool, Dict[str, Any]]:
+    """Whether the record at ``seq`` is a checkpoint, and the payload to store."""
+    is_checkpoint = (
+        HISTORY_STORAGE_MODE != "delta"
+        or previous is None
+        or seq % HISTORY_CHECKPOINT_INTERVAL == 0
+    )
+    if is_checkpoint:
+        return True, snapshot
+    return False, compute_delta(previous, snapshot)
+
+
+def _history_model(
+    trade_id: str,
+    seq: int,
+    hist: HistoryRecord,
+    previous: Optional[HistoryRecord] = None,
+) -> HistoryModel:
+    return HistoryModel(**_history_row(trade_id, seq, hist, previous))
+
+
+def _snapshot_value(details: Optional[TradeDetails]) -> Dict[str, Any]:
+    return to_json_value(details) if details is not None else {}
+
+
+# TradeDetails fields stored as columns of TradeModel, all but underlying.
+DETAIL_COLUMNS = (
+    "trading_entity",
+    "counterparty",
+    "direction",
+    "style",
+    "currency",
+    "notional_amount",
+    "trade_date",
+    "value_date",
+    "delivery_date",
+    "strike",
+)
+_DATE_FIELDS = ("trade_date", "value_date", "delivery_date")
+# Numeric columns come back from SQLite as ints when the value is whole.
+_FLOAT_FIELDS = ("notional_amount", "strike")
+
+
+def _detail_columns(details: TradeDetails) -> Dict[str, Any]:
+    return {name: getattr(details, name) for name in DETAIL_COLUMNS}
+
+
+def _details_of(row, underlying: List[str]) -> TradeDetails:
+    """Details from the typed columns of a trade model or row"""
+    values = {name: getattr(row, name) for name in DETAIL_COLUMNS}
+    for name in _FLOAT_FIELDS:
+        if values[name] is not None:
+            values[name] = float(values[name])
+    return TradeDetails(**values, underlying=underlying)
+
+
+def _snapshot_details(snapshot: Dict[str, Any]) -> TradeDetails:
+    # snapshots are JSON, dates come back as ISO strings.
+    values = dict(snapshot)
+    for name in _DATE_FIELDS:
+        if isinstance(values.get(name), str):
+            values[name] = datetime.date.fromisoformat(values[name])
+    return TradeDetails(**values)
+
+
+def _underlying_rows(trade: Trade) -> List[Dict[str, Any]]:
+    return [
+        {"trade_id": str(trade.id), "position": position, "currency": currency}
+        for position, currency in enumerate(trade.details.underlying)
+    ]
+
+
+def _underlying_changed(trade: Trade, next_seq: int) -> bool:
+    """Whether the records from ``next_seq`` on changed the stored underlying"""
+    if not next_seq:
+        return True
+    stored = trade.history[next_seq - 1].details_snapshot
+    return stored is None or stored.underlying != trade.details.underlying
+
+
+def _delete_underlying(trade_id: str):
+    return delete(UnderlyingModel).where(UnderlyingModel.trade_id == trade_id)
+
+
+def _history_row(
+    trade_id: str,
+    seq: int,
+    hist: HistoryRecord,
+    previous: Optional[HistoryRecord] = None,
+) -> Dict[str, Any]:
+    snapshot = _snapshot_value(hist.details_snapshot)
+    previous_snapshot = None
+    if previous is not None:
+        # unchanged details are shared by the records, no need to encode twice.
+        previous_snapshot = (
+            snapshot
+            if previous.details_snapshot is hist.details_snapshot
+            else _snapshot_value(previous.details_snapshot)
+        )
+    is_checkpoint, snapshot = _encode_snapshot(seq, snapshot, previous_snapshot)
+    return {
+        "id": str(uuid.uuid4()),
+        "trade_id": trade_id,
+        "seq": seq,
+        "user_id": hist.user_id,
+        "action": hist.action,
+        "previous_state": hist.previous_state.name,
+        "new_state": hist.new_state.name,
+        "is_checkpoint": is_checkpoint,
+        "details_snapshot": snapshot,
+        "timestamp": hist.timestamp,
+    }
+
+
+def _to_domain(trade_model: TradeModel) -> Trade:
+    trade = Trade(
+        id=UUID(trade_model.id),
+        requester_id=trade_model.requester_id,
+        state=TradeState[trade_model.state],
+        history=[],
+        version=trade_model.version,
+    )
+    stored = _details_of(
+        trade_model, [underlying.currency for underlying in trade_model.underlyings]
+    )
+    snapshot, details = {}, None
+    for hist in trade_model.history:
+        # deltas are rebuilt on top of the previous record.
+        if hist.is_checkpoint:
+            current = hist.details_snapshot
+        else:
+            current = apply_delta(snapshot, hist.details_snapshot)
+        # records with unchanged details share the previous record's instance.
+        if details is None or current != snapshot:
+            details = _snapshot_details(current)
+        snapshot = current
+        history_record = HistoryRecord(
+            timestamp=hist.timestamp,
+            user_id=hist.user_id,
+            action=hist.action,
+            previous_state=TradeState[hist.previous_state],
+            new_state=TradeState[hist.new_state],
+            details_snapshot=details,
+        )
+        trade.history.append(history_record)
+    # the latest record usually holds the current details, share it.
+    trade.details = details if details == stored else stored
+    return trade
+
+
+def _encode_cursor(trade_model: TradeModel) -> str:
+    position = [trade_model.created_at.isoformat(), trade_model.id]
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+
+def _decode_cursor(cursor: str) -> Tuple[datetime.datetime, str]:
+    try:
+        created_at, trade_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.datetime.fromisoformat(created_at), trade_id
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+
+
+def _query_filters(query: TradeQuery) -> list:
+    filters = []
+    if query.requester_id is not None:
+        filters.append(TradeModel.requester_id == query.requester_id)
+    if query.state is not None:
+        filters.append(TradeModel.state == query.state.name)
+    if query.counterparty is not None:
+        filters.append(TradeModel.counterparty == query.counterparty)
+    if query.currency is not None:
+        filters.append(TradeModel.currency == query.currency)
+    if query.trade_date_from is not None:
+        filters.append(TradeModel.trade_date >= query.trade_date_from)
+    if query.trade_date_to is not None:
+        filters.append(TradeModel.trade_date <= query.trade_date_to)
+    if query.value_date_from is not None:
+        filters.append(TradeModel.value_date >= query.value_date_from)
+    if query.value_date_to is not None:
+        filters.append(TradeModel.value_date <= query.value_date_to)
+    if query.cursor is not None:
+        created_at, trade_id = _decode_cursor(query.cursor)
+        filters.append(
+            or_(
+                TradeModel.created_at > created_at,
+                and_(TradeModel.created_at == created_at, TradeModel.id > trade_id),
+            )
+        )
+    return filters
+
+
+def _trade_row(trade: Trade) -> Dict[str, Any]:
+    return {
+        "id": str(trade.id),
+        "requester_id": trade.requester_id,
+        "state": trade.state.name,
+        **_detail_columns(trade.details),
+        "version": trade.version,
+    }
+
+
+def _trade_model(trade: Trade) -> TradeModel:
+    trade_model = TradeModel(**_trade_row(trade))
+    trade_model.underlyings = [
+        UnderlyingModel(**row) for row in _underlying_rows(trade)
+    ]
+    trade_model.history = _history_models(trade, 0)
+    return trade_model
+
+
+def _history_models(trade: Trade, next_seq: int) -> List[HistoryModel]:
+    """History rows for the records of ``trade`` from ``next_seq`` onwards."""
+    models = []
+    for seq in range(next_seq, len(trade.history)):
+        previous = trade.history[seq - 1] if seq else None
+        models.append(_history_model(str(trade.id), seq, trade.history[seq], previous))
+    return models
+
+
+def _count_transitions(actions: Iterable[str]) -> None:
+    """Add the history records written to ``trade_transitions_total``."""
+    for action, count in Counter(actions).items():
+        TRADE_TRANSITIONS.inc(action, amount=count)
+
+
+def _update_trade(trade: Trade):
+    # compare-and-set on the version the trade was read at, no row lock held.
+    return (
+        update(TradeModel)
+        .where(TradeModel.id == str(trade.id), TradeModel.version == trade.version)
+        .values(
+            state=trade.state.name,
+            **_detail_columns(trade.details),
+            version=TradeModel.version + 1,
+            updated_at=datetime.datetime.utcnow(),
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+# transitions that also queue a message to the counterparty.
+OUTBOX_ACTIONS = frozenset({TradeAction.SEND_TO_EXECUTE.name})
+
+
+def _outbox_row(
+    trade_id: str,
+    requester_id: str,
+    action: str,
+    details: Dict[str, Any],
+    now: datetime.datetime,
+) -> Dict[str, Any]:
+    return {
+        "trade_id": trade_id,
+        "action": action,
+        "payload": {"trade_id": trade_id, "requester_id": requester_id, **details},
+        "status": OutboxStatus.PENDING.name,
+        "attempts": 0,
+        "created_at": now,
+        "available_at": now,
+    }
+
+
+def _outbox_rows(trade: Trade, next_seq: int) -> List[Dict[str, Any]]:
+    """Outbox messages of the records of ``trade`` from ``next_seq`` on."""
+    now = datetime.datetime.utcnow()
+    return [
+        _outbox_row(
+            str(trade.id),
+            trade.requester_id,
+            hist.action,
+            {"details": _snapshot_value(hist.details_snapshot)},
+            now,
+        )
+        for hist in trade.history[next_seq:]
+        if hist.action in OUTBOX_ACTIONS
+    ]
+
+
+def _stored_state(trade: Trade, next_seq: int) -> TradeState:
+    """State of ``trade`` before the records from ``next_seq`` on"""
+    if next_seq < len(trade.history):
+        return trade.history[next_seq].previous_state
+    return trade.state
+
+
+def _count_change(
+    changes: Counter,
+    requester_id: str,
+    previous: Optional[TradeState],
+    new: TradeState,
+) -> None:
+    """Record a move from ``previous`` to ``new``, None for a new trade."""
+    if previous == new:
+        return
+    if previous is not None:
+        changes[requester_id, previous.name] -= 1
+    changes[requester_id, new.name] += 1
+
+
+# INSERT .. ON CONFLICT DO UPDATE, the counters are created on first use.
+_UPSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def _count_updates(dialect: str, changes: Counter) -> list:
+    """
+    Upserts adding ``changes`` to the per requester and the total counts, with
+    their executemany rows. Rows are sorted so that concurrent writers lock
+    the counters in the same order.
+    """
+    totals = Counter()
+    for (_, state), delta in changes.items():
+        totals[state] += delta
+    updates = []
+    for model, keys, rows in (
+        (
+            StateCountModel,
+            ["requester_id", "state"],
+            [
+                {"requester_id": requester_id, "state": state, "count": delta}
+                for (requester_id, state), delta in sorted(changes.items())
+                if delta
+            ],
+        ),
+        (
+            StateTotalModel,
+            ["state"],
+            [
+                {"state": state, "count": delta}
+                for state, delta in sorted(totals.items())
+                if delta
+            ],
+        ),
+    ):
+        if not rows:
+            continue
+        table = model.__table__
+        statement = _UPSERTS[dialect](table)
+        statement = statement.on_conflict_do_update(
+            index_elements=keys,
+            set_={"count": table.c.count + statement.excluded["count"]},
+        )
+        updates.append((statement, rows))
+    return updates
+
+
+def _new_trades(trades: List[Trade]) -> Counter:
+    changes = Counter()
+    for trade in trades:
+        _count_change(changes, trade.requester_id, None, trade.state)
+    return changes
+
+
+def _update_counts(db, changes: Counter) -> None:
+    for statement, rows in _count_updates(db.get_bind().dialect.name, changes):
+        db.execute(statement, rows)
+
+
+def _conflict(trade: Trade) -> TradeConflictError:
+    return TradeConflictError(
+        f"Trade {trade.id} was modified by another request, reload and retry"
+    )
+
+
+def _select_trade(trade_id: str):
+    return (
+        select(TradeModel)
+        .options(joinedload(TradeModel.history))
+        .where(TradeModel.id == trade_id)
+    )
+
+
+def _select_summary(trade_id: str):
+    # primary key lookup of three columns, no history join or JSON decode.
+    return select(
+        TradeModel.id, TradeModel.requester_id, TradeModel.state, TradeModel.version
+    ).where(TradeModel.id == trade_id)
+
+
+def _to_summary(row) -> Optional[TradeSummary]:
+    if row is None:
+        return None
+    return TradeSummary(
+        id=UUID(row.id),
+        requester_id=row.requester_id,
+        state=TradeState[row.state],
+        version=row.version,
+    )
+
+
+def _select_next_seq(trade_id: str):
+    return select(func.coalesce(func.max(HistoryModel.seq) + 1, 0)).where(
+        HistoryModel.trade_id == trade_id
+    )
+
+
+def _select_for_transition(trade_ids: List[str]):
+    # summary, current details and next history seq of every trade, locked
+    # until the batch commits where the database supports it.
+    next_seq = (
+        select(func.coalesce(func.max(HistoryModel.seq) + 1, 0))
+        .where(HistoryModel.trade_id == TradeModel.id)
+        .scalar_subquery()
+    )
+    return (
+        select(
+            TradeModel.id,
+            TradeModel.requester_id,
+            TradeModel.state,
+            TradeModel.version,
+            *(getattr(TradeModel, name) for name in DETAIL_COLUMNS),
+            next_seq.label("next_seq"),
+        )
+        .where(TradeModel.id.in_(trade_ids))
+        .with_for_update()
+    )
+
+
+def _select_underlying(trade_ids: List[str]):
+    return (
+        select(UnderlyingModel.trade_id, UnderlyingModel.currency)
+        .where(UnderlyingModel.trade_id.in_(trade_ids))
+        .order_by(UnderlyingModel.trade_id, UnderlyingModel.position)
+    )
+
+
+def _update_state(now: datetime.datetime):
+    # executemany form of _update_trade for batches, parameters are b_id,
+    # b_version and state.
+    table = TradeModel.__table__
+    return (
+        update(table)
+        .where(
+            table.c.id == bindparam("b_id"), table.c.version == bindparam("b_version")
+        )
+        .values(state=bindparam("state"), version=table.c.version + 1, updated_at=now)
+    )
+
+
+def _update_state_and_strike(now: datetime.datetime):
+    # _update_state that also sets the strike, for batches of BOOK.
+    return _update_state(now).values(strike=bindparam("strike"))
+
+
+def _select_history_length(trade_id: str):
+    # no row at all when the trade does not exist.
+    return (
+        select(func.count(HistoryModel.id))
+        .select_from(TradeModel)
+        .outerjoin(HistoryModel, HistoryModel.trade_id == TradeModel.id)
+        .where(TradeModel.id == trade_id)
+        .group_by(TradeModel.id)
+    )
+
+
+def _select_history_entries(trade_id: str, from_seq: int, to_seq: int):
+    checkpoint = (
+        select(func.coalesce(func.max(HistoryModel.seq), 0))
+        .where(
+            HistoryModel.trade_id == trade_id,
+            HistoryModel.is_checkpoint.is_(True),
+            HistoryModel.seq <= from_seq,
+        )
+        .scalar_subquery()
+    )
+    return (
+        select(
+            HistoryModel.seq, HistoryModel.is_checkpoint, HistoryModel.details_snapshot
+        )
+        .where(
+            HistoryModel.trade_id == trade_id,
+            HistoryModel.seq >= checkpoint,
+            HistoryModel.seq <= to_seq,
+        )
+        .order_by(HistoryModel.seq)
+    )
+
+
+def _select_page(query: TradeQuery):
+    statement = (
+        select(TradeModel)
+        .options(
+            selectinload(TradeModel.history)
+            if query.include_history
+            else noload(TradeModel.history)
+        )
+        .where(*_query_filters(query))
+        .order_by(TradeModel.created_at, TradeModel.id)
+    )
+    if query.limit is not None:
+        # fetch one extra row to know whether there is a next page.
+        statement = statement.limit(query.limit + 1)
+    return statement
+
+
+# rows fetched per round-trip while exporting, history is loaded per batch.
+EXPORT_BATCH_SIZE = 1000
+# rows per IN list of a selectinload, each batch of the export loads its
+# relationships in EXPORT_BATCH_SIZE / _SELECTIN_CHUNK statements.
+_SELECTIN_CHUNK = 500
+
+
+def _select_export(query: TradeQuery, include_history: bool):
+    history = (
+        selectinload(TradeModel.history)
+        if include_history
+        else noload(TradeModel.history)
+    )
+    return (
+        select(TradeModel)
+        .options(history)
+        .where(*_query_filters(query))
+        .order_by(TradeModel.created_at, TradeModel.id)
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+
+
+def _export_record(trade_model: TradeModel, include_history: bool) -> Dict[str, Any]:
+    record = {
+        "id": trade_model.id,
+        "requester_id": trade_model.requester_id,
+        "state": trade_model.state,
+        "version": trade_model.version,
+        "details": _details_of(
+            trade_model,
+            [underlying.currency for underlying in trade_model.underlyings],
+        ),
+        "created_at": trade_model.created_at.isoformat(),
+    }
+    if include_history:
+        record["history"] = [
+            {
+                "timestamp": hist.timestamp,
+                "user_id": hist.user_id,
+                "action": hist.action,
+                "previous_state": hist.previous_state.name,
+                "new_state": hist.new_state.name,
+                "details_snapshot": hist.details_snapshot,
+            }
+            for hist in _to_domain(trade_model).history
+        ]
+    return record
+
+
+def _page(
+    trade_models: List[TradeModel], query: TradeQuery
+) -> Tuple[List[Trade], Optional[str]]:
+    next_cursor = None
+    if query.limit is not None and len(trade_models) > query.limit:
+        trade_models = trade_models[: query.limit]
+        next_cursor = _encode_cursor(trade_models[-1])
+    return [_to_domain(model) for model in trade_models], next_cursor
+
+
+def _json_serializer(obj: Any) -> str:
+    return dumps(obj).decode()
+
+
+def pool_options(url: str) -> Dict[str, Any]:
+    """create_engine arguments of the DB_POOL_* settings that apply to ``url``"""
+    options = {"pool_pre_ping": DB_POOL_PRE_PING, "pool_recycle": DB_POOL_RECYCLE}
+    parsed = make_url(url)
+    pool_class = parsed.get_dialect().get_pool_class(parsed)
+    if issubclass(pool_class, QueuePool):
+        options.update(
+            # the same pool, with checkouts timed for the metrics.
+            poolclass=TIMED_POOLS.get(pool_class, pool_class),
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+        )
+    return options
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    # an in-memory database answers "memory" and stays in memory.
+    cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT}")
+    cursor.execute(f"PRAGMA cache_size={SQLITE_CACHE_SIZE}")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+
+def sqlite_pragmas(engine: Engine) -> None:
+    """Apply the SQLITE_* pragmas to every new connection of a SQLite ``engine``"""
+    if engine.dialect.name == "sqlite":
+        event.listen(engine, "connect", _set_sqlite_pragmas)
+
+
+# Create the engine, JSON columns are encoded with orjson when available.
 engine = create_engine(
     DATABASE_URL,
     connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {},
+    json_serializer=_json_serializer,
+    json_deserializer=loads,
+    **pool_options(DATABASE_URL),
 )
+sqlite_pragmas(engine)
 # Create a session factory.
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 # TODO: CREATE tables using migrations with Alembic
 Base.metadata.create_all(bind=engine)
 
+# the session of the HTTP request being served, set by get_db_session.
+request_session: contextvars.ContextVar[Optional[Session]] = contextvars.ContextVar(
+    "request_session", default=None
+)
+
+
+@contextmanager
+def session() -> Iterator[Session]:
+    """
+    The session of the current request, or a new one outside of a request.
+    Repositories still commit their own writes, a request only saves opening
+    a session and checking a connection out for every call.
+    """
+    db = request_session.get()
+    if db is None:
+        with SessionLocal() as db:
+            yield db
+        return
+    try:
+        yield db
+    except BaseException:
+        # leave the shared session usable by the next call.
+        db.rollback()
+        raise
+
 
 class TradeORMRepository:
     @staticmethod
     def create(trade: Trade) -> Trade:
-        with SessionLocal() as db:
-            trade_model = TradeModel(
-                id=str(trade.id),
-                requester_id=trade.requester_id,
-                state=trade.state.name,
-                details=serialize_data(trade.details.__dict__) if trade.details else {},
+        with session() as db:
+            db.add(_trade_model(trade))
+            _update_counts(db, _new_trades([trade]))
+            db.commit()
+        _count_transitions(record.action for record in trade.history)
+        return trade
+
+    @staticmethod
+    def create_many(trades: List[Trade]) -> List[Trade]:
+        """
+        Insert new trades and their history in one transaction, with one
+        batched INSERT per table.
+        """
+        now = datetime.datetime.utcnow()
+        trade_rows, underlying_rows, history_rows = [], [], []
+        for trade in trades:
+            trade_rows.append(
+                {**_trade_row(trade), "created_at": now, "updated_at": now}
             )
-            # Add history records.
-            for hist in trade.history:
-                history_model = HistoryModel(
-                    trade_id=str(trade.id),
-                    user_id=hist.user_id,
-                    action=hist.action,
-                    previous_state=hist.previous_state.name,
-                    new_state=hist.new_state.name,
-                    details_snapshot=serialize_data(hist.details_snapshot),
-                    timestamp=hist.timestamp,
-                )
-                trade_model.history.append(history_model)
-            db.add(trade_model)
+            underlying_rows.extend(_underlying_rows(trade))
+            for seq, hist in enumerate(trade.history):
+                previous = trade.history[seq - 1] if seq else None
+                history_rows.append(_history_row(str(trade.id), seq, hist, previous))
+        with session() as db:
+            if trade_rows:
+                db.execute(insert(TradeModel), trade_rows)
+            if underlying_rows:
+                db.execute(insert(UnderlyingModel), underlying_rows)
+            if history_rows:
+                db.execute(insert(HistoryModel), history_rows)
+            _update_counts(db, _new_trades(trades))
             db.commit()
-            db.refresh(trade_model)
-            return trade
+        _count_transitions(row["action"] for row in history_rows)
+        return trades
 
     @staticmethod
     def get(trade_id: str) -> Optional[Trade]:
-        with SessionLocal() as db:
-            # order by updated_at descending to pick the latest record.
-            trade_model = (
-                db.query(TradeModel)
-                .filter(TradeModel.id == trade_id)
-                .order_by(TradeModel.updated_at.desc())
-                .first()
-            )
+        with session() as db:
+            trade_model = db.scalars(_select_trade(trade_id)).unique().first()
             if not trade_model:
                 return None
             # reconstruct the domain object.
-            trade_details = TradeDetails(**trade_model.details)
-            trade = Trade(
-                id=UUID(trade_model.id),
-                requester_id=trade_model.requester_id,
-                details=trade_details,
-                state=TradeState[trade_model.state],
-                history=[],
-            )
-            for hist in trade_model.history:
-                history_record = HistoryRecord(
-                    timestamp=hist.timestamp,
-                    user_id=hist.user_id,
-                    action=hist.action,
-                    previous_state=TradeState[hist.previous_state],
-                    new_state=TradeState[hist.new_state],
-                    details_snapshot=hist.details_snapshot,
-                )
-                trade.history.append(history_record)
-            return trade
+            return _to_domain(trade_model)
+
+    @staticmethod
+    def get_summary(trade_id: str) -> Optional[TradeSummary]:
+        with session() as db:
+            return _to_summary(db.execute(_select_summary(trade_id)).first())
 
     @staticmethod
     def update(trade: Trade) -> None:
-        with SessionLocal() as db:
-            trade_model = (
-                db.query(TradeModel).filter(TradeModel.id == str(trade.id)).first()
+        """
+        Persist the trade state and append the history records added since the
+        last write. Stored history rows are never rewritten. A state change
+        moves the trade between the state counters in the same transaction.
+
+        The write only applies if the stored version is still the one the trade
+        was read at, otherwise TradeConflictError is raised and nothing changes.
+        """
+        with session() as db:
+            if db.execute(_update_trade(trade)).rowcount != 1:
+                db.rollback()
+                raise _conflict(trade)
+            # only insert the records that are not stored yet.
+            next_seq = db.scalar(_select_next_seq(str(trade.id)))
+            if _underlying_changed(trade, next_seq):
+                db.execute(_delete_underlying(str(trade.id)))
+                db.execute(insert(UnderlyingModel), _underlying_rows(trade))
+            db.add_all(_history_models(trade, next_seq))
+            outbox_rows = _outbox_rows(trade, next_seq)
+            if outbox_rows:
+                db.execute(insert(OutboxModel), outbox_rows)
+            changes = Counter()
+            _count_change(
+                changes,
+                trade.requester_id,
+                _stored_state(trade, next_seq),
+                trade.state,
             )
-            if trade_model:
-                trade_model.state = trade.state.name
-                trade_model.details = (
-                    serialize_data(trade.details.__dict__) if trade.details else {}
+            _update_counts(db, changes)
+            db.commit()
+        trade.version += 1
+        _count_transitions(record.action for record in trade.history[next_seq:])
+
+    @staticmethod
+    def batch_transition(
+        trade_ids: List[str],
+        action: TradeAction,
+        user_id: str,
+        check: Callable[[TradeSummary], TradeState],
+        strikes: Optional[Dict[str, float]] = None,
+    ) -> List[BatchResult]:
+        """
+        Apply ``action`` to many trades in one transaction. ``check`` returns
+        the new state of a trade or raises ValueError to leave it unchanged.
+        State changes and history rows are each written with one executemany.
+        ``strikes`` sets the strike of every trade along with its state, for
+        BOOK.
+        """
+        now = datetime.datetime.utcnow()
+        results, state_rows, history_rows, outbox_rows = {}, [], [], []
+        changes = Counter()
+        with session() as db:
+            rows = db.execute(_select_for_transition(trade_ids)).all()
+            underlying = {row.id: [] for row in rows}
+            for trade_id, currency in db.execute(_select_underlying(list(underlying))):
+                underlying[trade_id].append(currency)
+            for row in rows:
+                summary = _to_summary(row)
+                try:
+                    new_state = check(summary)
+                except ValueError as e:
+                    results[row.id] = BatchResult(row.id, summary.state, str(e))
+                    continue
+                # without a strike the details do not change, the previous
+                # snapshot is the same.
+                stored = _details_of(row, underlying[row.id])
+                previous = details = _snapshot_value(stored)
+                state_row = {
+                    "b_id": row.id,
+                    "b_version": row.version,
+                    "state": new_state.name,
+                }
+                if strikes is not None:
+                    state_row["strike"] = strikes[row.id]
+                    details = _snapshot_value(replace(stored, strike=strikes[row.id]))
+                is_checkpoint, snapshot = _encode_snapshot(
+                    row.next_seq, details, previous if row.next_seq else None
                 )
-                # clear existing history and re-add.
-                trade_model.history.clear()
-                for hist in trade.history:
-                    history_model = HistoryModel(
-                        trade_id=str(trade.id),
-                        user_id=hist.user_id,
-                        action=hist.action,
-                        previous_state=hist.previous_state.name,
-                        new_state=hist.new_state.name,
-                        details_snapshot=serialize_data(hist.details_snapshot),
-                        timestamp=hist.timestamp,
+                state_rows.append(state_row)
+                history_rows.append(
+                    {
+                        "id": str(uuid.uuid4()),
+                        "trade_id": row.id,
+                        "seq": row.next_seq,
+                        "timestamp": now,
+                        "user_id": user_id,
+                        "action": action.name,
+                        "previous_state": summary.state.name,
+                        "new_state": new_state.name,
+                        "is_checkpoint": is_checkpoint,
+                        "details_snapshot": snapshot,
+                    }
+                )
+                if action.name in OUTBOX_ACTIONS:
+                    outbox_rows.append(
+                        _outbox_row(
+                            row.id,
+                            row.requester_id,
+                            action.name,
+                            {"details": details},
+                            now,
+                        )
+                    )
+                _count_change(changes, row.requester_id, summary.state, new_state)
+                results[row.id] = BatchResult(row.id, new_state)
+            if state_rows:
+                update_rows = (
+                    _update_state(now)
+                    if strikes is None
+                    else _update_state_and_strike(now)
+                )
+                updated = db.execute(update_rows, state_rows).rowcount
+                if updated != len(state_rows):
+                    db.rollback()
+                    raise TradeConflictError(
+                        "Trades were modified by another request, reload and retry"
                     )
-                    trade_model.history.append(history_model)
-                db.commit()
+                db.execute(insert(HistoryModel), history_rows)
+                if outbox_rows:
+                    db.execute(insert(OutboxModel), outbox_rows)
+                _update_counts(db, changes)
+            db.commit()
+        _count_transitions(row["action"] for row in history_rows)
+        return [
+            results.get(trade_id, BatchResult(trade_id, error="Trade not found"))
+            for trade_id in trade_ids
+        ]
 
     @staticmethod
-    def list_all() -> List[Trade]:
+    def get_history_length(trade_id: str) -> Optional[int]:
+        """Number of stored history records, None if the trade does not exist."""
+        with session() as db:
+            return db.scalar(_select_history_length(trade_id))
+
+    @staticmethod
+    def get_history_entries(
+        trade_id: str, from_seq: int, to_seq: int
+    ) -> List[StoredSnapshot]:
+        """
+        Stored snapshots from the nearest checkpoint at or before ``from_seq`` up
+        to ``to_seq``, enough to rebuild any version in that range.
+        """
+        with session() as db:
+            rows = db.execute(_select_history_entries(trade_id, from_seq, to_seq))
+            return [StoredSnapshot(*row) for row in rows]
+
+    @staticmethod
+    def query(query: TradeQuery) -> Tuple[List[Trade], Optional[str]]:
+        """
+        Return one page of trades matching the query, ordered by creation, and
+        the cursor of the next page (None on the last page).
+        """
+        with session() as db:
+            trade_models = db.scalars(_select_page(query)).all()
+            return _page(list(trade_models), query)
+
+    @staticmethod
+    def export(query: TradeQuery, include_history: bool) -> Iterator[Dict[str, Any]]:
+        """
+        Every trade matching the query as a JSON ready dict, streamed from a
+        server side cursor so memory does not grow with the result size.
+        """
+        # its own session, the rows are streamed after the request's is closed.
         with SessionLocal() as db:
-            trades = []
-            for trade_model in db.query(TradeModel).all():
-                trade_details = TradeDetails(**trade_model.details)
-                trade = Trade(
-                    id=UUID(trade_model.id),
-                    requester_id=trade_model.requester_id,
-                    details=trade_details,
-                    state=TradeState[trade_model.state],
-                    history=[],
-                )
-                for hist in trade_model.history:
-                    history_record = HistoryRecord(
-                        timestamp=hist.timestamp,
-                        user_id=hist.user_id,
-                        action=hist.action,
-                        previous_state=TradeState[hist.previous_state],
-                        new_state=TradeState[hist.new_state],
-                        details_snapshot=hist.details_snapshot,
-                    )
-                    trade.history.append(history_record)
-                trades.append(trade)
-            return trades
+            trade_models = db.scalars(_select_export(query, include_history))
+            for trade_model in trade_models:
+                yield _export_record(trade_model, include_history)
+
+    @staticmethod
+    def export_statements(rows: int, include_history: bool) -> int:
+        """Most statements ``export`` runs past its SELECT to load ``rows`` trades"""
+        relationships = 2 if include_history else 1
+        batches = -(-rows // EXPORT_BATCH_SIZE)
+        return batches * -(-EXPORT_BATCH_SIZE // _SELECTIN_CHUNK) * relationships
+
+    @staticmethod
+    def list_all() -> List[Trade]:
+        with session() as db:
+            trade_models = db.scalars(
+                select(TradeModel).options(selectinload(TradeModel.history))
+            ).all()
+            return [_to_domain(trade_model) for trade_model in trade_models]
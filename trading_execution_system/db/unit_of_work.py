@@ -0,0 +1,152 @@
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from trading_execution_system.db.settings import TradeORMRepository, StoredSnapshot
+from trading_execution_system.db.async_settings import AsyncTradeORMRepository
+from trading_execution_system.models.enums import TradeAction, TradeState
+from trading_execution_system.models.trade import (
+    Trade,
+    TradeQuery,
+    TradeSummary,
+    BatchResult,
+)
+
+
+def _summary_of(trade: Trade) -> TradeSummary:
+    return TradeSummary(
+        id=trade.id,
+        requester_id=trade.requester_id,
+        state=trade.state,
+        version=trade.version,
+    )
+
+
+class TradeUnitOfWork:
+    """
+    Request scoped identity map in front of a trade repository.
+
+    A trade is loaded at most once per request and shared by every service
+    call. Ownership and status lookups are answered from a loaded trade when
+    there is one, otherwise from a cached column projection. Writes go straight
+    to the repository and refresh the map.
+    """
+
+    def __init__(self, repository: TradeORMRepository):
+        self.repository = repository
+        self.identity_map: Dict[str, Trade] = {}
+        self.summaries: Dict[str, TradeSummary] = {}
+
+    def create(self, trade: Trade) -> Trade:
+        self.repository.create(trade)
+        self.identity_map[str(trade.id)] = trade
+        return trade
+
+    def create_many(self, trades: List[Trade]) -> List[Trade]:
+        return self.repository.create_many(trades)
+
+    def get(self, trade_id: str) -> Optional[Trade]:
+        if trade_id not in self.identity_map:
+            trade = self.repository.get(trade_id)
+            if trade is None:
+                return None
+            self.identity_map[trade_id] = trade
+        return self.identity_map[trade_id]
+
+    def get_summary(self, trade_id: str) -> Optional[TradeSummary]:
+        if trade_id in self.identity_map:
+            return _summary_of(self.identity_map[trade_id])
+        if trade_id not in self.summaries:
+            summary = self.repository.get_summary(trade_id)
+            if summary is None:
+                return None
+            self.summaries[trade_id] = summary
+        return self.summaries[trade_id]
+
+    def update(self, trade: Trade) -> None:
+        self.repository.update(trade)
+        self.identity_map[str(trade.id)] = trade
+
+    def batch_transition(
+        self,
+        trade_ids: List[str],
+        action: TradeAction,
+        user_id: str,
+        check: Callable[[TradeSummary], TradeState],
+        strikes: Optional[Dict[str, float]] = None,
+    ) -> List[BatchResult]:
+        results = self.repository.batch_transition(
+            trade_ids, action, user_id, check, strikes
+        )
+        for trade_id in trade_ids:
+            self.identity_map.pop(trade_id, None)
+            self.summaries.pop(trade_id, None)
+        return results
+
+    def get_history_length(self, trade_id: str) -> Optional[int]:
+        if trade_id in self.identity_map:
+            return len(self.identity_map[trade_id].history)
+        return self.repository.get_history_length(trade_id)
+
+    def get_history_entries(
+        self, trade_id: str, from_seq: int, to_seq: int
+    ) -> List[StoredSnapshot]:
+        return self.repository.get_history_entries(trade_id, from_seq, to_seq)
+
+    def query(self, query: TradeQuery) -> Tuple[List[Trade], Optional[str]]:
+        return self.repository.query(query)
+
+    def export(
+        self, query: TradeQuery, include_history: bool
+    ) -> Iterator[Dict[str, Any]]:
+        return self.repository.export(query, include_history)
+
+    def list_all(self) -> List[Trade]:
+        return self.repository.list_all()
+
+
+class AsyncTradeUnitOfWork:
+    """TradeUnitOfWork for the asyncio repository"""
+
+    def __init__(self, repository: AsyncTradeORMRepository):
+        self.repository = repository
+        self.identity_map: Dict[str, Trade] = {}
+        self.summaries: Dict[str, TradeSummary] = {}
+
+    async def create(self, trade: Trade) -> Trade:
+        await self.repository.create(trade)
+        self.identity_map[str(trade.id)] = trade
+        return trade
+
+    async def get(self, trade_id: str) -> Optional[Trade]:
+        if trade_id not in self.identity_map:
+            trade = await self.repository.get(trade_id)
+            if trade is None:
+                return None
+            self.identity_map[trade_id] = trade
+        return self.identity_map[trade_id]
+
+    async def get_summary(self, trade_id: str) -> Optional[TradeSummary]:
+        if trade_id in self.identity_map:
+            return _summary_of(self.identity_map[trade_id])
+        if trade_id not in self.summaries:
+            summary = await self.repository.get_summary(trade_id)
+            if summary is None:
+                return None
+            self.summaries[trade_id] = summary
+        return self.summaries[trade_id]
+
+    async def update(self, trade: Trade) -> None:
+        await self.repository.update(trade)
+        self.identity_map[str(trade.id)] = trade
+
+    async def get_history_length(self, trade_id: str) -> Optional[int]:
+        if trade_id in self.identity_map:
+            return len(self.identity_map[trade_id].history)
+        return await self.repository.get_history_length(trade_id)
+
+    async def get_history_entries(
+        self, trade_id: str, from_seq: int, to_seq: int
+    ) -> List[StoredSnapshot]:
+        return await self.repository.get_history_entries(trade_id, from_seq, to_seq)
+
+    async def query(self, query: TradeQuery) -> Tuple[List[Trade], Optional[str]]:
+        return await self.repository.query(query)
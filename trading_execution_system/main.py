@@ -1,7 +1,63 @@
-from fastapi import FastAPI
-from trading_execution_system.api.v1.routes import trades, users
+from contextlib import asynccontextmanager
 
-app = FastAPI(title="Trade Approval Process API")
+import anyio.to_thread
+from fastapi import Depends, FastAPI
+from trading_execution_system.api.v1.routes import (
+    trades,
+    async_trades,
+    metrics,
+    reports,
+    users,
+)
+from trading_execution_system.core.config import METRICS_ENABLED, SERVER_THREAD_LIMIT
+from trading_execution_system.core.dependencies import (
+    get_db_session,
+    outbox_dispatcher,
+)
+from trading_execution_system.core.metrics import MetricsMiddleware
+from trading_execution_system.db import instrumentation
+from trading_execution_system.db.async_settings import async_engine
+from trading_execution_system.db.settings import engine
 
-app.include_router(trades.router, prefix="/api/v1/trades", tags=["trades"])
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # the threads sync routes and dependencies run in, per process.
+    anyio.to_thread.current_default_thread_limiter().total_tokens = SERVER_THREAD_LIMIT
+    if outbox_dispatcher is not None:
+        outbox_dispatcher.start()
+    yield
+    if outbox_dispatcher is not None:
+        await outbox_dispatcher.stop()
+    await async_engine.dispose()
+    engine.dispose()
+
+
+app = FastAPI(title="Trade Approval Process API", lifespan=lifespan)
+
+# the sync routes share one database session per request.
+request_session = [Depends(get_db_session)]
+
+app.include_router(
+    trades.router,
+    prefix="/api/v1/trades",
+    tags=["trades"],
+    dependencies=request_session,
+)
+app.include_router(
+    async_trades.router, prefix="/api/v1/async/trades", tags=["trades (async)"]
+)
 app.include_router(users.router, prefix="/api/v1/users", tags=["users"])
+app.include_router(
+    reports.router,
+    prefix="/api/v1/reports",
+    tags=["reports"],
+    dependencies=request_session,
+)
+
+if METRICS_ENABLED:
+    instrumentation.install()
+    instrumentation.instrument_pool(engine, "sync")
+    instrumentation.instrument_pool(async_engine.sync_engine, "async")
+    app.add_middleware(MetricsMiddleware)
+    app.include_router(metrics.router, tags=["metrics"])
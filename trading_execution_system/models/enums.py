@@ -18,3 +18,9 @@ class TradeAction(Enum):
     CANCEL = auto()
     SEND_TO_EXECUTE = auto()
     BOOK = auto()
+
+
+class OutboxStatus(Enum):
+    PENDING = auto()
+    DISPATCHED = auto()
+    FAILED = auto()
@@ -0,0 +1,36 @@
+import datetime
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+
+@dataclass
+class OutboxMessage:
+    """A claimed outbox row, ``id`` doubles as the idempotency key"""
+
+    id: int
+    trade_id: str
+    action: str
+    payload: Dict[str, Any]
+    attempts: int  # including the one in progress
+    created_at: datetime.datetime
+
+
+@dataclass
+class OutboxStats:
+    # queue depth, read from the outbox table.
+    pending: int = 0
+    failed: int = 0
+    # this process's dispatcher, since it started.
+    sent: int = 0
+    retried: int = 0
+    # seconds from the transition to the counterparty accepting the message.
+    latency: Dict[str, Optional[float]] = field(default_factory=dict)
+
+
+@dataclass(frozen=True)
+class Fill:
+    """The counterparty's execution of the trade of an outbox message"""
+
+    message_id: int
+    trade_id: str
+    strike: float
@@ -0,0 +1,78 @@
+import datetime
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+REPORT_BUCKETS = ("day", "month", "year")
+
+
+@dataclass
+class ReportQuery:
+    """Filters of the trade report and the width of its trade date buckets"""
+
+    requester_id: Optional[str] = None
+    trade_date_from: Optional[datetime.date] = None
+    trade_date_to: Optional[datetime.date] = None
+    bucket: str = "month"  # one of REPORT_BUCKETS
+
+
+@dataclass
+class ReportGroup:
+    """Trades sharing one value of a report dimension"""
+
+    key: str
+    count: int
+    notional: float
+
+
+@dataclass
+class TradeReport:
+    count: int = 0
+    notional: float = 0.0
+    by_state: List[ReportGroup] = field(default_factory=list)
+    by_counterparty: List[ReportGroup] = field(default_factory=list)
+    by_currency: List[ReportGroup] = field(default_factory=list)
+    by_direction: List[ReportGroup] = field(default_factory=list)
+    # keyed by the first day of each bucket, as an ISO date.
+    by_trade_date: List[ReportGroup] = field(default_factory=list)
+
+
+PNL_GROUPINGS = ("user", "period")
+PNL_PERIODS = ("month", "year")
+
+
+@dataclass
+class ProfitLossQuery:
+    """Executed trades to revalue and how to group their P&L"""
+
+    requester_id: Optional[str] = None
+    group_by: str = "user"  # one of PNL_GROUPINGS
+    period: str = "month"  # value date bucket when grouping by period
+
+
+@dataclass
+class ProfitLossGroup:
+    key: str
+    count: int
+    notional: float
+    pnl: float
+
+
+@dataclass
+class ProfitLossReport:
+    # id of the rate snapshot the book was revalued against.
+    rate_snapshot: str
+    count: int = 0
+    notional: float = 0.0
+    pnl: float = 0.0
+    # trades without a strike or a rate for their currency, left out of the sums.
+    unpriced: int = 0
+    groups: List[ProfitLossGroup] = field(default_factory=list)
+
+
+@dataclass
+class StateSummary:
+    """Trades per state, for one requester or for all of them when None"""
+
+    requester_id: Optional[str]
+    counts: Dict[str, int]
+    total: int
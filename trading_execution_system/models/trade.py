@@ -1,40 +1,117 @@
 import datetime
+import sys
 import uuid
-from dataclasses import dataclass, field, asdict
-from typing import Any, Dict, List, Optional
+from dataclasses import dataclass, field, fields
+from typing import List, Optional, Tuple
 
 from trading_execution_system.models.enums import TradeState
 
 
-@dataclass
+def _slotted(cls):
+    """
+    Rebuild dataclass ``cls`` with ``__slots__`` and no per-instance ``__dict__``,
+    as ``dataclass(slots=True)`` does from Python 3.10.
+    """
+    names = tuple(f.name for f in fields(cls))
+    namespace = {
+        key: value
+        for key, value in cls.__dict__.items()
+        if key not in names and key not in ("__dict__", "__weakref__")
+    }
+    namespace["__slots__"] = names
+    # the default slot restore assigns with setattr, which frozen classes refuse.
+    namespace["__getstate__"] = _getstate
+    namespace["__setstate__"] = _setstate
+    return type(cls)(cls.__name__, cls.__bases__, namespace)
+
+
+def _getstate(self):
+    return [getattr(self, f.name) for f in fields(self)]
+
+
+def _setstate(self, state):
+    for f, value in zip(fields(self), state):
+        object.__setattr__(self, f.name, _intern(value))
+
+
+# sign of a position in each direction, matched whatever the case.
+DIRECTION_SIGNS = {"buy": 1, "sell": -1}
+
+
+def direction_sign(direction) -> Optional[int]:
+    """1 for a buy, -1 for a sell, None for any other direction"""
+    if not isinstance(direction, str):
+        return None
+    return DIRECTION_SIGNS.get(direction.strip().lower())
+
+
+def _intern(value):
+    # ids, actions and currencies repeat across trades, keep one copy of each.
+    return sys.intern(value) if type(value) is str else value
+
+
+@_slotted
+@dataclass(frozen=True)
 class TradeDetails:
+    """Immutable, so history records and cached trades share one instance"""
+
     trading_entity: str
     counterparty: str
     direction: str
     style: str  # forward or a swap
     currency: str
     notional_amount: float
-    underlying: List[str]
+    underlying: Tuple[str, ...]
     trade_date: datetime.date
     value_date: datetime.date
     delivery_date: datetime.date
     strike: Optional[float] = None
 
+    def __post_init__(self):
+        for name in (
+            "trading_entity",
+            "counterparty",
+            "direction",
+            "style",
+            "currency",
+        ):
+            object.__setattr__(self, name, _intern(getattr(self, name)))
+        underlying = tuple(_intern(currency) for currency in self.underlying)
+        object.__setattr__(self, "underlying", underlying)
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
     def validate_dates(self):
         if not (self.trade_date <= self.value_date <= self.delivery_date):
             raise ValueError("Trade date must be <= value date <= delivery date.")
 
 
-@dataclass
+@_slotted
+@dataclass(frozen=True)
 class HistoryRecord:
     timestamp: datetime.datetime
     user_id: str
     action: str
     previous_state: TradeState
     new_state: TradeState
-    details_snapshot: Dict[str, Any]
+    details_snapshot: Optional[TradeDetails]
+
+    def __post_init__(self):
+        object.__setattr__(self, "user_id", _intern(self.user_id))
+        object.__setattr__(self, "action", _intern(self.action))
+
+    def __copy__(self):
+        return self
 
+    def __deepcopy__(self, memo):
+        return self
 
+
+@_slotted
 @dataclass
 class Trade:
     id: uuid.UUID = field(default_factory=uuid.uuid4)
@@ -42,6 +119,10 @@ class Trade:
     details: TradeDetails = None
     state: TradeState = TradeState.DRAFT
     history: List[HistoryRecord] = field(default_factory=list)
+    version: int = 0  # bumped by every stored write, for optimistic concurrency
+
+    def __post_init__(self):
+        self.requester_id = _intern(self.requester_id)
 
     def add_history(self, user_id: str, action: str, previous_state: TradeState):
         record = HistoryRecord(
@@ -50,6 +131,44 @@ class Trade:
             action=action,
             previous_state=previous_state,
             new_state=self.state,
-            details_snapshot=asdict(self.details) if self.details else {},
+            # the details are immutable, the snapshot is the same object.
+            details_snapshot=self.details,
         )
         self.history.append(record)
+
+
+@_slotted
+@dataclass
+class TradeSummary:
+    """Ownership and status of a trade, without details or history"""
+
+    id: uuid.UUID
+    requester_id: str
+    state: TradeState
+    version: int = 0
+
+
+@dataclass
+class BatchResult:
+    """Outcome of one trade in a batch action, ``error`` is set when it was skipped"""
+
+    id: str
+    state: Optional[TradeState] = None
+    error: Optional[str] = None
+
+
+@dataclass
+class TradeQuery:
+    """Filters and keyset page position for listing trades"""
+
+    requester_id: Optional[str] = None
+    state: Optional[TradeState] = None
+    counterparty: Optional[str] = None
+    currency: Optional[str] = None
+    trade_date_from: Optional[datetime.date] = None
+    trade_date_to: Optional[datetime.date] = None
+    value_date_from: Optional[datetime.date] = None
+    value_date_to: Optional[datetime.date] = None
+    cursor: Optional[str] = None  # opaque position returned with the previous page
+    limit: Optional[int] = 100
+    include_history: bool = True
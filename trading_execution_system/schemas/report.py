@@ -0,0 +1,41 @@
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel
+
+
+class ReportGroupResponse(BaseModel):
+    key: str
+    count: int
+    notional: float
+
+
+class TradeReportResponse(BaseModel):
+    count: int
+    notional: float
+    by_state: List[ReportGroupResponse]
+    by_counterparty: List[ReportGroupResponse]
+    by_currency: List[ReportGroupResponse]
+    by_direction: List[ReportGroupResponse]
+    by_trade_date: List[ReportGroupResponse]
+
+
+class ProfitLossGroupResponse(BaseModel):
+    key: str
+    count: int
+    notional: float
+    pnl: float
+
+
+class ProfitLossResponse(BaseModel):
+    rate_snapshot: str
+    count: int
+    notional: float
+    pnl: float
+    unpriced: int
+    groups: List[ProfitLossGroupResponse]
+
+
+class StateSummaryResponse(BaseModel):
+    requester_id: Optional[str]
+    counts: Dict[str, int]
+    total: int
@@ -1,8 +1,11 @@
-from typing import List, Optional, Dict, Any
+from dataclasses import dataclass
+from typing import List, Optional, Dict, Any, FrozenSet
 from uuid import UUID
 from datetime import date
 
-from pydantic import BaseModel, validator
+from pydantic import BaseModel, Field, validator
+
+from trading_execution_system.models.trade import Trade
 
 
 class TradeDetailsSchema(BaseModel):
@@ -42,10 +45,48 @@ class TradeActionRequest(BaseModel):
 
 
 class TradeResponse(BaseModel):
-    id: UUID
-    state: str
-    details: TradeDetailsSchema
-    history: List[Dict[str, Any]]
+    # documents trade_payload, every field is optional for sparse fieldsets.
+    id: Optional[UUID] = None
+    state: Optional[str] = None
+    details: Optional[TradeDetailsSchema] = None
+    history: Optional[List[Dict[str, Any]]] = None
+
+
+TRADE_FIELDS = ("id", "state", "details", "history")
+
+
+@dataclass(frozen=True)
+class TradeView:
+    """Parts of a trade a response carries, and the window of its history"""
+
+    fields: FrozenSet[str] = frozenset(TRADE_FIELDS)
+    history_offset: int = 0
+    history_limit: Optional[int] = None
+
+    @property
+    def include_history(self) -> bool:
+        return "history" in self.fields
+
+
+def trade_payload(trade: Trade, view: TradeView = TradeView()) -> Dict[str, Any]:
+    """
+    Fields of a trade for TradeJSONResponse. The details and history records
+    are passed as loaded, they came from our own database and are encoded
+    directly rather than validated again through TradeResponse.
+    """
+    values = {}
+    if "id" in view.fields:
+        values["id"] = trade.id
+    if "state" in view.fields:
+        values["state"] = trade.state.name
+    if "details" in view.fields:
+        values["details"] = trade.details
+    if view.include_history:
+        end = None
+        if view.history_limit is not None:
+            end = view.history_offset + view.history_limit
+        values["history"] = trade.history[view.history_offset : end]
+    return values
 
 
 class TradeHistoryResponse(BaseModel):
@@ -63,3 +104,50 @@ class TradeBookRequest(BaseModel):
 class TradeStatusResponse(BaseModel):
     id: UUID
     state: str
+    version: int = Field(0, exclude=True)  # sent as the ETag header
+
+
+class TradeBatchRequest(BaseModel):
+    trade_ids: List[UUID] = Field(..., min_length=1, max_length=1000)
+
+
+class TradeBatchResult(BaseModel):
+    id: UUID
+    state: Optional[str] = None
+    error: Optional[str] = None  # set when the trade was left unchanged
+
+
+class TradeBatchResponse(BaseModel):
+    results: List[TradeBatchResult]
+
+
+class TradeBulkRequest(BaseModel):
+    # rows are validated one by one so a bad row does not reject the batch.
+    trades: List[Dict[str, Any]] = Field(..., min_length=1, max_length=10000)
+
+
+class TradeBulkResult(BaseModel):
+    index: int  # position of the row in the request
+    id: Optional[UUID] = None
+    state: Optional[str] = None
+    error: Optional[str] = None
+
+
+class TradeBulkResponse(BaseModel):
+    results: List[TradeBulkResult]
+
+
+class TradeCacheStatsResponse(BaseModel):
+    hits: int
+    misses: int
+    evictions: int
+    size: int
+    max_size: int
+
+
+class TradeOutboxStatsResponse(BaseModel):
+    pending: int
+    failed: int
+    sent: int
+    retried: int
+    latency: Dict[str, Optional[float]]
@@ -0,0 +1,138 @@
+from dataclasses import replace
+from typing import Dict, Any, FrozenSet, Optional, List, Tuple
+
+from trading_execution_system.models.enums import TradeState, TradeAction
+from trading_execution_system.models.trade import Trade, TradeDetails, TradeQuery
+from trading_execution_system.db.async_settings import AsyncTradeORMRepository
+from trading_execution_system.models.user import User, UserRole
+from trading_execution_system.schemas.trade import TradeStatusResponse
+from trading_execution_system.services.trade import (
+    apply_transition,
+    apply_update,
+    check_history_indices,
+    check_version,
+    diff_from_entries,
+)
+
+
+class AsyncTradeService:
+    """TradeService for the asyncio routes, the workflow rules are shared"""
+
+    def __init__(self, db: AsyncTradeORMRepository):
+        self.db = db
+
+    async def _get(
+        self, trade_id, expected_versions: Optional[FrozenSet[int]] = None
+    ) -> Trade:
+        trade = await self.db.get(str(trade_id))
+        if not trade:
+            raise ValueError("Trade not found")
+        check_version(trade, expected_versions)
+        return trade
+
+    async def _transition(
+        self,
+        trade: Trade,
+        action: TradeAction,
+        user_id: str,
+        new_details: Optional[TradeDetails] = None,
+    ):
+        apply_transition(trade, action, user_id, new_details)
+        await self.db.update(trade)
+
+    async def submit_trade(self, requester_id: str, details: TradeDetails) -> Trade:
+        details.validate_dates()
+        trade = Trade(requester_id=requester_id, details=details)
+        await self.db.create(trade)
+        await self._transition(trade, TradeAction.SUBMIT, requester_id)
+        return trade
+
+    async def approve_trade(
+        self, trade_id, user_id: str, expected_versions: Optional[FrozenSet[int]] = None
+    ) -> Trade:
+        trade = await self._get(trade_id, expected_versions)
+        await self._transition(trade, TradeAction.APPROVE, user_id)
+        return trade
+
+    async def update_trade(
+        self,
+        trade_id,
+        current_user: User,
+        new_details: TradeDetails,
+        expected_versions: Optional[FrozenSet[int]] = None,
+    ) -> Trade:
+        trade = await self._get(trade_id, expected_versions)
+        apply_update(trade, current_user.id, new_details)
+        await self.db.update(trade)
+        return trade
+
+    async def cancel_trade(
+        self,
+        trade_id,
+        current_user: User,
+        expected_versions: Optional[FrozenSet[int]] = None,
+    ) -> Trade:
+        trade = await self._get(trade_id, expected_versions)
+        # only allow cancellation if trade has not been Booked
+        if trade.state == TradeState.EXECUTED:
+            raise ValueError("Trade has already been Booked")
+        await self._transition(trade, TradeAction.CANCEL, current_user.id)
+        return trade
+
+    async def send_to_execute(
+        self, trade_id, user_id: str, expected_versions: Optional[FrozenSet[int]] = None
+    ) -> Trade:
+        trade = await self._get(trade_id, expected_versions)
+        await self._transition(trade, TradeAction.SEND_TO_EXECUTE, user_id)
+        return trade
+
+    async def book_trade(
+        self,
+        trade_id,
+        user_id: str,
+        strike: float,
+        expected_versions: Optional[FrozenSet[int]] = None,
+    ) -> Trade:
+        trade = await self._get(trade_id, expected_versions)
+        trade.details = replace(trade.details, strike=strike)
+        await self._transition(trade, TradeAction.BOOK, user_id)
+        return trade
+
+    async def get_history(
+        self, trade_id, offset: int = 0, limit: Optional[int] = None
+    ) -> Any:
+        trade = await self._get(trade_id)
+        end = None if limit is None else offset + limit
+        return trade.history[offset:end]
+
+    async def compute_diff(
+        self, trade_id, from_index: int, to_index: int
+    ) -> Dict[str, Any]:
+        history_length = await self.db.get_history_length(str(trade_id))
+        if history_length is None:
+            raise ValueError("Trade not found")
+        check_history_indices(history_length, from_index, to_index)
+        low, high = sorted((from_index, to_index))
+        entries = await self.db.get_history_entries(str(trade_id), low, high)
+        return diff_from_entries(entries, from_index, to_index)
+
+    async def get_trade_status(self, trade_id) -> TradeStatusResponse:
+        summary = await self.db.get_summary(str(trade_id))
+        if not summary:
+            raise ValueError("Trade not found")
+        return TradeStatusResponse(
+            id=summary.id, state=summary.state.name, version=summary.version
+        )
+
+    async def query_trades(
+        self, current_user: User, query: TradeQuery
+    ) -> Tuple[List[Trade], Optional[str]]:
+        if current_user.role != UserRole.ADMIN:
+            query.requester_id = current_user.id
+        return await self.db.query(query)
+
+    async def get_trade_user(self, trade_id) -> str:
+        summary = await self.db.get_summary(str(trade_id))
+        if not summary:
+            raise ValueError("Trade not found")
+        return summary.requester_id
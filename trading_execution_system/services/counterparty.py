@@ -0,0 +1,63 @@
+"""
+Clients the outbox dispatcher sends messages to the counterparty through.
+COUNTERPARTY_CLIENT names the factory of the one to use, e.g.
+``trading_execution_system.services.counterparty:FakeCounterpartyClient``.
+"""
+
+import asyncio
+import importlib
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, List
+
+from trading_execution_system.models.outbox import OutboxMessage
+
+
+class CounterpartyError(Exception):
+    """The counterparty did not accept a message, it is retried later"""
+
+
+class CounterpartyClient(ABC):
+    @abstractmethod
+    async def send(self, message: OutboxMessage) -> None:
+        """
+        Deliver ``message``, raise to have it retried. Messages can arrive more
+        than once, ``message.id`` identifies repeats.
+        """
+
+    async def close(self) -> None:
+        """Release connections, called when the dispatcher stops."""
+
+
+class FakeCounterpartyClient(CounterpartyClient):
+    """
+    In-process counterparty for tests and local runs. It records every
+    delivered message once, and fails the first ``failures`` attempts of each
+    message when asked to.
+    """
+
+    def __init__(self, latency: float = 0.0, failures: int = 0):
+        self.latency = latency
+        self.failures = failures
+        self.received: Dict[int, OutboxMessage] = {}
+        self.attempts: Dict[int, int] = {}
+
+    async def send(self, message: OutboxMessage) -> None:
+        self.attempts[message.id] = self.attempts.get(message.id, 0) + 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.attempts[message.id] <= self.failures:
+            raise CounterpartyError(f"Counterparty unavailable for {message.trade_id}")
+        self.received.setdefault(message.id, message)
+
+    @property
+    def trade_ids(self) -> List[str]:
+        return [message.trade_id for message in self.received.values()]
+
+
+def load_client(path: str) -> CounterpartyClient:
+    """The client built by the ``module:factory`` at ``path``."""
+    module_name, _, name = path.partition(":")
+    factory: Callable[[], CounterpartyClient] = getattr(
+        importlib.import_module(module_name), name
+    )
+    return factory()
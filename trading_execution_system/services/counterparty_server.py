@@ -0,0 +1,125 @@
+"""
+Local stand-in for the counterparty's execution endpoint, for tests,
+benchmarks and local runs of the execution gateway.
+
+It speaks the gateway's protocol, one JSON object per line each way, and fills
+every trade at the mid rate of its currency, plus or minus ``spread`` for a
+buy or a sell. Fills are remembered by message id, so a repeated message gets
+its original fill. With ``latency`` set, replies are sent after that long and
+can overtake each other, as from a real pipelined endpoint.
+"""
+
+import argparse
+import asyncio
+import logging
+from typing import Dict, Optional, Set
+
+from trading_execution_system.core.config import COUNTERPARTY_PORT, PNL_RATES_FILE
+from trading_execution_system.db.rates import load_rate_snapshot
+from trading_execution_system.models.trade import direction_sign
+from trading_execution_system.utils.serialization import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+
+class StandInCounterparty:
+    def __init__(
+        self, rates: Dict[str, float], spread: float = 0.0005, latency: float = 0.0
+    ):
+        self.rates = rates
+        self.spread = spread
+        self.latency = latency
+        self.requests = 0
+        self.fills: Dict[int, float] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._writers: Set[asyncio.StreamWriter] = set()
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> int:
+        """Listen on ``host``, the bound port, any free one for port 0."""
+        self._server = await asyncio.start_server(self._serve, host, port)
+        return self._server.sockets[0].getsockname()[1]
+
+    def _fill(self, request: dict) -> dict:
+        message_id = request["message_id"]
+        if message_id not in self.fills:
+            details = request["details"]
+            rate = self.rates.get(details["currency"])
+            if rate is None:
+                return {"error": f"No market in {details['currency']}"}
+            side = direction_sign(details.get("direction"))
+            if side is None:
+                return {"error": f"Unknown direction {details.get('direction')}"}
+            self.fills[message_id] = round(rate * (1 + side * self.spread), 6)
+        return {"trade_id": request["trade_id"], "strike": self.fills[message_id]}
+
+    def _reply(self, request: dict) -> bytes:
+        self.requests += 1
+        return dumps({"id": request["id"], **self._fill(request)}) + b"\n"
+
+    async def _reply_later(self, request: dict, writer: asyncio.StreamWriter):
+        await asyncio.sleep(self.latency)
+        if not writer.is_closing():
+            writer.write(self._reply(request))
+
+    async def _serve(self, reader, writer) -> None:
+        self._writers.add(writer)
+        replies = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                request = loads(line)
+                if self.latency:
+                    reply = asyncio.create_task(self._reply_later(request, writer))
+                    replies.add(reply)
+                    reply.add_done_callback(replies.discard)
+                else:
+                    writer.write(self._reply(request))
+        except ConnectionError:
+            pass
+        finally:
+            for reply in list(replies):
+                reply.cancel()
+            self._writers.discard(writer)
+            writer.close()
+
+    def disconnect(self) -> None:
+        """Drop every client connection, the server keeps listening."""
+        for writer in list(self._writers):
+            writer.close()
+
+    async def close(self) -> None:
+        self.disconnect()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+
+async def _serve_forever(counterparty: StandInCounterparty, host: str, port: int):
+    port = await counterparty.start(host, port)
+    logger.info("Stand-in counterparty listening on %s:%s", host, port)
+    await asyncio.Event().wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run a stand-in counterparty for the execution gateway"
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=COUNTERPARTY_PORT)
+    parser.add_argument("--rates", default=PNL_RATES_FILE)
+    parser.add_argument("--latency", type=float, default=0.0)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    counterparty = StandInCounterparty(
+        load_rate_snapshot(args.rates).rates, latency=args.latency
+    )
+    try:
+        asyncio.run(_serve_forever(counterparty, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Background asyncio task draining the transactional outbox to the counterparty.
+
+Each round claims a batch of due messages, sends them concurrently through the
+counterparty client and settles the whole batch in one transaction. Failed
+sends are offered again after an exponential backoff with jitter, and given up
+after ``max_attempts``.
+"""
+
+import asyncio
+import datetime
+import logging
+import random
+from collections import deque
+from typing import Deque, Optional
+
+from trading_execution_system.db.outbox import AsyncOutboxRepository
+from trading_execution_system.models.outbox import OutboxMessage, OutboxStats
+from trading_execution_system.services.counterparty import CounterpartyClient
+
+logger = logging.getLogger(__name__)
+
+# dispatch latencies the percentiles are computed over.
+LATENCY_WINDOW = 10_000
+
+
+def _percentile(ordered: list, fraction: float) -> Optional[float]:
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class OutboxDispatcher:
+    def __init__(
+        self,
+        client: CounterpartyClient,
+        db: Optional[AsyncOutboxRepository] = None,
+        batch_size: int = 100,
+        poll_interval: float = 0.5,
+        max_attempts: int = 10,
+        retry_delay: float = 0.5,
+        max_retry_delay: float = 60.0,
+        lease: float = 30.0,
+    ):
+        self.client = client
+        self.db = db or AsyncOutboxRepository()
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.lease = lease
+        self.sent = 0
+        self.retried = 0
+        self.latencies: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self._task: Optional[asyncio.Task] = None
+        self._stopping: Optional[asyncio.Event] = None
+
+    def backoff(self, attempts: int) -> float:
+        """Seconds before the next attempt, after ``attempts`` failed ones."""
+        delay = min(self.max_retry_delay, self.retry_delay * 2 ** (attempts - 1))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    async def _send(self, message: OutboxMessage) -> Optional[str]:
+        try:
+            await self.client.send(message)
+            return None
+        except Exception as e:
+            return f"{type(e).__name__}: {e}"
+
+    async def dispatch_batch(self) -> int:
+        """Claim, send and settle one batch, the number of messages claimed."""
+        messages = await self.db.claim(self.batch_size, self.lease)
+        if not messages:
+            return 0
+        errors = await asyncio.gather(*(self._send(message) for message in messages))
+        now = datetime.datetime.utcnow()
+        dispatched, retries, failed = [], {}, {}
+        for message, error in zip(messages, errors):
+            if error is None:
+                dispatched.append(message.id)
+                self.latencies.append((now - message.created_at).total_seconds())
+            elif message.attempts >= self.max_attempts:
+                logger.error("Giving up on outbox message %s: %s", message.id, error)
+                failed[message.id] = error
+            else:
+                delay = datetime.timedelta(seconds=self.backoff(message.attempts))
+                retries[message.id] = (now + delay, error)
+        await self.db.settle(dispatched, retries, failed)
+        self.sent += len(dispatched)
+        self.retried += len(retries)
+        return len(messages)
+
+    async def drain(self) -> None:
+        """Dispatch until no message is due."""
+        while await self.dispatch_batch():
+            pass
+
+    async def run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                claimed = await self.dispatch_batch()
+            except Exception:
+                logger.exception("Outbox dispatch failed")
+                claimed = 0
+            # a full batch means more are probably due, go again right away.
+            if claimed < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    def start(self) -> None:
+        """Run in the background on the current event loop."""
+        self._stopping = asyncio.Event()
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        """Finish the batch in flight, then close the client."""
+        if self._task is not None:
+            self._stopping.set()
+            await self._task
+            self._task = None
+        await self.client.close()
+
+    def stats(self) -> OutboxStats:
+        ordered = sorted(self.latencies)
+        return OutboxStats(
+            sent=self.sent,
+            retried=self.retried,
+            latency={
+                "p50": _percentile(ordered, 0.5),
+                "p95": _percentile(ordered, 0.95),
+                "p99": _percentile(ordered, 0.99),
+                "max": ordered[-1] if ordered else None,
+            },
+        )
@@ -0,0 +1,259 @@
+"""
+Execution gateway, the counterparty client that executes SEND_TO_EXECUTE
+messages and books their fills.
+
+Requests go out as newline delimited JSON over a small pool of asyncio
+connections. Each connection is pipelined: requests are written without waiting
+for earlier replies, and replies are matched back to them by id, in whatever
+order they arrive. Fills are booked with ``TradeService.book_trades``, the
+batch form of ``book_trade``: one worker thread call and one transaction per
+batch, so the event loop is never blocked on the database and no thread or
+commit is spent per trade.
+
+``send`` returns once the fill is booked, so the dispatcher only settles a
+message after its trade is EXECUTED. A message redelivered after a crash is
+executed again under the same id, which the counterparty answers with the
+original fill.
+"""
+
+import asyncio
+import itertools
+import logging
+from typing import Callable, Dict, List, Optional, Tuple
+
+from trading_execution_system.core.config import (
+    COUNTERPARTY_HOST,
+    COUNTERPARTY_PORT,
+    GATEWAY_BATCH_SIZE,
+    GATEWAY_CONNECTIONS,
+    GATEWAY_MAX_IN_FLIGHT,
+    GATEWAY_TIMEOUT,
+)
+from trading_execution_system.models.enums import TradeState
+from trading_execution_system.models.outbox import Fill, OutboxMessage
+from trading_execution_system.services.counterparty import (
+    CounterpartyClient,
+    CounterpartyError,
+)
+from trading_execution_system.services.trade import TradeService
+from trading_execution_system.utils.serialization import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+_request_ids = itertools.count(1)
+
+
+class _Connection:
+    """One pipelined connection, at most ``max_in_flight`` requests unanswered"""
+
+    def __init__(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+        max_in_flight: int,
+    ):
+        self.reader = reader
+        self.writer = writer
+        self.pending: Dict[int, asyncio.Future] = {}
+        self.slots = asyncio.Semaphore(max_in_flight)
+        self.closed = False
+        self._reading = asyncio.create_task(self._read())
+
+    async def request(self, body: dict, timeout: float) -> dict:
+        async with self.slots:
+            if self.closed:
+                raise CounterpartyError("Connection to the counterparty lost")
+            loop = asyncio.get_running_loop()
+            request_id = next(_request_ids)
+            future = self.pending[request_id] = loop.create_future()
+            # a timer rather than wait_for, which costs a task per request.
+            expiry = loop.call_later(timeout, self._expire, request_id)
+            try:
+                # the semaphore bounds what is buffered, so no drain.
+                self.writer.write(dumps({**body, "id": request_id}) + b"\n")
+                return await future
+            finally:
+                expiry.cancel()
+                self.pending.pop(request_id, None)
+
+    def _expire(self, request_id: int) -> None:
+        future = self.pending.get(request_id)
+        if future is not None and not future.done():
+            future.set_exception(CounterpartyError("Counterparty timed out"))
+
+    async def _read(self) -> None:
+        try:
+            while True:
+                line = await self.reader.readline()
+                if not line:
+                    break
+                reply = loads(line)
+                future = self.pending.get(reply.get("id"))
+                if future is not None and not future.done():
+                    future.set_result(reply)
+        except Exception:
+            logger.exception("Counterparty connection failed")
+        finally:
+            self.closed = True
+            for future in self.pending.values():
+                if not future.done():
+                    future.set_exception(
+                        CounterpartyError("Connection to the counterparty lost")
+                    )
+            self.writer.close()
+
+    async def close(self) -> None:
+        self.writer.close()
+        await self._reading
+
+
+class ExecutionGateway(CounterpartyClient):
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        connections: int = 4,
+        max_in_flight: int = 256,
+        timeout: float = 5.0,
+        batch_size: int = 500,
+        trade_service: Optional[Callable[[], TradeService]] = None,
+        user_id: str = "counterparty",
+    ):
+        self.host = host
+        self.port = port
+        self.connections = connections
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+        self.batch_size = batch_size
+        self.trade_service = trade_service
+        # recorded as the user of the BOOK history records.
+        self.user_id = user_id
+        self.executed = 0
+        self.booked = 0
+        self.batches = 0
+        self._pool: List[_Connection] = []
+        self._connecting: Optional[asyncio.Task] = None
+        self._fills: List[Tuple[Fill, asyncio.Future]] = []
+        self._booking: Optional[asyncio.Task] = None
+
+    async def _connect(self, count: int) -> None:
+        results = await asyncio.gather(
+            *(asyncio.open_connection(self.host, self.port) for _ in range(count)),
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, BaseException):
+                logger.error("Cannot connect to the counterparty: %s", result)
+            else:
+                self._pool.append(_Connection(*result, self.max_in_flight))
+
+    async def _connection(self) -> _Connection:
+        """The least busy open connection, lost ones are replaced in the background"""
+        self._pool = [connection for connection in self._pool if not connection.closed]
+        if len(self._pool) < self.connections and (
+            self._connecting is None or self._connecting.done()
+        ):
+            self._connecting = asyncio.create_task(
+                self._connect(self.connections - len(self._pool))
+            )
+        if not self._pool:
+            await asyncio.shield(self._connecting)
+        if not self._pool:
+            raise CounterpartyError(
+                f"Cannot connect to the counterparty at {self.host}:{self.port}"
+            )
+        return min(self._pool, key=lambda connection: len(connection.pending))
+
+    async def execute(self, message: OutboxMessage) -> Fill:
+        """The counterparty's fill of ``message``, not booked."""
+        connection = await self._connection()
+        reply = await connection.request(
+            {
+                "message_id": message.id,
+                "trade_id": message.trade_id,
+                "action": message.action,
+                "details": message.payload["details"],
+            },
+            self.timeout,
+        )
+        if "error" in reply:
+            raise CounterpartyError(reply["error"])
+        self.executed += 1
+        return Fill(message.id, message.trade_id, float(reply["strike"]))
+
+    async def send(self, message: OutboxMessage) -> None:
+        await self.book(await self.execute(message))
+
+    async def book(self, fill: Fill) -> None:
+        """Book ``fill`` with the next batch, raise if it could not be."""
+        future = asyncio.get_running_loop().create_future()
+        self._fills.append((fill, future))
+        if self._booking is None or self._booking.done():
+            self._booking = asyncio.create_task(self._book_pending())
+        await future
+
+    async def _book_pending(self) -> None:
+        # fills arriving while a batch is booked make up the next one.
+        while self._fills:
+            batch = self._fills[: self.batch_size]
+            del self._fills[: self.batch_size]
+            try:
+                errors = await asyncio.to_thread(
+                    self._book_batch, [fill for fill, _ in batch]
+                )
+            except Exception as e:
+                errors = [e] * len(batch)
+            for (_, future), error in zip(batch, errors):
+                if future.done():
+                    continue
+                if error is None:
+                    future.set_result(None)
+                else:
+                    future.set_exception(error)
+
+    def _services(self) -> Callable[[], TradeService]:
+        if self.trade_service is None:
+            # the dependencies module builds the gateway, so it is imported
+            # on first use.
+            from trading_execution_system.core.dependencies import get_trade_service
+
+            self.trade_service = get_trade_service
+        return self.trade_service
+
+    def _book_batch(self, fills: List[Fill]) -> List[Optional[Exception]]:
+        results = self._services()().book_trades(
+            {fill.trade_id: fill.strike for fill in fills}, self.user_id
+        )
+        outcomes = {result.id: result for result in results}
+        errors: List[Optional[Exception]] = []
+        for fill in fills:
+            outcome = outcomes[fill.trade_id]
+            # an EXECUTED trade is a redelivered message, booked before the
+            # dispatcher could settle it.
+            if outcome.error is None or outcome.state == TradeState.EXECUTED:
+                errors.append(None)
+            else:
+                errors.append(ValueError(outcome.error))
+        booked = errors.count(None)
+        self.booked += booked
+        self.batches += 1
+        logger.debug("Booked %s of %s fills", booked, len(fills))
+        return errors
+
+    async def close(self) -> None:
+        if self._booking is not None:
+            await self._booking
+        pool, self._pool = self._pool, []
+        await asyncio.gather(*(connection.close() for connection in pool))
+
+
+def from_config() -> ExecutionGateway:
+    """The gateway to the counterparty of the COUNTERPARTY_* settings"""
+    return ExecutionGateway(
+        COUNTERPARTY_HOST,
+        COUNTERPARTY_PORT,
+        connections=GATEWAY_CONNECTIONS,
+        max_in_flight=GATEWAY_MAX_IN_FLIGHT,
+        timeout=GATEWAY_TIMEOUT,
+        batch_size=GATEWAY_BATCH_SIZE,
+    )
@@ -0,0 +1,197 @@
+"""
+Mark-to-market P&L of the executed book. The book is held as NumPy column
+arrays and revalued in one vectorized pass per rate snapshot:
+
+    pnl = sign(direction) * notional * (rate[currency] - strike)
+
+The arrays are reloaded only when the book changes and revaluations are cached
+per rate snapshot and book version, so a report is grouping work only.
+"""
+
+import datetime
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+from trading_execution_system.db.cache import LRUCache
+from trading_execution_system.db.rates import RateSnapshot, load_rate_snapshot
+from trading_execution_system.db.reports import TradeReportRepository
+from trading_execution_system.models.report import (
+    PNL_GROUPINGS,
+    PNL_PERIODS,
+    ProfitLossGroup,
+    ProfitLossQuery,
+    ProfitLossReport,
+)
+from trading_execution_system.models.trade import direction_sign
+
+_PERIOD_UNITS = {"month": "datetime64[M]", "year": "datetime64[Y]"}
+_EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+
+
+def _codes(values) -> Tuple[np.ndarray, np.ndarray]:
+    """Distinct values, in first seen order, and each element's index into them"""
+    labels = list(dict.fromkeys(values))
+    index: Dict[str, int] = {label: i for i, label in enumerate(labels)}
+    codes = np.fromiter(map(index.__getitem__, values), np.intp, len(values))
+    return np.array(labels, dtype=str), codes
+
+
+def _days(dates) -> np.ndarray:
+    if dates and isinstance(dates[0], str):
+        return np.array(dates, dtype="datetime64[D]")
+    ordinals = np.fromiter(
+        (day.toordinal() for day in dates), dtype=np.int64, count=len(dates)
+    )
+    return (ordinals - _EPOCH_ORDINAL).astype("datetime64[D]")
+
+
+@dataclass(frozen=True)
+class ExecutedBook:
+    """The executed trades, one array element per trade"""
+
+    version: Hashable
+    requesters: np.ndarray  # in first seen order, like currencies
+    requester: np.ndarray  # index into requesters
+    currencies: np.ndarray
+    currency: np.ndarray  # index into currencies
+    notional: np.ndarray
+    strike: np.ndarray  # NaN when the trade has none
+    sign: np.ndarray  # 1 for a buy, -1 for a sell, NaN for unknown directions
+    value_date: np.ndarray
+
+    @classmethod
+    def from_columns(cls, version: Hashable, columns: List[tuple]) -> "ExecutedBook":
+        requester, currency, notional, strike, direction, value_date = columns
+        requesters, requester_codes = _codes(requester)
+        currencies, currency_codes = _codes(currency)
+        sides, side = _codes(direction)
+        # a trade of an unknown direction is NaN, reported as unpriced.
+        signs = np.array(
+            [direction_sign(value) or np.nan for value in sides.tolist()],
+            dtype=np.float64,
+        )
+        return cls(
+            version=version,
+            requesters=requesters,
+            requester=requester_codes,
+            currencies=currencies,
+            currency=currency_codes,
+            notional=np.array(notional, dtype=np.float64),
+            strike=np.array(strike, dtype=np.float64),
+            sign=signs[side],
+            value_date=_days(value_date),
+        )
+
+
+def revalue(book: ExecutedBook, snapshot: RateSnapshot) -> np.ndarray:
+    """P&L of every trade in the book, NaN where it cannot be priced"""
+    rates = np.array(
+        [snapshot.rates.get(currency, np.nan) for currency in book.currencies],
+        dtype=np.float64,
+    )
+    return book.sign * book.notional * (rates[book.currency] - book.strike)
+
+
+def _group_keys(
+    book: ExecutedBook, query: ProfitLossQuery
+) -> Tuple[np.ndarray, np.ndarray]:
+    if query.group_by == "user":
+        return book.requesters, book.requester
+    # periods count up from the first one, no sort needed to number them.
+    periods = book.value_date.astype(_PERIOD_UNITS[query.period])
+    if not len(periods):
+        return np.array([], dtype=str), np.array([], dtype=np.intp)
+    first = periods.min()
+    codes = (periods - first).astype(np.intp)
+    labels = first + np.arange(codes.max() + 1)
+    return np.datetime_as_string(labels.astype("datetime64[D]"), unit="D"), codes
+
+
+def profit_loss_report(
+    book: ExecutedBook,
+    pnl: np.ndarray,
+    snapshot: RateSnapshot,
+    query: ProfitLossQuery,
+) -> ProfitLossReport:
+    selected = np.ones(len(pnl), dtype=bool)
+    if query.requester_id is not None:
+        matches = np.flatnonzero(book.requesters == query.requester_id)
+        selected = book.requester == (matches[0] if len(matches) else -1)
+    priced = selected & ~np.isnan(pnl)
+
+    labels, codes = _group_keys(book, query)
+    codes = codes[priced]
+    counts = np.bincount(codes, minlength=len(labels))
+    notional = np.bincount(codes, weights=book.notional[priced], minlength=len(labels))
+    sums = np.bincount(codes, weights=pnl[priced], minlength=len(labels))
+    return ProfitLossReport(
+        rate_snapshot=snapshot.id,
+        count=int(counts.sum()),
+        notional=float(notional.sum()),
+        pnl=float(sums.sum()),
+        unpriced=int(selected.sum() - priced.sum()),
+        groups=[
+            ProfitLossGroup(
+                str(labels[i]), int(counts[i]), float(notional[i]), float(sums[i])
+            )
+            for i in sorted(np.flatnonzero(counts), key=labels.__getitem__)
+        ],
+    )
+
+
+class ProfitLossEngine:
+    """
+    Revalues the executed book against the rates in ``rates_file``. The book
+    arrays, the revaluation of each rate snapshot and the grouped reports are
+    cached until the book or the rate file changes.
+    """
+
+    def __init__(
+        self, db: TradeReportRepository, rates_file: str, cache_size: int = 64
+    ):
+        self.db = db
+        self.rates_file = rates_file
+        self.cache = LRUCache(cache_size)
+        self._book: Optional[ExecutedBook] = None
+        self._book_lock = threading.Lock()
+
+    def executed_book(self) -> ExecutedBook:
+        # the version is read first, a trade booked meanwhile only costs a reload.
+        version = self.db.executed_book_version()
+        with self._book_lock:
+            if self._book is None or self._book.version != version:
+                self._book = ExecutedBook.from_columns(version, self.db.executed_book())
+            return self._book
+
+    def _cached(self, key: Hashable, compute) -> Any:
+        value = self.cache.get(key)
+        if value is None:
+            value = compute()
+            self.cache.set(key, value)
+        return value
+
+    def profit_loss(self, query: ProfitLossQuery) -> ProfitLossReport:
+        if query.group_by not in PNL_GROUPINGS:
+            raise ValueError(f"Unknown P&L grouping {query.group_by}")
+        if query.period not in PNL_PERIODS:
+            raise ValueError(f"Unknown P&L period {query.period}")
+        snapshot = load_rate_snapshot(self.rates_file)
+        book = self.executed_book()
+        pnl = self._cached(
+            ("revaluation", snapshot.id, book.version),
+            lambda: revalue(book, snapshot),
+        )
+        return self._cached(
+            (
+                "report",
+                snapshot.id,
+                book.version,
+                query.requester_id,
+                query.group_by,
+                query.period,
+            ),
+            lambda: profit_loss_report(book, pnl, snapshot, query),
+        )
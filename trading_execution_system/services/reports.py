@@ -0,0 +1,48 @@
+from typing import Optional
+
+from trading_execution_system.db.counters import StateCountRepository
+from trading_execution_system.db.reports import TradeReportRepository
+from trading_execution_system.models.report import (
+    ProfitLossQuery,
+    ProfitLossReport,
+    ReportQuery,
+    StateSummary,
+    TradeReport,
+)
+from trading_execution_system.models.user import User, UserRole
+from trading_execution_system.services.pnl import ProfitLossEngine
+
+
+class ReportService:
+    def __init__(
+        self,
+        db: TradeReportRepository,
+        pnl_engine: ProfitLossEngine,
+        counters: StateCountRepository,
+    ):
+        self.db = db
+        self.pnl_engine = pnl_engine
+        self.counters = counters
+
+    def trade_report(self, current_user: User, query: ReportQuery) -> TradeReport:
+        """Aggregate the matching trades, users only ever see their own trades."""
+        if current_user.role != UserRole.ADMIN:
+            query.requester_id = current_user.id
+        return self.db.trade_report(query)
+
+    def profit_loss(
+        self, current_user: User, query: ProfitLossQuery
+    ) -> ProfitLossReport:
+        """Mark-to-market P&L of the executed book, restricted like trade_report."""
+        if current_user.role != UserRole.ADMIN:
+            query.requester_id = current_user.id
+        return self.pnl_engine.profit_loss(query)
+
+    def state_summary(
+        self, current_user: User, requester_id: Optional[str] = None
+    ) -> StateSummary:
+        """Trades per state from the counters, globally for admins only."""
+        if current_user.role != UserRole.ADMIN:
+            requester_id = current_user.id
+        counts = self.counters.state_counts(requester_id)
+        return StateSummary(requester_id, counts, sum(counts.values()))
@@ -1,14 +1,108 @@
-from typing import Dict, Any, Optional, List
+from dataclasses import replace
+from typing import Dict, Any, FrozenSet, Iterator, Optional, List, Tuple
 
+from trading_execution_system.core.exceptions import PreconditionFailedError
 from trading_execution_system.models.enums import TradeState, TradeAction
-from trading_execution_system.models.trade import Trade, TradeDetails
-from trading_execution_system.db.settings import TradeORMRepository
+from trading_execution_system.models.trade import (
+    Trade,
+    TradeDetails,
+    TradeQuery,
+    TradeSummary,
+    BatchResult,
+)
+from trading_execution_system.db.settings import TradeORMRepository, StoredSnapshot
 from trading_execution_system.models.user import User, UserRole
 from trading_execution_system.schemas.trade import TradeStatusResponse
-from trading_execution_system.utils.diff import compute_differences
+from trading_execution_system.utils.diff import compute_differences, apply_delta
 from trading_execution_system.services.state_transitions import ALLOWED_TRANSITIONS
 
 
+def next_state(current_state: TradeState, action: TradeAction) -> TradeState:
+    allowed = ALLOWED_TRANSITIONS.get(current_state, {})
+
+    # Check if the action is allowed from the current state.
+    if action not in allowed:
+        raise ValueError(
+            f"Action {action.name} not allowed from state {current_state.name}"
+        )
+    return allowed[action]
+
+
+def apply_transition(
+    trade: Trade,
+    action: TradeAction,
+    user_id: str,
+    new_details: Optional[TradeDetails] = None,
+) -> None:
+    """Move ``trade`` through ``action`` in memory, the caller persists it."""
+    current_state = trade.state
+    new_state = next_state(current_state, action)
+
+    if action == TradeAction.UPDATE and new_details is not None:
+        new_details.validate_dates()
+        trade.details = new_details
+
+    # Update the trade state and add history.
+    trade.state = new_state
+    trade.add_history(user_id, action.name, current_state)
+
+
+def apply_update(trade: Trade, user_id: str, new_details: TradeDetails) -> None:
+    # Validate the new details.
+    new_details.validate_dates()
+    trade.details = new_details
+
+    # move the trade to NEEDS_REAPPROVAL after an update.
+    previous_state = trade.state
+    trade.state = TradeState.NEEDS_REAPPROVAL
+    trade.add_history(user_id, "UPDATE", previous_state)
+
+
+def check_version(trade: Trade, expected_versions: Optional[FrozenSet[int]]) -> None:
+    """Compare the If-Match versions sent by the client, None skips the check."""
+    if expected_versions is not None and trade.version not in expected_versions:
+        expected = ", ".join(str(version) for version in sorted(expected_versions))
+        raise PreconditionFailedError(
+            f"Trade is at version {trade.version}, not {expected}"
+        )
+
+
+def check_history_indices(history_length: int, from_index: int, to_index: int):
+    if (
+        from_index < 0
+        or to_index < 0
+        or from_index >= history_length
+        or to_index >= history_length
+    ):
+        raise ValueError(
+            f"Invalid history indices - min index should be 0 and max index should be {history_length - 1}"
+        )
+
+
+def diff_from_entries(
+    entries: List[StoredSnapshot], from_index: int, to_index: int
+) -> Dict[str, Any]:
+    """
+    Rebuild the older version from its checkpoint, the newer one only differs
+    by the fields touched by the records in between.
+    """
+    low = min(from_index, to_index)
+    base, changes = {}, {}
+    for entry in entries:
+        if entry.seq <= low:
+            base = (
+                entry.payload
+                if entry.is_checkpoint
+                else apply_delta(base, entry.payload)
+            )
+        else:
+            changes.update(entry.payload)
+    newer = apply_delta(base, changes)
+    if from_index > to_index:
+        return compute_differences(newer, base)
+    return compute_differences(base, newer)
+
+
 class TradeService:
     def __init__(self, db: TradeORMRepository):
         self.db = db
@@ -20,22 +114,7 @@ class TradeService:
         user_id: str,
         new_details: Optional[TradeDetails] = None,
     ):
-        current_state = trade.state
-        allowed = ALLOWED_TRANSITIONS.get(current_state, {})
-
-        # Check if the action is allowed from the current state.
-        if action not in allowed:
-            raise ValueError(
-                f"Action {action.name} not allowed from state {current_state.name}"
-            )
-
-        if action == TradeAction.UPDATE and new_details is not None:
-            new_details.validate_dates()
-            trade.details = new_details
-
-        # Update the trade state and add history.
-        trade.state = allowed[action]
-        trade.add_history(user_id, action.name, current_state)
+        apply_transition(trade, action, user_id, new_details)
 
         # Save the updated trade to the database.
         self.db.update(trade)
@@ -47,36 +126,57 @@ class TradeService:
         self._transition(trade, TradeAction.SUBMIT, requester_id)
         return trade
 
-    def approve_trade(self, trade_id, user_id: str) -> Trade:
+    def submit_trades(
+        self, requester_id: str, details_list: List[TradeDetails]
+    ) -> List[Trade]:
+        """
+        Submit many trades in one transaction. They are created directly in
+        PENDING_APPROVAL with their SUBMIT record, no reload or rewrite.
+        """
+        trades = []
+        for details in details_list:
+            details.validate_dates()
+            trade = Trade(requester_id=requester_id, details=details)
+            apply_transition(trade, TradeAction.SUBMIT, requester_id)
+            trades.append(trade)
+        return self.db.create_many(trades)
+
+    def _get(
+        self, trade_id, expected_versions: Optional[FrozenSet[int]] = None
+    ) -> Trade:
         trade = self.db.get(str(trade_id))
         if not trade:
             raise ValueError("Trade not found")
+        check_version(trade, expected_versions)
+        return trade
+
+    def approve_trade(
+        self, trade_id, user_id: str, expected_versions: Optional[FrozenSet[int]] = None
+    ) -> Trade:
+        trade = self._get(trade_id, expected_versions)
         self._transition(trade, TradeAction.APPROVE, user_id)
         return trade
 
     def update_trade(
-        self, trade_id, current_user: User, new_details: TradeDetails
+        self,
+        trade_id,
+        current_user: User,
+        new_details: TradeDetails,
+        expected_versions: Optional[FrozenSet[int]] = None,
     ) -> Trade:
-        trade = self.db.get(str(trade_id))
-        if not trade:
-            raise ValueError("Trade not found")
-
-        # Validate the new details.
-        new_details.validate_dates()
-        trade.details = new_details
-
-        # move the trade to NEEDS_REAPPROVAL after an update.
-        previous_state = trade.state
-        trade.state = TradeState.NEEDS_REAPPROVAL
-        trade.add_history(current_user.id, "UPDATE", previous_state)
+        trade = self._get(trade_id, expected_versions)
 
+        apply_update(trade, current_user.id, new_details)
         self.db.update(trade)
         return trade
 
-    def cancel_trade(self, trade_id, current_user: User) -> Trade:
-        trade = self.db.get(str(trade_id))
-        if not trade:
-            raise ValueError("Trade not found")
+    def cancel_trade(
+        self,
+        trade_id,
+        current_user: User,
+        expected_versions: Optional[FrozenSet[int]] = None,
+    ) -> Trade:
+        trade = self._get(trade_id, expected_versions)
 
         # only allow cancellation if trade has not been Booked
         if trade.state == TradeState.EXECUTED:
@@ -85,54 +185,85 @@ class TradeService:
         self._transition(trade, TradeAction.CANCEL, current_user.id)
         return trade
 
-    def send_to_execute(self, trade_id, user_id: str) -> Trade:
-        trade = self.db.get(str(trade_id))
-        if not trade:
-            raise ValueError("Trade not found")
+    def send_to_execute(
+        self, trade_id, user_id: str, expected_versions: Optional[FrozenSet[int]] = None
+    ) -> Trade:
+        trade = self._get(trade_id, expected_versions)
         self._transition(trade, TradeAction.SEND_TO_EXECUTE, user_id)
         return trade
 
-    def book_trade(self, trade_id, user_id: str, strike: float) -> Trade:
-        trade = self.db.get(str(trade_id))
-        if not trade:
-            raise ValueError("Trade not found")
-        trade.details.strike = strike
+    def book_trade(
+        self,
+        trade_id,
+        user_id: str,
+        strike: float,
+        expected_versions: Optional[FrozenSet[int]] = None,
+    ) -> Trade:
+        trade = self._get(trade_id, expected_versions)
+        trade.details = replace(trade.details, strike=strike)
         self._transition(trade, TradeAction.BOOK, user_id)
         return trade
 
-    def get_history(self, trade_id) -> Any:
-        trade = self.db.get(str(trade_id))
-        if not trade:
-            raise ValueError("Trade not found")
-        return [record.__dict__ for record in trade.history]
+    def book_trades(self, strikes: Dict[str, float], user_id: str) -> List[BatchResult]:
+        """
+        ``book_trade`` of many trades in one transaction, ``strikes`` maps each
+        trade id to its strike. Trades that cannot be booked are skipped with
+        the reason.
+        """
+        strikes = {str(trade_id): strike for trade_id, strike in strikes.items()}
+        return self.db.batch_transition(
+            list(strikes),
+            TradeAction.BOOK,
+            user_id,
+            lambda summary: next_state(summary.state, TradeAction.BOOK),
+            strikes,
+        )
+
+    def batch_transition(
+        self, trade_ids: List, action: TradeAction, current_user: User
+    ) -> List[BatchResult]:
+        """
+        Apply ``action`` to every trade it is allowed on, in one transaction.
+        Requesters can only act on their own trades, approvers on any.
+        """
+
+        def check(summary: TradeSummary) -> TradeState:
+            if (
+                current_user.role != UserRole.ADMIN
+                and summary.requester_id != current_user.id
+            ):
+                raise ValueError(
+                    "Only requesters or approvers can perform this action."
+                )
+            return next_state(summary.state, action)
+
+        # keep the first occurrence of a repeated id.
+        trade_ids = list(dict.fromkeys(str(trade_id) for trade_id in trade_ids))
+        return self.db.batch_transition(trade_ids, action, current_user.id, check)
+
+    def get_history(
+        self, trade_id, offset: int = 0, limit: Optional[int] = None
+    ) -> Any:
+        trade = self._get(trade_id)
+        end = None if limit is None else offset + limit
+        return trade.history[offset:end]
 
     def compute_diff(self, trade_id, from_index: int, to_index: int) -> Dict[str, Any]:
-        trade = self.db.get(str(trade_id))
-        if not trade:
+        history_length = self.db.get_history_length(str(trade_id))
+        if history_length is None:
             raise ValueError("Trade not found")
-        if (
-            from_index < 0
-            or to_index < 0
-            or from_index >= len(trade.history)
-            or to_index >= len(trade.history)
-        ):
-            raise ValueError(
-                f"Invalid history indices - min index should be 0 and max index should be {len(trade.history) - 1}"
-            )
-        old_snapshot = trade.history[from_index].details_snapshot
-        new_snapshot = trade.history[to_index].details_snapshot
-        return compute_differences(old_snapshot, new_snapshot)
+        check_history_indices(history_length, from_index, to_index)
+        low, high = sorted((from_index, to_index))
+        entries = self.db.get_history_entries(str(trade_id), low, high)
+        return diff_from_entries(entries, from_index, to_index)
 
     def get_trade(self, trade_id) -> TradeStatusResponse:
-        trade = self.db.get(str(trade_id))
-        if not trade:
+        summary = self.db.get_summary(str(trade_id))
+        if not summary:
             raise ValueError("Trade not found")
-        state_str = (
-            trade.state.name if hasattr(trade.state, "name") else str(trade.state)
+        return TradeStatusResponse(
+            id=summary.id, state=summary.state.name, version=summary.version
         )
-        from trading_execution_system.schemas.trade import TradeStatusResponse
-
-        return TradeStatusResponse(id=trade.id, state=state_str)
 
     # Add this new method to get the full trade.
     def get_full_trade(self, trade_id) -> Trade:
@@ -142,29 +273,42 @@ class TradeService:
         return trade
 
     def get_trade_status(self, trade_id) -> TradeStatusResponse:
-        trade = self.db.get(str(trade_id))
-        if not trade:
+        summary = self.db.get_summary(str(trade_id))
+        if not summary:
             raise ValueError("Trade not found")
-
-        from trading_execution_system.schemas.trade import TradeStatusResponse
-
-        return TradeStatusResponse(id=trade.id, state=trade.state.name)
+        return TradeStatusResponse(
+            id=summary.id, state=summary.state.name, version=summary.version
+        )
 
     def get_all_trades(self, user_id: str, is_admin: bool = False) -> List[Trade]:
         """
         Retrieve all trades.
         """
-        # FIXME: This should not return all trades but construct a proper query
-        all_trades = self.db.list_all()
-        if not is_admin:
-            # Filter trades to only those created by this user.
-            filtered = [trade for trade in all_trades if trade.requester_id == user_id]
-            return filtered
-        return all_trades
+        query = TradeQuery(requester_id=None if is_admin else user_id, limit=None)
+        trades, _ = self.db.query(query)
+        return trades
+
+    def query_trades(
+        self, current_user: User, query: TradeQuery
+    ) -> Tuple[List[Trade], Optional[str]]:
+        """
+        Retrieve one page of trades, users only ever see their own trades.
+        """
+        if current_user.role != UserRole.ADMIN:
+            query.requester_id = current_user.id
+        return self.db.query(query)
+
+    def export_trades(
+        self, current_user: User, query: TradeQuery, include_history: bool = False
+    ) -> Iterator[Dict[str, Any]]:
+        """Stream every matching trade, users only ever see their own trades."""
+        if current_user.role != UserRole.ADMIN:
+            query.requester_id = current_user.id
+        return self.db.export(query, include_history)
 
     def get_trade_user(self, trade_id) -> User:
         # TODO: This doesn't belong to here but was needed until i implement the user model and oath2
-        trade = self.db.get(str(trade_id))
-        if not trade:
+        summary = self.db.get_summary(str(trade_id))
+        if not summary:
             raise ValueError("Trade not found")
-        return trade.requester_id
+        return summary.requester_id
@@ -6,3 +6,14 @@ def compute_differences(old: dict, new: dict) -> dict:
         if old_val != new_val:
             diffs[key] = {"old": old_val, "new": new_val}
     return diffs
+
+
+def compute_delta(old: dict, new: dict) -> dict:
+    """Return the fields of ``new`` that differ from ``old``."""
+    return {key: value for key, value in new.items() if old.get(key) != value}
+
+
+def apply_delta(base: dict, delta: dict) -> dict:
+    snapshot = dict(base)
+    snapshot.update(delta)
+    return snapshot
@@ -0,0 +1,61 @@
+"""
+JSON encoding for API responses and stored trade details.
+
+orjson encodes dataclasses, enums, dates and UUIDs natively, so trades are
+written out as they are loaded, without building intermediate dicts or running
+them through Pydantic again. orjson is a dependency, the standard library is
+only a fallback for environments installed without it.
+"""
+
+import dataclasses
+import datetime
+import enum
+import json
+import uuid
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+def _default(obj: Any) -> Any:
+    if dataclasses.is_dataclass(obj):
+        return {f.name: getattr(obj, f.name) for f in dataclasses.fields(obj)}
+    if isinstance(obj, enum.Enum):
+        return obj.value
+    if isinstance(obj, (datetime.date, datetime.datetime)):
+        return obj.isoformat()
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+
+    def dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj)
+
+    loads = orjson.loads
+
+else:
+
+    def dumps(obj: Any) -> bytes:
+        return json.dumps(obj, default=_default, separators=(",", ":")).encode()
+
+    loads = json.loads
+
+
+def to_json_value(obj: Any) -> Any:
+    """Plain JSON types of ``obj``, dates become ISO strings"""
+    return loads(dumps(obj))
+
+
+class TradeJSONResponse(JSONResponse):
+    """Renders route results with ``dumps``, the content is not re-validated"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)